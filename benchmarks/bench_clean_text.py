@@ -0,0 +1,43 @@
+"""
+Compara el limpiador compilado con la cadena original de expresiones regulares
+sobre data/processed/It.txt.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_clean_text [--repeticiones N]
+"""
+import argparse
+import time
+from src.extraction.text_cleaner import clean_text_fast, clean_text_legacy
+
+
+def medir(funcion, texto, repeticiones):
+    """Devuelve el mejor tiempo (en segundos) de varias ejecuciones y el último resultado."""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(texto)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texto", default="data/processed/It.txt")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.texto, "r", encoding="utf-8") as f:
+        texto = f.read()
+
+    t_legacy, r_legacy = medir(clean_text_legacy, texto, args.repeticiones)
+    t_fast, r_fast = medir(clean_text_fast, texto, args.repeticiones)
+
+    print(f"Texto: {args.texto} ({len(texto) / 1e6:.2f} M caracteres)")
+    print(f"clean_text_legacy: {t_legacy:.3f} s")
+    print(f"clean_text_fast:   {t_fast:.3f} s  (x{t_legacy / t_fast:.1f})")
+    print(f"Resultado idéntico: {r_legacy == r_fast}")
+
+
+if __name__ == "__main__":
+    main()
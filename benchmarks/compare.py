@@ -0,0 +1,61 @@
+"""
+Compara dos archivos de resultados de benchmarks.run_benchmarks y marca las funciones
+que se han vuelto más lentas que el umbral indicado.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.compare base.json nuevo.json [--umbral 1.10] [--metrica mediana_s]
+
+Sale con código 1 si hay alguna regresión, para poder usarlo en CI.
+"""
+import argparse
+import json
+import sys
+
+
+def cargar(ruta):
+    """Devuelve el documento de resultados y un índice (funcion, tamano) -> resultado."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        documento = json.load(f)
+    return documento, {(r["funcion"], r["tamano"]): r for r in documento["resultados"]}
+
+
+def comparar(base, nuevo, metrica="mediana_s", umbral=1.10):
+    """
+    Returns:
+        list: Tuplas (funcion, tamano, unidad, tiempo_base, tiempo_nuevo, ratio, regresion)
+              para los casos medidos en los dos archivos.
+    """
+    filas = []
+    for clave, resultado in nuevo.items():
+        anterior = base.get(clave)
+        if anterior is None or metrica not in anterior or metrica not in resultado:
+            continue
+        ratio = resultado[metrica] / anterior[metrica] if anterior[metrica] > 0 else float("inf")
+        filas.append((*clave, resultado["unidad"], anterior[metrica], resultado[metrica], ratio, ratio > umbral))
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=1.10, help="Ratio nuevo/base a partir del cual hay regresión")
+    parser.add_argument("--metrica", default="mediana_s", choices=["mediana_s", "mejor_s"])
+    args = parser.parse_args()
+
+    doc_base, base = cargar(args.base)
+    doc_nuevo, nuevo = cargar(args.nuevo)
+    print(f"Base: {doc_base['commit']} ({doc_base['fecha']})  Nuevo: {doc_nuevo['commit']} ({doc_nuevo['fecha']})")
+
+    filas = comparar(base, nuevo, args.metrica, args.umbral)
+    for funcion, tamano, unidad, t_base, t_nuevo, ratio, regresion in filas:
+        marca = "  REGRESIÓN" if regresion else ""
+        print(f"{funcion} [{tamano} {unidad}]: {t_base:.4f} s -> {t_nuevo:.4f} s (x{ratio:.2f}){marca}")
+
+    regresiones = sum(1 for fila in filas if fila[-1])
+    print(f"{len(filas)} casos comparados, {regresiones} regresiones (umbral x{args.umbral:.2f})")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
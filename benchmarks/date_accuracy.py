@@ -0,0 +1,158 @@
+"""
+Compara las fechas del reconocedor por reglas (src.nlp.date_rules) con las de los
+modelos de spaCy (en_core_web_trf y es_core_news_sm) sobre data/processed/It.txt.
+
+Las dos vías se comparan después de normalizar cada fecha como en extract_entities
+(limpiar_texto + normalizar_fecha), que es lo que llega a la ontología, y también por
+offset de las menciones. Toma spaCy como referencia: la precisión es la fracción de
+fechas de las reglas que spaCy también encuentra en el mismo fragmento, y la
+cobertura, la fracción de fechas de spaCy que encuentran las reglas.
+
+Necesita los modelos de spaCy instalados (python -m spacy download en_core_web_trf ...).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.date_accuracy [--max-fragmentos N] [--salida informe.json]
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from benchmarks.run_benchmarks import DIRECTORIO_RESULTADOS, commit_actual
+from src.nlp.entity_recognition import RECONOCEDORES_FECHA, _fechas_desde_menciones
+from src.nlp.model_registry import obtener_modelo, FECHAS_REGLAS
+from src.nlp.ner_fusion import entidades_spacy
+
+
+def fragmentar(texto, tamano):
+    """Fragmentos de unos tamano caracteres, cortados en un espacio."""
+    fragmentos = []
+    inicio = 0
+    while inicio < len(texto):
+        fin = min(len(texto), inicio + tamano)
+        if fin < len(texto):
+            espacio = texto.rfind(" ", inicio, fin)
+            fin = espacio if espacio > inicio else fin
+        fragmentos.append(texto[inicio:fin])
+        inicio = fin
+    return fragmentos
+
+
+def _cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def _metricas(aciertos, propuestas, referencia):
+    precision = aciertos / propuestas if propuestas else 1.0
+    cobertura = aciertos / referencia if referencia else 1.0
+    f1 = 2 * precision * cobertura / (precision + cobertura) if precision + cobertura else 0.0
+    return {"precision": precision, "cobertura": cobertura, "f1": f1,
+            "aciertos": aciertos, "reglas": propuestas, "spacy": referencia}
+
+
+def comparar(menciones_reglas, menciones_spacy, n_errores=20):
+    """
+    Compara las menciones por fragmento de las dos vías.
+
+    Args:
+        menciones_reglas (list): Por fragmento, menciones (dicts) de las reglas.
+        menciones_spacy (list): Por fragmento, menciones de spaCy (de todos sus modelos).
+
+    Returns:
+        dict: Métricas por valor normalizado, por offset exacto y por solapamiento, y los
+              valores normalizados que más sobran (falsos positivos) y faltan (falsos
+              negativos) en las reglas.
+    """
+    normalizadas = [0, 0, 0]
+    exactas = [0, 0, 0]
+    solapadas = [0, 0, 0]
+    sobran, faltan = Counter(), Counter()
+    for reglas, spacy in zip(menciones_reglas, menciones_spacy):
+        # Valores normalizados, como multiconjunto: cada aparición cuenta
+        valores_reglas = Counter(valor for valor, _, _ in _fechas_desde_menciones(reglas))
+        valores_spacy = Counter(valor for valor, _, _ in _fechas_desde_menciones(spacy))
+        normalizadas[0] += sum((valores_reglas & valores_spacy).values())
+        normalizadas[1] += sum(valores_reglas.values())
+        normalizadas[2] += sum(valores_spacy.values())
+        sobran.update(valores_reglas - valores_spacy)
+        faltan.update(valores_spacy - valores_reglas)
+
+        # Offsets: cada mención de spaCy se cuenta una vez aunque la encuentren varios modelos
+        spans_reglas = {(m["start"], m["end"]) for m in reglas}
+        spans_spacy = {(m["start"], m["end"]) for m in spacy}
+        exactas[0] += len(spans_reglas & spans_spacy)
+        exactas[1] += len(spans_reglas)
+        exactas[2] += len(spans_spacy)
+        solapadas[0] += sum(1 for a, b in spans_reglas if any(a < d and c < b for c, d in spans_spacy))
+        solapadas[1] += len(spans_reglas)
+        solapadas[2] += len(spans_spacy)
+
+    return {
+        "normalizadas": _metricas(*normalizadas),
+        "offset_exacto": _metricas(*exactas),
+        "offset_solapado": _metricas(*solapadas),
+        "sobran": sobran.most_common(n_errores),
+        "faltan": faltan.most_common(n_errores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texto", default="data/processed/It.txt")
+    parser.add_argument("--tamano-fragmento", type=int, default=4000, help="Caracteres por fragmento")
+    parser.add_argument("--max-fragmentos", type=int, help="Solo los primeros N fragmentos (spaCy trf es lento)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--salida", help="Archivo del informe (por defecto, benchmarks/resultados/fechas_<commit>.json)")
+    args = parser.parse_args()
+
+    with open(args.texto, "r", encoding="utf-8") as f:
+        fragmentos = fragmentar(f.read(), args.tamano_fragmento)[:args.max_fragmentos]
+    print(f"{len(fragmentos)} fragmentos de {args.texto}")
+
+    reglas = obtener_modelo(FECHAS_REGLAS)
+    menciones_reglas, segundos_reglas = _cronometrar(reglas.menciones_lote, fragmentos)
+    print(f"Reglas: {sum(len(m) for m in menciones_reglas)} fechas en {segundos_reglas:.2f} s")
+
+    menciones_spacy = [[] for _ in fragmentos]
+    segundos_spacy = {}
+    for nombre in RECONOCEDORES_FECHA:
+        modelo = obtener_modelo(nombre)
+        por_fragmento, segundos = _cronometrar(
+            lambda: entidades_spacy(modelo, fragmentos, batch_size=args.batch_size)
+        )
+        segundos_spacy[nombre] = segundos
+        for lista, menciones in zip(menciones_spacy, por_fragmento):
+            lista.extend(menciones)
+        print(f"{nombre}: {sum(len(m) for m in por_fragmento)} fechas en {segundos:.2f} s")
+
+    informe = comparar(menciones_reglas, menciones_spacy)
+    for nombre in ("normalizadas", "offset_exacto", "offset_solapado"):
+        m = informe[nombre]
+        print(f"{nombre}: precisión {m['precision']:.3f}, cobertura {m['cobertura']:.3f}, F1 {m['f1']:.3f} "
+              f"({m['aciertos']} aciertos, {m['reglas']} de las reglas, {m['spacy']} de spaCy)")
+    print("Sobran en las reglas:", ", ".join(f"{valor} ({n})" for valor, n in informe["sobran"]))
+    print("Faltan en las reglas:", ", ".join(f"{valor} ({n})" for valor, n in informe["faltan"]))
+    total_spacy = sum(segundos_spacy.values())
+    print(f"Tiempo: reglas {segundos_reglas:.2f} s, spaCy {total_spacy:.2f} s "
+          f"(x{total_spacy / segundos_reglas if segundos_reglas else float('inf'):.0f})")
+
+    commit = commit_actual()
+    salida = Path(args.salida) if args.salida else DIRECTORIO_RESULTADOS / f"fechas_{commit}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "texto": args.texto,
+            "fragmentos": len(fragmentos),
+            "segundos": {"reglas": segundos_reglas, **segundos_spacy},
+            **informe,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Informe guardado en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Comprueba que los backends ONNX (src.nlp.onnx_backend) dan las mismas entidades que
+los pipelines de PyTorch de BETO y BERT multilingüe sobre data/processed/It.txt, y mide
+el tiempo de inferencia de cada backend.
+
+Exporta los modelos la primera vez (necesita onnxruntime, y onnx para cuantizar).
+Sale con código 1 si el backend onnx (sin cuantizar) no da exactamente las mismas
+menciones que PyTorch; el cuantizado solo se informa, porque int8 cambia algún score.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.onnx_parity [--max-fragmentos N] [--hilos N] [--salida informe.json]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from benchmarks.run_benchmarks import DIRECTORIO_RESULTADOS, commit_actual
+from src.nlp.chunking import contador_de_tokens, max_tokens_de, generar_chunks
+from src.nlp.model_registry import obtener_modelo, nombre_con_backend, MODELOS_CON_BACKEND, BACKENDS
+from src.nlp.onnx_backend import configurar, verificar_paridad
+
+
+def _cronometrar(modelo, fragmentos, batch_size):
+    inicio = time.perf_counter()
+    modelo(fragmentos, batch_size=batch_size)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texto", default="data/processed/It.txt")
+    parser.add_argument("--max-fragmentos", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--hilos", type=int, help="Hilos de ONNX Runtime (por defecto, todos)")
+    parser.add_argument("--salida", help="Archivo del informe (por defecto, benchmarks/resultados/onnx_<commit>.json)")
+    args = parser.parse_args()
+
+    configurar(hilos=args.hilos)
+    with open(args.texto, "r", encoding="utf-8") as f:
+        texto = f.read()
+
+    resultados = []
+    paridad = True
+    for nombre in MODELOS_CON_BACKEND:
+        # Fragmentos dentro de la ventana del modelo, como en la etapa de NER
+        tokenizer = obtener_modelo(nombre).tokenizer
+        chunks = generar_chunks(texto, contador_de_tokens(tokenizer), max_tokens_de(tokenizer), solapamiento=0)
+        fragmentos = [chunk.texto for chunk in chunks[:args.max_fragmentos]]
+        segundos = {}
+        for backend in BACKENDS:
+            modelo = obtener_modelo(nombre_con_backend(nombre, backend))
+            # Calentamiento: la primera llamada incluye la creación de buffers
+            modelo(fragmentos[:args.batch_size], batch_size=args.batch_size)
+            segundos[backend] = _cronometrar(modelo, fragmentos, args.batch_size)
+        for backend in BACKENDS[1:]:
+            resultado = verificar_paridad(nombre, fragmentos, backend, args.batch_size)
+            resultado["segundos"] = segundos[backend]
+            resultado["segundos_pytorch"] = segundos["pytorch"]
+            resultados.append(resultado)
+            identico = resultado["textos_identicos"] == 1.0
+            if backend == "onnx" and not identico:
+                paridad = False
+            print(f"{nombre} [{backend}]: {resultado['coincidencias']}/{resultado['menciones_pytorch']} menciones "
+                  f"coinciden ({resultado['menciones_backend']} del backend), textos idénticos "
+                  f"{resultado['textos_identicos']:.1%}, máx. dif. de score {resultado['max_diferencia_score']:.2e}, "
+                  f"{segundos[backend]:.2f} s frente a {segundos['pytorch']:.2f} s "
+                  f"(x{segundos['pytorch'] / segundos[backend]:.1f})")
+
+    commit = commit_actual()
+    salida = Path(args.salida) if args.salida else DIRECTORIO_RESULTADOS / f"onnx_{commit}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "texto": args.texto,
+            "hilos": args.hilos,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Informe guardado en {salida}")
+    sys.exit(0 if paridad else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Mide las funciones públicas del pipeline sobre el corpus de It (data/raw/It.pdf y
+data/processed/It.txt) con varios tamaños de entrada. Las partes de NER usan los
+reconocedores de benchmarks.stubs, así que no hace falta descargar ningún modelo.
+
+Los resultados se guardan en benchmarks/resultados/<commit>.json para compararlos
+entre commits con benchmarks.compare.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.run_benchmarks [--repeticiones N] [--solo clean_extracted_text,...]
+    python -m benchmarks.compare benchmarks/resultados/<base>.json benchmarks/resultados/<nuevo>.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from benchmarks.stubs import registrar_stubs
+
+
+DIRECTORIO_RESULTADOS = Path("benchmarks/resultados")
+
+
+def cronometrar(funcion, repeticiones):
+    """Ejecuta funcion() varias veces y devuelve los tiempos (en segundos) de cada ejecución."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def commit_actual():
+    """Hash corto del commit actual, con el sufijo -dirty si hay cambios sin confirmar."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin_git"
+    return commit + ("-dirty" if cambios else "")
+
+
+class Corpus:
+    """Textos y entidades de entrada, generados una vez y recortados a cada tamaño."""
+
+    def __init__(self, ruta_pdf, ruta_texto):
+        self.ruta_pdf = ruta_pdf
+        with open(ruta_texto, "r", encoding="utf-8") as f:
+            self.texto = f.read()
+        self._entidades = None
+
+    def texto_de(self, caracteres):
+        """Los primeros caracteres del libro (repetido si hace falta)."""
+        repeticiones = caracteres // len(self.texto) + 1
+        return (self.texto * repeticiones)[:caracteres]
+
+    def entidades(self):
+        # Entidades del libro completo según los stubs, en orden de aparición
+        if self._entidades is None:
+            from src.nlp.entity_recognition import extract_entities_batch
+
+            fragmentos = [self.texto[i:i + 4000] for i in range(0, len(self.texto), 4000)]
+            self._entidades = [e for lista in extract_entities_batch(fragmentos) for e in lista]
+        return self._entidades
+
+    def entidades_de(self, n):
+        entidades = self.entidades()
+        return (entidades * (n // len(entidades) + 1))[:n]
+
+    def relaciones_de(self, entidades, n):
+        """n relaciones de co-ocurrencia entre entidades consecutivas."""
+        nombres = [nombre for nombre, _ in entidades]
+        return [
+            (nombres[i % len(nombres)], "co_ocurre_con", nombres[(i * 7 + 1) % len(nombres)])
+            for i in range(n)
+        ]
+
+
+def _bench_extract_text_from_pdf(corpus, tamano):
+    from src.extraction.extract_text import extract_text_from_pdf
+
+    return lambda: extract_text_from_pdf(corpus.ruta_pdf, 2)
+
+
+def _bench_clean_extracted_text(corpus, tamano):
+    from src.extraction.extract_text import clean_extracted_text
+
+    texto = corpus.texto_de(tamano)
+    return lambda: clean_extracted_text(texto)
+
+
+def _bench_normalize_entity(corpus, tamano):
+    from src.common.util import normalize_entity
+
+    texto = corpus.texto_de(tamano)
+    return lambda: normalize_entity(texto)
+
+
+def _bench_keyphrases(corpus, tamano):
+    from src.nlp.keyphrase_extraction import extraer_keyphrases_keybert_potente_con_scores
+
+    texto = corpus.texto_de(tamano)
+    # Mismos parámetros que etapa_frases_clave
+    return lambda: extraer_keyphrases_keybert_potente_con_scores(texto, max_phrases=5, max_words=7)
+
+
+def _bench_extract_entities(corpus, tamano):
+    from src.nlp.entity_recognition import extract_entities
+
+    texto = corpus.texto_de(tamano)
+    return lambda: extract_entities(texto)
+
+
+def _bench_fechas_reglas(corpus, tamano):
+    from src.nlp.date_rules import ReconocedorFechas
+
+    texto = corpus.texto_de(tamano)
+    reconocedor = ReconocedorFechas()
+    return lambda: reconocedor.menciones(texto)
+
+
+def _bench_agrupar_entidades(corpus, tamano):
+    from src.nlp.entity_recognition import agrupar_entidades_similares
+
+    entidades = corpus.entidades_de(tamano)
+    return lambda: agrupar_entidades_similares(entidades)
+
+
+def _bench_agrupar_entidades_indexado(corpus, tamano):
+    from src.nlp.entity_grouping import agrupar_entidades_indexado
+
+    entidades = corpus.entidades_de(tamano)
+    return lambda: agrupar_entidades_indexado(entidades)
+
+
+def _bench_extract_relationships(corpus, tamano):
+    from src.nlp.entity_grouping import agrupar_entidades_indexado
+    from src.ontology.ontology_builder import extract_relationships
+
+    texto = corpus.texto_de(tamano)
+    entidades = agrupar_entidades_indexado(corpus.entidades())
+    return lambda: extract_relationships(texto, entidades)
+
+
+def _bench_generate_ontology(corpus, tamano):
+    from src.ontology.ontology_builder import generate_ontology
+
+    entidades = list(dict.fromkeys(corpus.entidades_de(tamano)))
+    relaciones = corpus.relaciones_de(entidades, tamano)
+    return lambda: generate_ontology(entidades, relaciones)
+
+
+# Función -> (preparación, unidad del tamaño, tamaños). La preparación recibe el corpus y
+# el tamaño y devuelve la llamada a medir, para no medir la generación de las entradas.
+BENCHMARKS = {
+    "extract_text_from_pdf": (_bench_extract_text_from_pdf, "libro", [1]),
+    "clean_extracted_text": (_bench_clean_extracted_text, "caracteres", [10_000, 100_000, 1_000_000]),
+    "normalize_entity": (_bench_normalize_entity, "caracteres", [10_000, 100_000, 1_000_000]),
+    "extraer_keyphrases_keybert_potente_con_scores": (_bench_keyphrases, "caracteres", [1_000, 4_000, 16_000]),
+    "extract_entities": (_bench_extract_entities, "caracteres", [1_000, 10_000, 100_000]),
+    "fechas_reglas": (_bench_fechas_reglas, "caracteres", [10_000, 100_000, 1_000_000]),
+    "agrupar_entidades_similares": (_bench_agrupar_entidades, "entidades", [100, 1_000, 10_000]),
+    "agrupar_entidades_indexado": (_bench_agrupar_entidades_indexado, "entidades", [100, 1_000, 10_000, 100_000]),
+    "extract_relationships": (_bench_extract_relationships, "caracteres", [10_000, 50_000, 200_000]),
+    "generate_ontology": (_bench_generate_ontology, "entidades", [100, 1_000, 10_000]),
+}
+
+
+def ejecutar(corpus, nombres, repeticiones):
+    """
+    Ejecuta los benchmarks indicados.
+
+    Returns:
+        list: Un diccionario por función y tamaño con los tiempos, o con el motivo por el
+              que se ha omitido (p. ej. una dependencia que no está instalada).
+    """
+    resultados = []
+    for nombre in nombres:
+        preparar, unidad, tamanos = BENCHMARKS[nombre]
+        for tamano in tamanos:
+            resultado = {"funcion": nombre, "tamano": tamano, "unidad": unidad}
+            try:
+                llamada = preparar(corpus, tamano)
+                tiempos = cronometrar(llamada, repeticiones)
+            except ImportError as e:
+                resultado["omitido"] = f"Falta una dependencia: {e}"
+                print(f"{nombre} [{tamano} {unidad}]: omitido ({e})")
+                resultados.append(resultado)
+                break
+            resultado.update({
+                "mejor_s": min(tiempos),
+                "mediana_s": statistics.median(tiempos),
+                "repeticiones": repeticiones,
+            })
+            print(f"{nombre} [{tamano} {unidad}]: mejor {resultado['mejor_s']:.4f} s, mediana {resultado['mediana_s']:.4f} s")
+            resultados.append(resultado)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="data/raw/It.pdf")
+    parser.add_argument("--texto", default="data/processed/It.txt")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--solo", help="Funciones a medir, separadas por comas (por defecto, todas)")
+    parser.add_argument("--salida", help="Archivo de resultados (por defecto, benchmarks/resultados/<commit>.json)")
+    args = parser.parse_args()
+
+    nombres = args.solo.split(",") if args.solo else list(BENCHMARKS)
+    desconocidas = [n for n in nombres if n not in BENCHMARKS]
+    if desconocidas:
+        parser.error(f"Funciones desconocidas: {desconocidas}")
+
+    registrar_stubs()
+    corpus = Corpus(args.pdf, args.texto)
+    commit = commit_actual()
+    resultados = ejecutar(corpus, nombres, args.repeticiones)
+
+    salida = Path(args.salida) if args.salida else DIRECTORIO_RESULTADOS / f"{commit}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
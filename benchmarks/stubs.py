@@ -0,0 +1,98 @@
+"""
+Reconocedores de entidades sin modelos, para medir el resto del pipeline sin cargar
+BETO, BERT multilingüe ni spaCy. Reproducen la interfaz que usa src.nlp.entity_recognition
+(pipeline "ner" de Hugging Face con aggregation_strategy, nlp.pipe de spaCy y los
+tokenizers que usa src.nlp.chunking) con reglas deterministas.
+
+Uso:
+    from benchmarks.stubs import registrar_stubs
+    registrar_stubs()  # sustituye los cargadores del registro de modelos
+"""
+import re
+from src.nlp.model_registry import registrar_modelo, nombre_tokenizer, BETO, BERT_MULTILINGUE, SPACY_EN, SPACY_ES
+
+
+# Secuencias de palabras en mayúscula inicial: candidatas a persona o lugar
+_PATRON_NOMBRE = re.compile(r"\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+(?: [A-ZÁÉÍÓÚÑ][a-záéíóúñ]+)*\b")
+_PATRON_FECHA = re.compile(
+    r"\b(?:\d{1,2} de (?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|"
+    r"octubre|noviembre|diciembre)(?: de \d{4})?|(?:19|20)\d{2})\b",
+    re.IGNORECASE,
+)
+_PATRON_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# Nombres que el stub etiqueta como lugar; el resto de nombres propios, como persona
+LUGARES = {"Derry", "Maine", "Bangor", "Barrens", "Kansas", "Neibolt", "Jackson", "Witcham"}
+# Palabras que suelen empezar oración y no son entidades
+_IGNORADAS = {"El", "La", "Los", "Las", "Un", "Una", "Pero", "Y", "Que", "Se", "No", "En", "Por", "Cuando"}
+
+
+class TokenizerStub:
+    """Tokenizer que cuenta palabras y signos, con la ventana de un modelo BERT."""
+
+    model_max_length = 512
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, textos, add_special_tokens=False):
+        if isinstance(textos, str):
+            textos = [textos]
+        extra = self.num_special_tokens_to_add() if add_special_tokens else 0
+        return {"input_ids": [[0] * (len(_PATRON_TOKEN.findall(t)) + extra) for t in textos]}
+
+
+class NerHFStub:
+    """Imita un pipeline "ner" de Hugging Face con aggregation_strategy="first"."""
+
+    def __init__(self):
+        self.tokenizer = TokenizerStub()
+
+    def _entidades(self, texto):
+        entidades = []
+        for m in _PATRON_NOMBRE.finditer(texto):
+            palabra = m.group(0)
+            if palabra in _IGNORADAS:
+                continue
+            grupo = "LOC" if palabra.split()[0] in LUGARES else "PER"
+            entidades.append({"entity_group": grupo, "word": palabra, "score": 0.99, "start": m.start(), "end": m.end()})
+        return entidades
+
+    def __call__(self, textos, batch_size=None):
+        if isinstance(textos, str):
+            return self._entidades(textos)
+        return [self._entidades(texto) for texto in textos]
+
+
+class _EntidadStub:
+    def __init__(self, text, label_, start_char):
+        self.text = text
+        self.label_ = label_
+        self.start_char = start_char
+        self.end_char = start_char + len(text)
+
+
+class _DocStub:
+    def __init__(self, texto):
+        self.ents = [_EntidadStub(m.group(0), "DATE", m.start()) for m in _PATRON_FECHA.finditer(texto)]
+
+
+class NerSpacyStub:
+    """Imita un modelo de spaCy que solo reconoce fechas."""
+
+    def __call__(self, texto):
+        return _DocStub(texto)
+
+    def pipe(self, textos, batch_size=None, n_process=1):
+        for texto in textos:
+            yield _DocStub(texto)
+
+
+def registrar_stubs():
+    """Registra los stubs en lugar de los modelos reales (descarta los ya cargados)."""
+    registrar_modelo(BETO, NerHFStub, reemplazar=True)
+    registrar_modelo(BERT_MULTILINGUE, NerHFStub, reemplazar=True)
+    registrar_modelo(nombre_tokenizer(BETO), TokenizerStub, reemplazar=True)
+    registrar_modelo(nombre_tokenizer(BERT_MULTILINGUE), TokenizerStub, reemplazar=True)
+    registrar_modelo(SPACY_EN, NerSpacyStub, reemplazar=True)
+    registrar_modelo(SPACY_ES, NerSpacyStub, reemplazar=True)
@@ -1,174 +1,72 @@
-from src.extraction.extract_text import extract_text_from_pdf
-from src.nlp.keyphrase_extraction import extraer_keyphrases_keybert_potente_con_scores
-from src.nlp.entity_recognition import extract_entities,agrupar_entidades_similares
-from collections import defaultdict
-from src.ontology.ontology_builder import extract_relationships,generate_ontology
-from src.ontology.neo4j_service import insert_ontology
-from src.graph.graph_builder import build_graph, draw_graph
-
-def save_text(text, filepath):
-    """
-    Guarda el texto extraído del PDF en un archivo.
-    """
-    try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(text)
-        print(f"Texto guardado en {filepath}")
-    except Exception as e:
-        print(f"Error al guardar el texto: {e}")
-
-def load_text_from_file(filepath):
-    """
-    Lee el texto desde un archivo.
-    """
+from src.nlp.onnx_backend import configurar as configurar_onnx
+from src.pipeline.stages import construir_pipeline
+from src.common.profiling import Perfilador
+from pathlib import Path
+from datetime import datetime
+import argparse
+import os
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extrae entidades y relaciones de un libro en PDF y las carga en Neo4j.")
+    parser.add_argument("--pdf", default="data/raw/It.pdf", help="Libro en PDF")
+    parser.add_argument("--directorio", default="data/processed", help="Directorio de los puntos de control")
+    parser.add_argument("--ontologia", default="data/processed/ontology.ttl", help="Archivo de la ontología (.ttl o .nt)")
+    parser.add_argument("--neo4j-url", default="bolt://localhost:7687")
+    parser.add_argument("--usuario", default="neo4j")
+    parser.add_argument("--password", default=os.environ.get("NEO4J_PASSWORD", "Admin.123"))
+    parser.add_argument("--cargador", choices=["n10s", "unwind", "upsert"], default="n10s")
+    parser.add_argument("--reconocedores", help="Reconocedores NER separados por comas (por defecto, todos)")
+    parser.add_argument("--fusion", choices=["union", "mayoria", "unanimidad"],
+                        help="Fusiona los reconocedores por offset con esta política de votación")
+    parser.add_argument("--fechas", choices=["spacy", "reglas"], default="spacy",
+                        help="Extrae las fechas con los modelos de spaCy o con reglas (sin spaCy)")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "onnx_int8"], default="pytorch",
+                        help="Cómo se ejecutan los modelos de Hugging Face (ONNX se exporta la primera vez)")
+    parser.add_argument("--hilos-onnx", type=int, help="Hilos de ONNX Runtime por inferencia (por defecto, todos)")
+    parser.add_argument("--ner-workers", type=int, help="Procesos para el NER, cada uno con sus modelos (por defecto, 1)")
+    parser.add_argument("--cache-dir", default="data/cache", help="Caché por fragmento ('' para desactivarla)")
+    parser.add_argument("--objetivos", help="Artefactos a obtener, separados por comas (por defecto, todos)")
+    parser.add_argument("--forzar", help="Etapas a repetir aunque estén al día, separadas por comas")
+    parser.add_argument("--max-workers", type=int, help="Etapas independientes ejecutadas a la vez")
+    parser.add_argument("--sin-puntos-de-control", action="store_true",
+                        help="No guarda los artefactos intermedios (la siguiente ejecución repite sus etapas)")
+    parser.add_argument("--estado", action="store_true", help="Solo muestra qué etapas están al día")
+    parser.add_argument("--perfil", help="Archivo JSON del perfil de la ejecución")
+    return parser.parse_args(argv)
+
+
+def _lista(valor):
+    return [v.strip() for v in valor.split(",") if v.strip()] if valor else None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.hilos_onnx:
+        configurar_onnx(hilos=args.hilos_onnx)
+    pipeline = construir_pipeline(
+        args.pdf, args.directorio, args.ontologia, args.neo4j_url, args.usuario, args.password,
+        cargador=args.cargador, reconocedores=_lista(args.reconocedores), cache_dir=args.cache_dir or None,
+        fusion=args.fusion, fechas=args.fechas, backend=args.backend, ner_workers=args.ner_workers,
+        hilos_onnx=args.hilos_onnx,
+    )
+    objetivos = _lista(args.objetivos)
+    if args.estado:
+        for etapa, estado in pipeline.estado(objetivos).items():
+            print(f"{etapa}: {estado}")
+        return
+
+    libro = Path(args.pdf).stem
+    perfil_path = args.perfil or f"{args.directorio}/perfiles/{libro}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    perfil = Perfilador(libro)
+    # Solo se ejecutan las etapas obsoletas; si una falla, las terminadas quedan guardadas
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            text = f.read()
-        return text
-    except Exception as e:
-        print(f"Error al leer el archivo {filepath}: {e}")
-        return ""
-
-#def calcular_corte(texto, chunk_size):
-#    inicio = 0
-#    longitud = len(texto)
-#    while inicio < longitud:
-#        if inicio + chunk_size >= longitud:
-#            yield texto[inicio:].strip()
-#            break
-
-#        corte_pos = texto.find('.', inicio + chunk_size)
-#        if corte_pos == -1:
-#            yield texto[inicio:].strip()
-#            break
-
-#        corte_pos += 1
-#        fragmento = texto[inicio:corte_pos].strip()
-#        yield fragmento
-#        inicio = corte_pos
-
-def process_text_in_parts(text, output_text_Keyphrase_path, chunk_size=1000):    
-    """
-    Procesa el texto por partes, extrayendo entidades y relaciones de cada parte.
-    """
-    # Inicializa una lista vacía para acumular frases clave
-    frases_acumuladas = [] 
-    # Dividir el texto en partes de tamaño definido
-    for i in range(0, len(text), chunk_size):
-    #for fragmento in calcular_corte(text, chunk_size):
-        fragmento = text[i:i+chunk_size]        
-        resultados = extraer_keyphrases_keybert_potente_con_scores(fragmento, max_phrases=5 , max_words=7)
-        # Extraer solo las frases (sin puntuación) y acumularlas
-        frases_acumuladas.extend([frase for frase in resultados])
-    # Opcional: eliminar duplicados manteniendo orden
-    frases_unicas = list(dict.fromkeys(frases_acumuladas))
-    # Convertir la lista en un texto con saltos de línea
-    texto_final = "\n".join(frases_unicas)    
-    ## Guardar en archivo
-    save_text(texto_final, output_text_Keyphrase_path)
-    print(f"Se guardaron {len(frases_unicas)} frases clave en el archivo.")    
-    # Leer el texto guardado en el archivo
-    texto_final = load_text_from_file (output_text_Keyphrase_path)
-    if not texto_final:
-        raise Exception("No se pudo leer el texto del archivo.")
-    
-    entidades = []
-    relaciones = []
-    # Dividir el texto en partes de tamaño definido
-
-    #for fragmento in calcular_corte(texto_final, chunk_size):
-    for i in range(0, len(texto_final), chunk_size):
-        fragmento = text[i:i+chunk_size]   
-        # Extraer entidades de este fragmento
-        fragmento_entidades = extract_entities(fragmento)
-        entidades.extend(fragmento_entidades)        
-        # Extraer relaciones de este fragmento
-        fragmento_relaciones = extract_relationships(fragmento, fragmento_entidades)
-        relaciones.extend(fragmento_relaciones)
-
-
-    return entidades, relaciones
-
-
-def show_entities(entidades):
-    """
-    Muestra todas las entidades extraídas y un resumen agrupado por tipo.
-
-    Args:
-        entidades (list of tuples): Lista de tuplas (texto_entidad, tipo_entidad).
-    """
-    print("Entidades encontradas:")
-    for texto, etiqueta in entidades:
-        print(f"- {texto} ({etiqueta})")
-
-    # Agrupar entidades por tipo
-    agrupadas = defaultdict(set)
-    for texto, etiqueta in entidades:
-        agrupadas[etiqueta].add(texto)
-
-    print("\nResumen por tipo de entidad:")
-    #for etiqueta, textos in agrupadas.items():
-    print(f"{etiqueta} ({len(texto)}): {', '.join(texto)}")
-
-def save_ontology_to_file(serialized_ontology, filepath, format="turtle"):
-    """
-    Guarda la ontología serializada (string) en un archivo.
-    """
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(serialized_ontology)
-    print(f"Ontología guardada en {filepath}")
-
-def process_pdf_and_generate_ontology(pdf_path, output_text_path, output_text_Keyphrase_path, ontology_path, neo4j_url, user, password):
-    try:
-        # Extraer texto del PDF
-        texto = extract_text_from_pdf(pdf_path, 2)
-        # Guardar texto
-        save_text(texto, output_text_path)
-        # Leer el texto guardado en el archivo
-        texto_leido = load_text_from_file(output_text_path)    
-        if not texto_leido:
-            raise Exception("No se pudo leer el texto del archivo.")
-
-        # Procesar el texto por partes, obteniendo frases clave, entidades y relaciones
-        entidades, relaciones = process_text_in_parts(texto_leido, output_text_Keyphrase_path, 4000)
-        
-        # Mostrar algunas entidades encontradas
-        #show_entities(entidades)
-        #print(relaciones)
-
-
-        # Agrupar entidades similares
-        entities_agrupadas = agrupar_entidades_similares(entidades)
-        print("AGRUPADO")
-        print(entities_agrupadas)
-
-        # Generar ontología con entidades y relaciones
-        ontologia = generate_ontology([(e[0], e[1]) for e in entities_agrupadas], relaciones)
-        #print(ontologia)
-        save_ontology_to_file(ontologia, ontology_path)
-        turtle_data = ontologia
-        if isinstance(turtle_data, bytes):
-            turtle_data = turtle_data.decode("utf-8")
-        insert_ontology(neo4j_url, user, password, turtle_data)
-
-        # Construir y mostrar grafo
-        #G = build_graph(relaciones)
-        #draw_graph(G)
-    except Exception as e:
-        print(f"Error en el procesamiento del PDF: {e}")
-
-def main():
-    # Definir las rutas y parámetros de entrada
-    pdf_path = "data/raw/It.pdf"
-    output_text_path = "data/processed/It.txt"
-    output_text_Keyphrase_path = "data/processed/It_kp.txt"
-    ontology_path = "data/processed/ontology.ttl"
-    neo4j_url = "bolt://localhost:7687"
-    user = "neo4j"
-    password = "Admin.123"
-
-    # Procesar PDF y generar ontología
-    process_pdf_and_generate_ontology(pdf_path, output_text_path, output_text_Keyphrase_path, ontology_path, neo4j_url, user, password)
+        with perfil:
+            pipeline.ejecutar(objetivos, forzar=_lista(args.forzar) or (), max_workers=args.max_workers,
+                              persistir=not args.sin_puntos_de_control)
+    finally:
+        perfil.resumen()
+        perfil.guardar_json(perfil_path)
 
 
 
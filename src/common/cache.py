@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def hash_texto(texto):
+    """Devuelve el hash SHA-256 (hexadecimal) de un texto."""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _a_tuplas(valor):
+    # JSON no distingue tuplas de listas: los resultados cacheados son listas de tuplas
+    # (entidades) o de cadenas (frases clave)
+    if isinstance(valor, list):
+        return [tuple(v) if isinstance(v, list) else v for v in valor]
+    return valor
+
+
+class CacheResultados:
+    """
+    Caché en disco, direccionada por contenido, para resultados por fragmento.
+
+    La clave combina el hash del fragmento, el nombre/versión del modelo y los parámetros,
+    así que cambiar cualquiera de ellos invalida solo las entradas afectadas. Cada entrada
+    es un archivo JSON; cuando el total supera max_bytes se eliminan las entradas usadas
+    hace más tiempo.
+    """
+
+    def __init__(self, directorio="data/cache", max_bytes=512 * 1024 * 1024):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self.expulsiones = 0
+        self._lock = threading.Lock()
+        self._bytes = sum(ruta.stat().st_size for ruta in self.directorio.glob("*/*.json"))
+
+    def clave(self, texto, modelo, parametros=None):
+        """
+        Calcula la clave de un fragmento para un modelo y unos parámetros.
+
+        Args:
+            texto (str): Fragmento de texto.
+            modelo (str): Nombre y versión del modelo o del extractor.
+            parametros (dict): Parámetros que afectan al resultado.
+        """
+        contenido = json.dumps(
+            {"texto": hash_texto(texto), "modelo": modelo, "parametros": parametros or {}},
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def _ruta(self, clave):
+        return self.directorio / clave[:2] / f"{clave}.json"
+
+    def obtener(self, clave):
+        """
+        Busca una entrada.
+
+        Returns:
+            tuple: (encontrado, valor).
+        """
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                valor = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.fallos += 1
+            return False, None
+        # Marcar como usada recientemente para la expulsión LRU
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        with self._lock:
+            self.aciertos += 1
+        return True, _a_tuplas(valor)
+
+    def guardar(self, clave, valor):
+        """Guarda una entrada y expulsa las más antiguas si se supera el tamaño máximo."""
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(exist_ok=True)
+        datos = json.dumps(valor, ensure_ascii=False)
+        temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(datos)
+        anterior = ruta.stat().st_size if ruta.exists() else 0
+        os.replace(temporal, ruta)
+        with self._lock:
+            self.escrituras += 1
+            self._bytes += ruta.stat().st_size - anterior
+            excedido = self._bytes > self.max_bytes
+        if excedido:
+            self._expulsar()
+
+    def obtener_o_calcular(self, texto, modelo, parametros, funcion):
+        """
+        Devuelve el resultado cacheado para el fragmento o lo calcula con funcion(texto)
+        y lo guarda.
+        """
+        clave = self.clave(texto, modelo, parametros)
+        encontrado, valor = self.obtener(clave)
+        if encontrado:
+            return valor
+        valor = funcion(texto)
+        self.guardar(clave, valor)
+        return valor
+
+    def _expulsar(self):
+        # Eliminar por orden de último uso hasta quedar en el 90 % del máximo
+        with self._lock:
+            entradas = []
+            for ruta in self.directorio.glob("*/*.json"):
+                try:
+                    stat = ruta.stat()
+                except OSError:
+                    continue
+                entradas.append((stat.st_mtime, stat.st_size, ruta))
+            self._bytes = sum(tamano for _, tamano, _ in entradas)
+            objetivo = self.max_bytes * 0.9
+            for _, tamano, ruta in sorted(entradas, key=lambda e: e[0]):
+                if self._bytes <= objetivo:
+                    break
+                try:
+                    ruta.unlink()
+                except OSError:
+                    continue
+                self._bytes -= tamano
+                self.expulsiones += 1
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Aciertos, fallos, tasa de aciertos, escrituras, expulsiones y tamaño en bytes.
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "escrituras": self.escrituras,
+                "expulsiones": self.expulsiones,
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,213 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from src.common.util import memoria_rss
+
+
+# Perfilador de la ejecución en curso, para que las funciones de src puedan registrar
+# sus etapas con medir() sin recibirlo como argumento
+_perfil_activo = contextvars.ContextVar("perfil_activo", default=None)
+
+_MB = 1024 * 1024
+
+
+def _pico_proceso():
+    # Máximo histórico de memoria residente del proceso (en MB), según el kernel
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return pico / (_MB if sys.platform == "darwin" else 1024)
+
+
+def _cpu_hijos():
+    tiempos = os.times()
+    return tiempos.children_user + tiempos.children_system
+
+
+class Perfilador:
+    """
+    Registra, por etapa, el tiempo real, el tiempo de CPU, la memoria residente (inicial,
+    final y pico) y los contadores de elementos procesados (páginas, fragmentos,
+    entidades, relaciones, triples...). El resultado es un JSON por ejecución.
+
+    El pico de memoria se obtiene muestreando la memoria residente en un hilo mientras
+    hay etapas abiertas y, si la etapa eleva el máximo histórico del proceso, con ese
+    máximo (así no se pierden los picos más cortos que el intervalo de muestreo).
+    El tiempo de CPU de los procesos hijos solo incluye los que ya han terminado
+    (p. ej. los de un pool cerrado dentro de la etapa).
+
+    cpu_s es el tiempo de CPU del hilo que ejecuta la etapa (time.thread_time), así que
+    no se mezcla con el de las etapas que el pipeline ejecuta a la vez en otros hilos,
+    pero no incluye el de los hilos que lanza la etapa (PyTorch, ONNX Runtime...).
+    cpu_proceso_s es el de todo el proceso: sí los incluye, pero si concurrente es True
+    (hubo etapas abiertas a la vez en otros hilos) también el de esas etapas, y no puede
+    atribuirse solo a esta.
+
+    Uso:
+        with Perfilador("It") as perfil:
+            with medir("extraccion") as etapa:
+                paginas = ...
+                etapa["paginas"] = len(paginas)
+        perfil.guardar_json("data/processed/perfiles/It.json")
+    """
+
+    def __init__(self, nombre=None, intervalo_muestreo=0.05):
+        """
+        Args:
+            nombre (str): Nombre de la ejecución (p. ej. el libro procesado).
+            intervalo_muestreo (float): Segundos entre muestras de memoria residente.
+        """
+        self.nombre = nombre
+        self.intervalo_muestreo = intervalo_muestreo
+        self.etapas = []
+        self.error = None
+        self._abiertas = []
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._muestreador = None
+        self._inicio = None
+        self._inicio_reloj = None
+        self._token = None
+        self._duracion = None
+
+    def __enter__(self):
+        self._inicio = datetime.now().isoformat(timespec="seconds")
+        self._inicio_reloj = time.perf_counter()
+        self._token = _perfil_activo.set(self)
+        self._muestreador = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+        self._muestreador.start()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if valor is not None and self.error is None:
+            self.registrar_error(valor)
+        self._detener.set()
+        self._muestreador.join()
+        _perfil_activo.reset(self._token)
+        self._duracion = time.perf_counter() - self._inicio_reloj
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo_muestreo):
+            with self._lock:
+                if not self._abiertas:
+                    continue
+            rss = memoria_rss() / _MB
+            with self._lock:
+                for registro, _ in self._abiertas:
+                    if rss > registro["pico_rss_mb"]:
+                        registro["pico_rss_mb"] = rss
+
+    @contextmanager
+    def etapa(self, nombre, **contadores):
+        """
+        Mide una etapa. Devuelve un diccionario donde se pueden añadir contadores
+        (registro["entidades"] = n). Si la etapa lanza una excepción, se registra en
+        el campo "error" y se relanza.
+        """
+        rss = memoria_rss() / _MB
+        registro = {
+            "etapa": nombre,
+            "inicio_s": time.perf_counter() - self._inicio_reloj if self._inicio_reloj else 0.0,
+            "rss_inicio_mb": rss,
+            "pico_rss_mb": rss,
+            "concurrente": False,
+        }
+        registro.update(contadores)
+        hilo = threading.get_ident()
+        with self._lock:
+            # Las etapas anidadas en el mismo hilo no se solapan en CPU con esta
+            for abierta, hilo_abierta in self._abiertas:
+                if hilo_abierta != hilo:
+                    abierta["concurrente"] = registro["concurrente"] = True
+            self._abiertas.append((registro, hilo))
+        pico_antes = _pico_proceso()
+        reloj, cpu, cpu_proceso, cpu_hijos = time.perf_counter(), time.thread_time(), time.process_time(), _cpu_hijos()
+        try:
+            yield registro
+        except BaseException as e:
+            registro["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            registro["segundos"] = time.perf_counter() - reloj
+            registro["cpu_s"] = time.thread_time() - cpu
+            registro["cpu_proceso_s"] = time.process_time() - cpu_proceso
+            registro["cpu_hijos_s"] = _cpu_hijos() - cpu_hijos
+            rss = memoria_rss() / _MB
+            registro["rss_fin_mb"] = rss
+            pico_despues = _pico_proceso()
+            with self._lock:
+                registro["pico_rss_mb"] = max(registro["pico_rss_mb"], rss)
+                if pico_despues > pico_antes:
+                    registro["pico_rss_mb"] = max(registro["pico_rss_mb"], pico_despues)
+                self._abiertas = [(abierta, h) for abierta, h in self._abiertas if abierta is not registro]
+                self.etapas.append(registro)
+
+    def registrar_error(self, excepcion):
+        """Guarda el tipo, el mensaje y la traza de una excepción de la ejecución."""
+        self.error = {
+            "tipo": type(excepcion).__name__,
+            "mensaje": str(excepcion),
+            "traza": "".join(traceback.format_exception(type(excepcion), excepcion, excepcion.__traceback__)),
+        }
+
+    def resultado(self):
+        """
+        Returns:
+            dict: Datos de la ejecución con la lista de etapas en orden de finalización.
+        """
+        duracion = self._duracion
+        if duracion is None and self._inicio_reloj is not None:
+            duracion = time.perf_counter() - self._inicio_reloj
+        with self._lock:
+            etapas = [dict(registro) for registro in self.etapas]
+        return {
+            "ejecucion": self.nombre,
+            "inicio": self._inicio,
+            "segundos": duracion,
+            "pid": os.getpid(),
+            "etapas": etapas,
+            "error": self.error,
+        }
+
+    def guardar_json(self, ruta):
+        """Escribe el resultado de la ejecución en un archivo JSON."""
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.resultado(), f, ensure_ascii=False, indent=2)
+        print(f"Perfil de la ejecución guardado en {ruta}")
+
+    def resumen(self):
+        """Imprime una línea por etapa con su tiempo, CPU, pico de memoria y contadores."""
+        base = {"etapa", "inicio_s", "segundos", "cpu_s", "cpu_proceso_s", "cpu_hijos_s", "concurrente",
+                "rss_inicio_mb", "rss_fin_mb", "pico_rss_mb", "error"}
+        for registro in self.resultado()["etapas"]:
+            contadores = ", ".join(f"{k}={v}" for k, v in registro.items() if k not in base)
+            print(
+                f"{registro['etapa']}: {registro['segundos']:.2f} s, CPU {registro['cpu_s']:.2f} s, "
+                f"pico {registro['pico_rss_mb']:.0f} MB" + (f" ({contadores})" if contadores else "")
+            )
+
+
+@contextmanager
+def medir(nombre, **contadores):
+    """
+    Mide una etapa con el Perfilador activo. Si no hay ninguno, no mide nada y devuelve
+    un diccionario desechable, para que las funciones se puedan usar sin perfilador.
+    """
+    perfil = _perfil_activo.get()
+    if perfil is None:
+        yield dict(contadores)
+        return
+    with perfil.etapa(nombre, **contadores) as registro:
+        yield registro
@@ -1,54 +1,141 @@
 import unicodedata
 import re
+import os
+import json
 from urllib.parse import unquote
 
 
-def normalize_entity(texto):
-    diccionario = {
-        "Ronald Mcdonal": "Pennywise",
-        "Payaso": "Pennywise",
-        "Eso": "Pennywise",
-        "Bozo": "Pennywise",
-        "Clarabell": "Pennywise",
-        "IT": "Pennywise",
-        "El Tartaja": "Denbrough",
-        "Billestaba": "Bill",
-        "William Carlos Williams": "",  
-        "Georgie": "George",
-        "GGeorgie": "George",
-        "ben": "Ben",
-        "Bev": "Beverly", 
-        "Eds": "Eddie",
-        "Invierno": "Enero",
-        "Otoño": "Octubre",
-        "Primavera": "Abril",
-        "Verano": "Julio",
-        "Turtle": "Tortuga",
-        "John Wayne": "",
-        "Chet Huthley": "",
-        "Bruce Springsteen": "",
-        "Judas Priest": "",
-        "Kiss": "",
-        "Def Leppard": "",
-        "derry": "Derry",
-        "Dwight Eisenhower": "", 
-        "Richard Nixon": "",
-        "Ronald Reagan": "",
-        "George Bush": "",
-    }
-    patrones = map(re.escape, diccionario.keys())
-    patron_regex = r'\b(' + '|'.join(patrones) + r')\b'
+# Alias de personajes, lugares y fechas de "It" y su forma canónica.
+# Un valor vacío elimina la mención.
+ALIAS_IT = {
+    "Ronald Mcdonal": "Pennywise",
+    "Payaso": "Pennywise",
+    "Eso": "Pennywise",
+    "Bozo": "Pennywise",
+    "Clarabell": "Pennywise",
+    "IT": "Pennywise",
+    "El Tartaja": "Denbrough",
+    "Billestaba": "Bill",
+    "William Carlos Williams": "",  
+    "Georgie": "George",
+    "GGeorgie": "George",
+    "ben": "Ben",
+    "Bev": "Beverly", 
+    "Eds": "Eddie",
+    "Invierno": "Enero",
+    "Otoño": "Octubre",
+    "Primavera": "Abril",
+    "Verano": "Julio",
+    "Turtle": "Tortuga",
+    "John Wayne": "",
+    "Chet Huthley": "",
+    "Bruce Springsteen": "",
+    "Judas Priest": "",
+    "Kiss": "",
+    "Def Leppard": "",
+    "derry": "Derry",
+    "Dwight Eisenhower": "", 
+    "Richard Nixon": "",
+    "Ronald Reagan": "",
+    "George Bush": "",
+}
+
+
+def regex_trie(palabras):
+    """
+    Construye una expresión regular con forma de trie que reconoce cualquiera de las palabras.
+    Evita probar cada alternativa por separado en cada posición del texto.
+    """
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[""] = {}
 
-    def reemplazo(match):
-        palabra = match.group(0)
-        # Buscar en diccionario ignorando mayúsculas
-        for clave, valor in diccionario.items():
-            if palabra.lower() == clave.lower():
-                return valor
-        return palabra
+    def construir(nodo):
+        alternativas = [re.escape(c) + construir(hijo) for c, hijo in sorted(nodo.items()) if c]
+        if not alternativas:
+            return ""
+        cuerpo = alternativas[0] if len(alternativas) == 1 else "(?:" + "|".join(alternativas) + ")"
+        # Si aquí termina una palabra, el resto es opcional
+        return "(?:" + cuerpo + ")?" if "" in nodo else cuerpo
 
-    texto_modificado = re.sub(patron_regex, reemplazo, texto, flags=re.IGNORECASE)
-    return texto_modificado
+    return construir(trie)
+
+
+class NormalizadorAlias:
+    """
+    Sustituye alias por su forma canónica, sin distinguir mayúsculas de minúsculas.
+    La expresión regular se compila una sola vez al crear el objeto, así que puede
+    reutilizarse sobre libros completos o entidad a entidad.
+    Si dos alias se solapan en la misma posición, gana el más largo.
+    """
+
+    def __init__(self, alias):
+        # Diccionario con claves en minúsculas; ante claves repetidas gana la primera
+        self.alias = {}
+        for clave, valor in alias.items():
+            self.alias.setdefault(clave.lower(), valor)
+        self._patron = None
+        self._patron_ignorecase = None
+        if self.alias:
+            cuerpo = regex_trie(self.alias)
+            self._patron = re.compile(r'\b(?:' + cuerpo + r')\b')
+            self._patron_ignorecase = re.compile(r'\b(?:' + cuerpo + r')\b', flags=re.IGNORECASE)
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """
+        Crea un normalizador a partir de un archivo de alias, por libro o por universo:
+        - .json: objeto {"alias": "forma canónica", ...}
+        - cualquier otro: una línea por alias con el formato "alias<TAB>forma canónica".
+        """
+        with open(ruta, "r", encoding="utf-8") as f:
+            if str(ruta).endswith(".json"):
+                return cls(json.load(f))
+            alias = {}
+            for linea in f:
+                linea = linea.rstrip("\n")
+                if not linea.strip() or linea.startswith("#"):
+                    continue
+                clave, _, valor = linea.partition("\t")
+                alias[clave] = valor
+            return cls(alias)
+
+    def normalizar(self, texto):
+        if self._patron is None:
+            return texto
+        minusculas = texto.lower()
+        if len(minusculas) != len(texto):
+            # lower() ha cambiado la longitud (p. ej. 'İ'): buscar sobre el texto original
+            return self._patron_ignorecase.sub(lambda m: self.alias.get(m.group(0).lower(), m.group(0)), texto)
+        partes = []
+        posicion = 0
+        for match in self._patron.finditer(minusculas):
+            partes.append(texto[posicion:match.start()])
+            partes.append(self.alias[match.group(0)])
+            posicion = match.end()
+        if not partes:
+            return texto
+        partes.append(texto[posicion:])
+        return "".join(partes)
+
+    __call__ = normalizar
+
+
+NORMALIZADOR_IT = NormalizadorAlias(ALIAS_IT)
+
+
+def normalize_entity(texto, normalizador=None):
+    """
+    Sustituye los alias conocidos por su forma canónica.
+
+    Args:
+        texto (str): Texto o nombre de entidad a normalizar.
+        normalizador (NormalizadorAlias): Normalizador a usar. Por defecto, el de "It".
+    """
+    return (normalizador or NORMALIZADOR_IT).normalizar(texto)
 
 
 def normalizar_fecha(texto):
@@ -128,4 +215,23 @@ def limpiar_texto(texto: str) -> str:
     texto = re.sub(r'[^\w]', ' ', texto, flags=re.UNICODE)    
     #texto = unquote(texto)
     texto = texto.strip(" ")
-    return texto
\ No newline at end of file
+    return texto
+
+
+def memoria_rss():
+    """
+    Devuelve la memoria residente (RSS) actual del proceso en bytes.
+    Usa psutil si está instalado; si no, lee /proc/self/statm y, como último recurso,
+    el pico de memoria que informa resource.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
\ No newline at end of file
@@ -1,61 +1,29 @@
 import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-import re
-import unicodedata
-from src.common.util import normalize_entity
+import os
+import time
+from src.extraction.text_cleaner import clean_text_fast
+from src.common.profiling import medir
 
 
 
-def clean_extracted_text(text: str) -> str:
+def clean_extracted_text(text: str, normalizador=None) -> str:
     """
     Limpia y normaliza el texto extraído del PDF,
     eliminando caracteres especiales específicos en todo el texto.
 
+    Usa el limpiador compilado de text_cleaner, que produce el mismo resultado que la
+    cadena original de expresiones regulares (clean_text_legacy) en menos pasadas.
+
     Args:
         text (str): Texto extraído sin procesar.
+        normalizador (NormalizadorAlias): Alias del libro. Por defecto, los de "It".
 
     Returns:
         str: Texto limpio y normalizado.
     """
-    # Definir patrón para letras ASCII + letras con tilde + ñ + números + coma, punto y espacios
-    # Usamos rangos Unicode para vocales acentuadas y ñ
-    patron = r'[^a-zA-Z0-9áéíóúÁÉÍÓÚñÑ,.\s]'
-    
-    text = re.sub(patron, ' ', text)
-
-    # 1. Reemplazar saltos de línea múltiples por espacio
-    text = re.sub(r'\n+', ' ', text)
-    
-    # 2. Reemplazar múltiples puntos consecutivos por un solo punto
-    text = re.sub(r'\.{2,}', ' ', text)
-    
-    # 3. Reemplazar múltiples comas consecutivas por una sola coma
-    text = re.sub(r',{2,}', ' ', text)
-    
-    # 5. Eliminar letras sueltas (palabras de un solo carácter)
-    text = re.sub(r'\b[a-zA-Z]\b', ' ', text)
-    
-    # 6. Eliminar espacios múltiples y dejar solo uno
-    text = re.sub(r'\s+', ' ', text)
-
-    # Patrón que detecta palabras repetidas consecutivas (ignorando mayúsculas/minúsculas)
-    patron  = re.compile(r'\b(\w+)( \1\b)+', flags=re.IGNORECASE)    
-    # Función para reemplazar las repeticiones por una sola palabra
-    while True:
-        nuevo_texto = patron .sub(r'\1', text)
-        if nuevo_texto == text:
-            break
-        text = nuevo_texto
-        
-    # 8. Opcional: eliminar espacios al inicio y final
-    text = ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
-
-    text = normalize_entity(text)
-
-    return text.strip()
+    return clean_text_fast(text, normalizador)
 
 def extract_texts_from_folder(folder_path):
     texts = {}
@@ -63,23 +31,149 @@ def extract_texts_from_folder(folder_path):
         texts[pdf.name] = extract_text_from_pdf(pdf)
     return texts
 
-def extract_text_from_pdf(pdf_path, skip_pages=2):
+def _procesar_libro(pdf_path, output_dir, skip_pages):
+    """
+    Extrae y limpia un libro, lo escribe en output_dir/<nombre>.txt y devuelve sus
+    métricas. El texto no se devuelve al proceso principal.
+    """
+    inicio = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        paginas = max(0, len(doc) - skip_pages)
+    texto = extract_text_from_pdf(pdf_path, skip_pages)
+    destino = Path(output_dir) / f"{Path(pdf_path).stem}.txt"
+    with open(destino, "w", encoding="utf-8") as f:
+        f.write(texto)
+    segundos = time.perf_counter() - inicio
+    megabytes = os.path.getsize(pdf_path) / (1024 * 1024)
+    return {
+        "salida": str(destino),
+        "paginas": paginas,
+        "segundos": segundos,
+        "paginas_por_s": paginas / segundos if segundos > 0 else 0.0,
+        "mb_por_s": megabytes / segundos if segundos > 0 else 0.0,
+    }
+
+def extract_corpus(folder_path, output_dir="data/processed", max_workers=None, max_en_memoria=None, skip_pages=2):
+    """
+    Extrae en paralelo todos los PDF de una carpeta. Cada libro se limpia y se escribe en
+    output_dir/<nombre>.txt en cuanto termina, sin acumular los textos en memoria.
+
+    Args:
+        folder_path (str): Carpeta con los PDF.
+        output_dir (str): Carpeta donde se escriben los textos limpios.
+        max_workers (int): Número de procesos. Por defecto, el número de núcleos.
+        max_en_memoria (int): Máximo de libros en proceso a la vez (y por tanto de textos
+                              completos en memoria). Por defecto, igual a max_workers.
+        skip_pages (int): Número de páginas a omitir al inicio de cada libro.
+
+    Returns:
+        dict: {nombre_pdf: {"salida", "paginas", "segundos", "paginas_por_s", "mb_por_s"}}
+              para los libros procesados correctamente.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    pdfs = sorted(Path(folder_path).glob("*.pdf"))
+    max_workers = max_workers or os.cpu_count() or 1
+    max_en_memoria = max_en_memoria or max_workers
+
+    estadisticas = {}
+    pendientes = {}
+    restantes = iter(pdfs)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # Mantener como mucho max_en_memoria libros en proceso
+            for pdf in restantes:
+                futuro = executor.submit(_procesar_libro, str(pdf), output_dir, skip_pages)
+                pendientes[futuro] = pdf.name
+                if len(pendientes) >= max_en_memoria:
+                    break
+            if not pendientes:
+                break
+            terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                nombre = pendientes.pop(futuro)
+                try:
+                    stats = futuro.result()
+                except Exception as e:
+                    print(f"Error al procesar {nombre}: {e}")
+                    continue
+                estadisticas[nombre] = stats
+                print(f"{nombre}: {stats['paginas']} páginas en {stats['segundos']:.1f} s "
+                      f"({stats['paginas_por_s']:.1f} pág/s, {stats['mb_por_s']:.2f} MB/s)")
+    return estadisticas
+
+def _extraer_rango_paginas(pdf_path, inicio, fin):
+    """
+    Extrae el texto de las páginas [inicio, fin) abriendo su propio documento,
+    de modo que pueda ejecutarse en un proceso independiente.
+    """
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(inicio, fin)]
+
+def _rangos_de_paginas(inicio, fin, n_rangos):
+    """Divide [inicio, fin) en n_rangos rangos contiguos de tamaño similar."""
+    total = max(0, fin - inicio)
+    n_rangos = max(1, min(n_rangos, total))
+    tamano, resto = divmod(total, n_rangos)
+    rangos = []
+    for i in range(n_rangos):
+        fin_rango = inicio + tamano + (1 if i < resto else 0)
+        rangos.append((inicio, fin_rango))
+        inicio = fin_rango
+    return rangos
+
+def iter_text_from_pdf(pdf_path, skip_pages=2, n_workers=1, limpiar=False):
+    """
+    Genera el texto de un PDF página a página, para que las etapas siguientes puedan
+    empezar antes de que se haya leído la última página.
+
+    Args:
+    - pdf_path (str): La ruta al archivo PDF.
+    - skip_pages (int): Número de páginas a omitir desde el inicio. Por defecto son 2.
+    - n_workers (int): Si es mayor que 1, las páginas se reparten en rangos entre un pool
+      de procesos (cada uno abre su propio documento); se siguen entregando en orden.
+    - limpiar (bool): Si es True, aplica clean_extracted_text a cada página por separado.
+      Los cortes de página pueden hacer que el resultado difiera mínimamente de limpiar
+      el libro completo.
+
+    Yields:
+    - str: El texto de cada página.
+    """
+    if n_workers <= 1:
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(skip_pages, len(doc)):
+                page_text = doc[page_num].get_text()
+                yield clean_extracted_text(page_text) if limpiar else page_text
+        return
+
+    with fitz.open(pdf_path) as doc:
+        total_paginas = len(doc)
+    # Más rangos que workers para repartir mejor la carga entre páginas de distinto tamaño
+    rangos = _rangos_de_paginas(skip_pages, total_paginas, n_workers * 4)
+    inicios = [inicio for inicio, _ in rangos]
+    fines = [fin for _, fin in rangos]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for paginas in executor.map(_extraer_rango_paginas, [pdf_path] * len(rangos), inicios, fines):
+            for page_text in paginas:
+                yield clean_extracted_text(page_text) if limpiar else page_text
+
+def extract_text_from_pdf(pdf_path, skip_pages=2, n_workers=1):
     """
     Extrae el texto de un archivo PDF usando PyMuPDF, omitiendo las primeras páginas.
     
     Args:
     - pdf_path (str): La ruta al archivo PDF.
     - skip_pages (int): Número de páginas a omitir desde el inicio. Por defecto son 2.
+    - n_workers (int): Número de procesos entre los que repartir las páginas. Por defecto 1.
     
     Returns:
     - str: El texto extraído del PDF limpio.
     """
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page_num in range(skip_pages, len(doc)):
-        page = doc[page_num]
-        text += page.get_text()
-    
-    return clean_extracted_text(text)
-
-
+    with medir("extraccion") as etapa:
+        paginas = list(iter_text_from_pdf(pdf_path, skip_pages, n_workers=n_workers))
+        text = "".join(paginas)
+        etapa["paginas"] = len(paginas)
+        etapa["caracteres"] = len(text)
+    with medir("limpieza") as etapa:
+        limpio = clean_extracted_text(text)
+        etapa["caracteres"] = len(limpio)
+    return limpio
@@ -0,0 +1,87 @@
+import re
+import unicodedata
+from src.common.util import normalize_entity
+
+
+# Paso 1: cualquier racha de caracteres no permitidos (incluidos los espacios en blanco)
+# se reduce a un único espacio. Equivale al filtro de caracteres, al reemplazo de saltos
+# de línea y al colapso de espacios de clean_text_legacy.
+_PATRON_NO_PERMITIDOS = re.compile(r'[^a-zA-Z0-9áéíóúÁÉÍÓÚñÑ,.]+')
+
+# Paso 2: puntos o comas repetidos y letras sueltas, junto con el espacio que los rodea,
+# se sustituyen por un único espacio en una sola pasada.
+_PATRON_RUIDO = re.compile(r'(?: ?(?:\.{2,}|,{2,}|\b[a-zA-Z]\b))+ ?')
+
+# Paso 3: palabras repetidas consecutivas (ignorando mayúsculas/minúsculas).
+# Una sola pasada basta: el '+' absorbe toda la racha y el reemplazo no puede formar
+# una racha nueva con la palabra anterior, que ya habría iniciado la coincidencia.
+_PATRON_REPETIDAS = re.compile(r'\b(\w+)( \1\b)+', flags=re.IGNORECASE)
+
+# Paso 4: tras el paso 1 solo quedan estas letras con diacríticos
+_TABLA_DIACRITICOS = str.maketrans("áéíóúÁÉÍÓÚñÑ", "aeiouAEIOUnN")
+
+
+def clean_text_fast(text: str, normalizador=None) -> str:
+    """
+    Limpia el texto extraído del PDF con el mínimo de pasadas sobre el texto.
+    El resultado es idéntico al de clean_text_legacy.
+
+    Args:
+        text (str): Texto extraído sin procesar.
+        normalizador (NormalizadorAlias): Alias del libro. Por defecto, los de "It".
+
+    Returns:
+        str: Texto limpio y normalizado.
+    """
+    text = _PATRON_NO_PERMITIDOS.sub(' ', text)
+    text = _PATRON_RUIDO.sub(' ', text)
+    text = _PATRON_REPETIDAS.sub(r'\1', text)
+    text = text.translate(_TABLA_DIACRITICOS)
+    text = normalize_entity(text, normalizador)
+    return text.strip()
+
+
+def clean_text_legacy(text: str) -> str:
+    """
+    Implementación original de la limpieza, paso a paso. Se conserva como referencia
+    para comprobar la equivalencia y para los benchmarks.
+    """
+    # Definir patrón para letras ASCII + letras con tilde + ñ + números + coma, punto y espacios
+    # Usamos rangos Unicode para vocales acentuadas y ñ
+    patron = r'[^a-zA-Z0-9áéíóúÁÉÍÓÚñÑ,.\s]'
+
+    text = re.sub(patron, ' ', text)
+
+    # 1. Reemplazar saltos de línea múltiples por espacio
+    text = re.sub(r'\n+', ' ', text)
+
+    # 2. Reemplazar múltiples puntos consecutivos por un solo punto
+    text = re.sub(r'\.{2,}', ' ', text)
+
+    # 3. Reemplazar múltiples comas consecutivas por una sola coma
+    text = re.sub(r',{2,}', ' ', text)
+
+    # 5. Eliminar letras sueltas (palabras de un solo carácter)
+    text = re.sub(r'\b[a-zA-Z]\b', ' ', text)
+
+    # 6. Eliminar espacios múltiples y dejar solo uno
+    text = re.sub(r'\s+', ' ', text)
+
+    # Patrón que detecta palabras repetidas consecutivas (ignorando mayúsculas/minúsculas)
+    patron  = re.compile(r'\b(\w+)( \1\b)+', flags=re.IGNORECASE)
+    # Función para reemplazar las repeticiones por una sola palabra
+    while True:
+        nuevo_texto = patron .sub(r'\1', text)
+        if nuevo_texto == text:
+            break
+        text = nuevo_texto
+
+    # 8. Opcional: eliminar espacios al inicio y final
+    text = ''.join(
+        c for c in unicodedata.normalize('NFD', text)
+        if unicodedata.category(c) != 'Mn'
+    )
+
+    text = normalize_entity(text)
+
+    return text.strip()
@@ -0,0 +1,181 @@
+import re
+from collections import Counter, namedtuple
+
+
+# Fragmento de texto listo para el modelo.
+# inicio/fin son posiciones en el texto original; inicio_nuevo marca dónde termina la parte
+# repetida del fragmento anterior (solapamiento) y empieza el contenido nuevo.
+Chunk = namedtuple("Chunk", ["texto", "inicio", "fin", "inicio_nuevo"])
+
+# Una oración empieza en un carácter no blanco y llega hasta el siguiente signo de cierre
+_PATRON_ORACION = re.compile(r'\S[^.!?]*(?:[.!?]+|$)')
+_PATRON_PALABRA = re.compile(r'\S+')
+
+# Ventana máxima de los modelos BERT, sin contar [CLS] y [SEP]
+MAX_TOKENS_BERT = 510
+
+
+def dividir_en_oraciones(texto):
+    """
+    Divide el texto en oraciones.
+
+    Returns:
+        list: Lista de tuplas (inicio, fin) con la posición de cada oración en el texto.
+    """
+    spans = []
+    for match in _PATRON_ORACION.finditer(texto):
+        inicio, fin = match.span()
+        # No incluir los espacios finales en la oración
+        while fin > inicio and texto[fin - 1].isspace():
+            fin -= 1
+        spans.append((inicio, fin))
+    return spans
+
+
+def contador_de_tokens(*tokenizers):
+    """
+    Crea una función que cuenta los tokens de una lista de textos con los tokenizers de
+    los modelos. Si hay varios, cuenta con el que más tokens produce, de modo que el
+    fragmento quepa en la ventana de todos ellos. Sin tokenizers, cuenta palabras.
+
+    Returns:
+        callable: Función list[str] -> list[int].
+    """
+    def contar(textos):
+        if not textos:
+            return []
+        if not tokenizers:
+            return [len(texto.split()) for texto in textos]
+        conteos = [0] * len(textos)
+        for tokenizer in tokenizers:
+            ids = tokenizer(list(textos), add_special_tokens=False)["input_ids"]
+            conteos = [max(actual, len(tokens)) for actual, tokens in zip(conteos, ids)]
+        return conteos
+    return contar
+
+
+def max_tokens_de(*tokenizers):
+    """
+    Devuelve el número máximo de tokens de texto que admiten todos los tokenizers,
+    descontando los tokens especiales que añade cada modelo.
+    """
+    maximos = [
+        min(tokenizer.model_max_length, MAX_TOKENS_BERT + 2) - tokenizer.num_special_tokens_to_add()
+        for tokenizer in tokenizers
+    ]
+    return min(maximos) if maximos else MAX_TOKENS_BERT
+
+
+def _partir_oracion_larga(texto, inicio, fin, contar_tokens, max_tokens):
+    """Parte por palabras una oración que no cabe en la ventana del modelo."""
+    palabras = [(inicio + m.start(), inicio + m.end()) for m in _PATRON_PALABRA.finditer(texto[inicio:fin])]
+    conteos = contar_tokens([texto[i:f] for i, f in palabras])
+    partes = []
+    parte_inicio, parte_fin, tokens = None, None, 0
+    for (i, f), n in zip(palabras, conteos):
+        if parte_inicio is not None and tokens + n > max_tokens:
+            partes.append((parte_inicio, parte_fin, tokens))
+            parte_inicio, tokens = None, 0
+        if parte_inicio is None:
+            parte_inicio = i
+        parte_fin = f
+        tokens += n
+    if parte_inicio is not None:
+        partes.append((parte_inicio, parte_fin, tokens))
+    return partes
+
+
+def generar_chunks(texto, contar_tokens, max_tokens=MAX_TOKENS_BERT, solapamiento=1):
+    """
+    Divide el texto en fragmentos que respetan los límites de oración y caben en la
+    ventana del modelo, medida en tokens del propio tokenizer.
+
+    Args:
+        texto (str): Texto completo.
+        contar_tokens (callable): Función list[str] -> list[int] (ver contador_de_tokens).
+        max_tokens (int): Máximo de tokens por fragmento.
+        solapamiento (int): Número de oraciones finales de cada fragmento que se repiten al
+                            principio del siguiente, para no perder entidades en los cortes.
+
+    Returns:
+        list: Lista de Chunk.
+    """
+    spans = dividir_en_oraciones(texto)
+    conteos = contar_tokens([texto[i:f] for i, f in spans])
+
+    # Oraciones con su número de tokens; las que no caben se parten por palabras
+    oraciones = []
+    for (inicio, fin), n in zip(spans, conteos):
+        if n > max_tokens:
+            oraciones.extend(_partir_oracion_larga(texto, inicio, fin, contar_tokens, max_tokens))
+        else:
+            oraciones.append((inicio, fin, n))
+
+    chunks = []
+    actual = []  # índices de las oraciones del fragmento en construcción
+    tokens = 0
+    primera_nueva = 0
+    for idx, (_, _, n) in enumerate(oraciones):
+        if actual and tokens + n > max_tokens and idx > primera_nueva:
+            chunks.append(_crear_chunk(texto, oraciones, actual, primera_nueva))
+            # Repetir las últimas oraciones mientras quede sitio para la nueva
+            repetidas = actual[len(actual) - solapamiento:] if solapamiento > 0 else []
+            while repetidas and sum(oraciones[i][2] for i in repetidas) + n > max_tokens:
+                repetidas = repetidas[1:]
+            actual = list(repetidas)
+            tokens = sum(oraciones[i][2] for i in actual)
+            primera_nueva = idx
+        actual.append(idx)
+        tokens += n
+    if actual:
+        chunks.append(_crear_chunk(texto, oraciones, actual, primera_nueva))
+    return chunks
+
+
+def _crear_chunk(texto, oraciones, indices, primera_nueva):
+    inicio = oraciones[indices[0]][0]
+    fin = oraciones[indices[-1]][1]
+    inicio_nuevo = oraciones[primera_nueva][0]
+    return Chunk(texto[inicio:fin], inicio, fin, inicio_nuevo)
+
+
+def deduplicar_solapamiento(chunks, entidades_por_chunk):
+    """
+    Elimina las entidades que se contarían dos veces por aparecer en la zona solapada
+    entre un fragmento y el anterior.
+
+    Una mención que empieza en la parte repetida del fragmento se descarta si el fragmento
+    anterior encontró la misma entidad en esa parte (tantas veces como allí). Se comparan
+    las posiciones de las menciones, no su texto, así que también se deduplican las
+    fechas, cuyo valor normalizado no aparece en el texto. Las menciones sin posición
+    (None) se conservan.
+
+    Args:
+        chunks (list): Lista de Chunk devuelta por generar_chunks.
+        entidades_por_chunk (list): Lista de listas de tuplas (texto_entidad, etiqueta, inicio),
+                                    con inicio relativo al fragmento (extract_entities_batch
+                                    con posiciones=True).
+
+    Returns:
+        list: Lista de listas de entidades sin los duplicados del solapamiento.
+    """
+    resultado = []
+    anterior = None
+    for chunk, entidades in zip(chunks, entidades_por_chunk):
+        # Menciones del fragmento anterior que caen en la parte repetida de este
+        disponibles = Counter()
+        if anterior is not None:
+            chunk_anterior, entidades_anteriores = anterior
+            for texto, etiqueta, inicio in entidades_anteriores:
+                if inicio is not None and chunk.inicio <= chunk_anterior.inicio + inicio < chunk.inicio_nuevo:
+                    disponibles[(texto, etiqueta)] += 1
+        filtradas = []
+        for entidad in entidades:
+            texto, etiqueta, inicio = entidad
+            if inicio is not None and chunk.inicio + inicio < chunk.inicio_nuevo and disponibles[(texto, etiqueta)] > 0:
+                disponibles[(texto, etiqueta)] -= 1
+                continue
+            filtradas.append(entidad)
+        resultado.append(filtradas)
+        anterior = (chunk, entidades)
+    return resultado
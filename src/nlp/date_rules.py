@@ -0,0 +1,86 @@
+import re
+
+
+# Al modificar las reglas, cambiar su identificador en model_registry.IDENTIFICADORES
+# para invalidar la caché de entidades
+
+# Piezas de las reglas. Admiten el texto con y sin tildes, porque clean_extracted_text
+# las quita (y sustituye las estaciones por su mes, ver ALIAS_IT).
+_ANIO = r"(?:19|20)\d{2}"
+_MES = r"(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|diciembre)"
+_ESTACION = r"(?:invierno|oto[ñn]o|primavera|verano)"
+_DIA_SEMANA = r"(?:lunes|martes|mi[ée]rcoles|jueves|viernes|s[áa]bado|domingo)"
+_DECADA = r"(?:veinte|treinta|cuarenta|cincuenta|sesenta|setenta|ochenta|noventa)"
+_FIESTA = (
+    r"(?:navidad(?:es)?|nochebuena|nochevieja|a[ñn]o\s+nuevo|pascua|halloween"
+    r"|d[ií]a\s+de\s+acci[óo]n\s+de\s+gracias|d[ií]a\s+de\s+los\s+ca[íi]dos|d[ií]a\s+de\s+la\s+independencia)"
+)
+_CANTIDAD = r"(?:\d+|un|una|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez|veinte|treinta|muchos|muchas|unos|unas|pocos|pocas)"
+_RELATIVA = (
+    r"(?:anteayer|ayer|anoche|hoy|pasado\s+ma[ñn]ana"
+    r"|semana\s+(?:pasada|pr[óo]xima|siguiente|que\s+viene)"
+    r"|(?:a[ñn]o|mes)\s+(?:pasado|pr[óo]ximo|siguiente|que\s+viene)"
+    r"|hace\s+" + _CANTIDAD + r"\s+(?:d[ií]as|semanas|meses|a[ñn]os))"
+)
+
+# Reglas de la más específica a la más general: en una alternancia gana la primera que
+# encaja en cada posición, así que "3 de mayo de 1958" no se parte en "mayo" y "1958"
+_REGLAS = [
+    # (el lunes) 3 de mayo (de 1958)
+    r"(?:" + _DIA_SEMANA + r",?\s+)?\d{1,2}\s+de\s+" + _MES + r"(?:\s+de(?:l)?\s+" + _ANIO + r")?",
+    # mayo de 1958, verano de 1958, Navidad de 1957
+    r"(?:" + _MES + r"|" + _ESTACION + r"|" + _FIESTA + r")\s+de(?:l)?\s+" + _ANIO,
+    # los años cincuenta
+    r"(?:los\s+)?a[ñn]os\s+" + _DECADA,
+    _FIESTA,
+    _RELATIVA,
+    _MES,
+    _ESTACION,
+    _DIA_SEMANA,
+    # Años sueltos, sin formar parte de un número más largo (1958, no 19580 ni 1.958)
+    r"(?<![\d.,])" + _ANIO + r"(?![\d.,]\d)",
+]
+
+# Letras con las que empieza alguna regla: la búsqueda descarta el resto de posiciones
+# sin probar cada alternativa
+_INICIALES = r"[0-9adefhijlmnopsv]"
+
+# Se aplica sobre el texto en minúsculas, más rápido que con re.IGNORECASE (con las
+# iniciales, unas 6 veces más rápido sobre un libro entero)
+PATRON_FECHA = re.compile(r"\b(?=" + _INICIALES + r")(?:" + "|".join(_REGLAS) + r")\b")
+
+
+class ReconocedorFechas:
+    """
+    Reconocedor de fechas por reglas (expresiones regulares compiladas una vez), para
+    sustituir a los modelos de spaCy cuando solo se usan para las entidades DATE.
+
+    Reconoce años de 1900 a 2099, meses, estaciones, días de la semana, décadas, fiestas
+    y expresiones relativas frecuentes en español ("ayer", "la semana pasada", "hace dos
+    años"...). Las menciones tienen el mismo formato que las de src.nlp.ner_fusion, así
+    que se normalizan igual que las de spaCy (limpiar_texto + normalizar_fecha).
+    """
+
+    def __init__(self, patron=PATRON_FECHA):
+        self.patron = patron
+
+    def menciones(self, texto):
+        """
+        Returns:
+            list: Dicts con entity_group ("DATE"), word (tal como aparece en el texto),
+                  score, start y end.
+        """
+        minusculas = texto.lower()
+        if len(minusculas) != len(texto):
+            # lower() ha cambiado la longitud (p. ej. 'İ'): los offsets no coincidirían
+            matches = re.finditer(self.patron.pattern, texto, flags=re.IGNORECASE)
+        else:
+            matches = self.patron.finditer(minusculas)
+        return [
+            {"entity_group": "DATE", "word": texto[m.start():m.end()], "score": 1.0, "start": m.start(), "end": m.end()}
+            for m in matches
+        ]
+
+    def menciones_lote(self, textos):
+        """menciones() de cada texto, en el mismo orden."""
+        return [self.menciones(texto) for texto in textos]
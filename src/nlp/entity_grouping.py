@@ -0,0 +1,112 @@
+from collections import Counter
+import numpy as np
+from rapidfuzz import process, fuzz
+from src.common.util import normalizar_texto
+
+
+def claves_de_bloqueo(texto, longitud_prefijo=3):
+    """
+    Claves de bloqueo de un nombre: el prefijo del nombre completo y el de cada palabra.
+    Solo se comparan entre sí los nombres que comparten al menos una clave.
+    """
+    forma = normalizar_texto(texto)
+    claves = {"n:" + forma[:longitud_prefijo]}
+    for palabra in forma.split():
+        if len(palabra) >= longitud_prefijo:
+            claves.add("p:" + palabra[:longitud_prefijo])
+    return claves
+
+
+def agrupar_entidades_indexado(entities, umbral=25, min_conteo=2, max_bloque=2000):
+    """
+    Agrupa entidades similares como agrupar_entidades_similares, pero en tiempo casi lineal
+    y con un resultado que no depende del orden de entrada.
+
+    1) Cuenta los pares (texto, etiqueta) idénticos y trabaja con los únicos, en un orden
+       canónico por etiqueta: más menciones primero, después más cortos, después
+       alfabético.
+    2) Reparte los nombres en bloques por prefijo del nombre y de sus palabras, y dentro
+       de cada bloque calcula las similitudes con process.cdist (fuzz.ratio).
+    3) Recorre los nombres en el orden canónico: cada uno se une a la cabeza de grupo con
+       la que comparte bloque y tiene mayor similitud >= umbral, o abre un grupo. Solo
+       cuenta la similitud con la cabeza, así que los grupos no se encadenan a través de
+       nombres intermedios.
+
+    Args:
+        entities (list): Lista de tuplas (nombre_entidad, etiqueta).
+        umbral (int): Porcentaje mínimo de similitud para agrupar (0-100).
+        min_conteo (int): Número mínimo de menciones para conservar un grupo.
+        max_bloque (int): Filas de la matriz de similitud calculadas de una vez.
+
+    Returns:
+        list: Lista de tuplas (entidad_representante, etiqueta), por etiqueta y en el orden
+              canónico de las cabezas de grupo, donde el representante es el nombre más
+              corto del grupo (el primero en el orden canónico, en caso de empate).
+    """
+    conteos = Counter(entities)
+
+    por_etiqueta = {}
+    for texto, etiqueta in conteos:
+        por_etiqueta.setdefault(etiqueta, []).append(texto)
+
+    entidades_agrupadas = []
+    for etiqueta in sorted(por_etiqueta):
+        textos = sorted(por_etiqueta[etiqueta], key=lambda t: (-conteos[(t, etiqueta)], len(t), t))
+
+        bloques = {}
+        for i, texto in enumerate(textos):
+            for clave in claves_de_bloqueo(texto):
+                bloques.setdefault(clave, []).append(i)
+
+        # Pares (nombre, nombre anterior en el orden canónico) con similitud >= umbral
+        nombres_par, anteriores_par, scores_par = [], [], []
+        for indices in bloques.values():
+            if len(indices) < 2:
+                continue
+            indices = np.asarray(indices)
+            nombres = [textos[i] for i in indices]
+            for desde in range(1, len(nombres), max_bloque):
+                hasta = min(desde + max_bloque, len(nombres))
+                # Cada fila solo se compara con los nombres anteriores del bloque
+                scores = process.cdist(
+                    nombres[desde:hasta], nombres[:hasta - 1],
+                    scorer=fuzz.ratio, score_cutoff=umbral, dtype=np.float32,
+                    # En bloques pequeños no compensa repartir las filas entre hilos
+                    workers=-1 if hasta - desde > 64 else 1,
+                )
+                filas, columnas = np.nonzero(scores >= umbral)
+                previas = columnas < desde + filas
+                filas, columnas = filas[previas], columnas[previas]
+                nombres_par.append(indices[desde + filas])
+                anteriores_par.append(indices[columnas])
+                scores_par.append(scores[filas, columnas])
+
+        # Candidatos de cada nombre de más a menos parecido (y, en caso de empate, en el
+        # orden canónico), contiguos: los de i están en candidatos[inicios[i]:inicios[i + 1]]
+        if nombres_par:
+            nombres_par, anteriores_par = np.concatenate(nombres_par), np.concatenate(anteriores_par)
+            orden = np.lexsort((anteriores_par, -np.concatenate(scores_par), nombres_par))
+            candidatos = anteriores_par[orden]
+            inicios = np.searchsorted(nombres_par[orden], np.arange(len(textos) + 1))
+        else:
+            candidatos, inicios = np.empty(0, dtype=np.intp), np.zeros(len(textos) + 1, dtype=np.intp)
+
+        es_cabeza = np.zeros(len(textos), dtype=bool)
+        grupos = {}
+        for i in range(len(textos)):
+            cabezas = candidatos[inicios[i]:inicios[i + 1]]
+            cabezas = cabezas[es_cabeza[cabezas]]
+            if len(cabezas):
+                grupos[cabezas[0]].append(i)
+            else:
+                es_cabeza[i] = True
+                grupos[i] = [i]
+
+        for miembros in grupos.values():
+            conteo = sum(conteos[(textos[i], etiqueta)] for i in miembros)
+            if conteo < min_conteo:
+                continue
+            representante = min(miembros, key=lambda i: (len(textos[i]), i))
+            entidades_agrupadas.append((textos[representante], etiqueta))
+
+    return entidades_agrupadas
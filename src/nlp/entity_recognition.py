@@ -1,20 +1,28 @@
-import spacy
 from collections import Counter
 from src.common.util import normalizar_fecha,limpiar_texto
-from spacy.tokens import Token
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification, pipeline
-from sklearn.cluster import KMeans
-import numpy as np
-from collections import Counter
+from src.common.profiling import medir
+from src.nlp.model_registry import (
+    obtener_modelo, modelo_cargado, nombre_con_backend, nombre_tokenizer, IDENTIFICADORES,
+    BETO, BERT_MULTILINGUE, SPACY_EN, SPACY_ES, FECHAS_REGLAS,
+)
+from src.nlp.frequency_tiers import agrupar_por_niveles
 from rapidfuzz import fuzz
 
 
+# Reconocedores que usa extract_entities si no se indica otra cosa.
+# Los modelos se cargan en el primer uso a través de model_registry.
+RECONOCEDORES_HF = (BETO, BERT_MULTILINGUE)
+RECONOCEDORES_FECHA = (SPACY_EN, SPACY_ES)
+RECONOCEDORES = RECONOCEDORES_HF + RECONOCEDORES_FECHA
+# Alternativa a spaCy para las fechas, por reglas (ver src.nlp.date_rules)
+RECONOCEDORES_REGLAS = (FECHAS_REGLAS,)
+RECONOCEDORES_DISPONIBLES = RECONOCEDORES + RECONOCEDORES_REGLAS
+
+# Cómo se extraen las fechas: con los modelos de spaCy o con las reglas
+FECHAS = ("spacy", "reglas")
 
-# Inicializar pipeline de NER con modelo preentrenado
-nlp_hf = pipeline("ner", model="Davlan/bert-base-multilingual-cased-ner-hrl", aggregation_strategy="first", device=-1)  # Cambia a -1 si no tienes GPU
-# Cargar modelo transformer avanzado  
-nlp_en_core_web_trf = spacy.load("en_core_web_trf")  
-nlp_es_core_news_sm= spacy.load("es_core_news_sm") #
+# Cambiar al modificar el post-procesado de entidades, para invalidar la caché
+VERSION_ENTIDADES = "2"
 
 # Diccionario para mapear etiquetas spaCy a categorías propias
 ETIQUETA_MAPA = {
@@ -73,65 +81,41 @@ def agrupar_entidades_similares(entities, umbral=25):
     return entidades_filtradas
 
 
-# Cargar tokenizer y modelo fine-tuned BETO para NER
-model_name = "ifis/BETO-finetuned-ner-3"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForTokenClassification.from_pretrained(model_name)
-
-# Crear pipeline de NER con agregación simple para obtener entidades completas
-ner_pipeline = pipeline(
-    "ner",
-    model=model,
-    tokenizer=tokenizer,
-    aggregation_strategy="first",
-    device=-1  # Cambia a -1 si no tienes GPU
-)
-
-def cluster_entidades_por_frecuencia(entidades, n_clusters=3):
+def cluster_entidades_por_frecuencia(entidades, n_clusters=3, metodo="kmeans"):
     """
     Agrupa entidades en clusters según su frecuencia de aparición.
+
+    Usa k-means 1-D exacto sobre las frecuencias distintas (ver src.nlp.frequency_tiers),
+    así que sirve también para millones de menciones de todo un corpus.
     
     Args:
         entidades (list): Lista de entidades (ej: ["Entity1", "Entity2", ...]).
         n_clusters (int): Número de grupos a crear (ej: alto, medio, bajo).
+        metodo (str): "kmeans" o "cuantiles".
         
     Returns:
-        dict: Diccionario con {cluster_id: lista_de_entidades}.
+        dict: Diccionario con {cluster_id: lista_de_entidades}, del cluster de mayor
+              frecuencia media (0) al de menor.
     """
     # Contar frecuencias
     contador = Counter(entidades)
-    entidades_unicas = list(contador.keys())
-    frecuencias = np.array([contador[e] for e in entidades_unicas]).reshape(-1, 1)
-    
-    # Clustering por frecuencia
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    clusters = kmeans.fit_predict(frecuencias)
-    
-    # Agrupar entidades por cluster
-    grupos = {}
-    for idx, cluster_id in enumerate(clusters):
-        if cluster_id not in grupos:
-            grupos[cluster_id] = []
-        grupos[cluster_id].append((entidades_unicas[idx], contador[entidades_unicas[idx]]))
-    
-    # Ordenar clusters por frecuencia promedio (de mayor a menor)
-    grupos_ordenados = {
-        k: sorted(v, key=lambda x: x[1], reverse=True)
-        for k, v in sorted(grupos.items(), key=lambda x: -np.mean([freq for _, freq in x[1]]))
-    }
-    
-    return grupos_ordenados
+    grupos = agrupar_por_niveles(list(contador.keys()), list(contador.values()), n_clusters, metodo)
 
-def cluster_entidades_por_categoria_y_frecuencia(entities, n_clusters=3):
+    # Dentro de cada cluster, de mayor a menor frecuencia
+    return {k: sorted(v, key=lambda x: x[1], reverse=True) for k, v in grupos.items()}
+
+def cluster_entidades_por_categoria_y_frecuencia(entities, n_clusters=3, metodo="kmeans"):
     """
     Agrupa entidades similares basándose en la frecuencia de aparición y categoría.
     
     Args:
         entities (list of tuples): Lista de (nombre_entidad, categoria).
         n_clusters (int): Número de clusters para agrupar por frecuencia.
+        metodo (str): "kmeans" o "cuantiles" (ver src.nlp.frequency_tiers).
         
     Returns:
-        dict: { categoria: { cluster_id: [(entidad, frecuencia), ...] } }
+        dict: { categoria: { cluster_id: [(entidad, frecuencia), ...] } }, con los
+              clusters de cada categoría de mayor a menor frecuencia media.
     """
     # Contar frecuencias por entidad con categoría
     contador = Counter(entities)  # cuenta (nombre, categoria) como clave
@@ -140,36 +124,14 @@ def cluster_entidades_por_categoria_y_frecuencia(entities, n_clusters=3):
     categorias = {}
     for (nombre, categoria), freq in contador.items():
         if categoria not in categorias:
-            categorias[categoria] = []
-        categorias[categoria].append((nombre, freq))
+            categorias[categoria] = ([], [])
+        categorias[categoria][0].append(nombre)
+        categorias[categoria][1].append(freq)
     
     resultado = {}
-    for categoria, lista_entidades in categorias.items():
-        # Extraer frecuencias para clustering
-        frecuencias = np.array([freq for _, freq in lista_entidades]).reshape(-1, 1)
-        
-        # Si hay menos entidades que clusters, ajustar n_clusters
-        n_clus = min(n_clusters, len(lista_entidades))
-        if n_clus == 0:
-            continue
-        
-        kmeans = KMeans(n_clusters=n_clus, random_state=42)
-        clusters = kmeans.fit_predict(frecuencias)
-        
-        # Agrupar entidades por cluster
-        grupos = {}
-        for idx, cluster_id in enumerate(clusters):
-            if cluster_id not in grupos:
-                grupos[cluster_id] = []
-            grupos[cluster_id].append(lista_entidades[idx])
-        
-        # Ordenar clusters por frecuencia promedio descendente
-        grupos_ordenados = dict(sorted(
-            grupos.items(),
-            key=lambda x: -np.mean([freq for _, freq in x[1]])
-        ))
-        
-        resultado[categoria] = grupos_ordenados
+    for categoria, (nombres, frecuencias) in categorias.items():
+        # Con menos entidades que clusters, se crean tantos clusters como frecuencias distintas
+        resultado[categoria] = agrupar_por_niveles(nombres, frecuencias, n_clusters, metodo)
     
     return resultado
 
@@ -218,97 +180,243 @@ def procesar_entidades_con_excepcion(entidades, num_entidades=2, umbral_score=0.
 
 
 
-def extract_entities(text):
+MAPA_ETIQUETAS_HF = {"PER": "PERSON", "LOC": "LOC", "ORG": "ORG", "GPE": "LOC"}
+
+
+def _entidades_desde_hf(resultados, filtrar=True):
     """
-    Extrae entidades con Hugging Face NER pipeline.
-    Retorna lista de tuplas (texto_entidad, etiqueta).
+    Convierte la salida de un pipeline NER de Hugging Face en tuplas (texto_entidad, etiqueta,
+    inicio), conservando solo personas y lugares. inicio es la posición de la mención en el
+    texto (None si el pipeline no la da).
     """
-    #print(text)
     entities = []
-    mapa_etiquetas = {"PER": "PERSON", "LOC": "LOC", "ORG": "ORG", "GPE": "LOC"}
-    
-    resultados = ner_pipeline(text.strip())
-    resultados = procesar_entidades_con_excepcion(resultados)
+    if filtrar:
+        resultados = procesar_entidades_con_excepcion(resultados)
     for ent in resultados:
-        etiqueta = mapa_etiquetas.get(ent['entity_group'], ent['entity_group'])
-        if etiqueta in ["PERSON","GPE", "LOC"]:
-            #print(ent['word'])
-            texto_limpio = limpiar_texto(ent['word'])
-            if len(texto_limpio) >= 2:  # Solo agregar si tiene 2 o más caracteres
-                entities.append((texto_limpio, etiqueta))
-    #print("ENTIDADES BETO")
-    #print(text.strip())
-    #print(entities)
-    #print("-----")
-
-    entities_new = []
-    #print(text)
-    ner_results = nlp_hf(text.strip())  
-    ner_results = procesar_entidades_con_excepcion(ner_results)  
-    for ent in ner_results:
-        etiqueta = mapa_etiquetas.get(ent['entity_group'], ent['entity_group'])
+        etiqueta = MAPA_ETIQUETAS_HF.get(ent['entity_group'], ent['entity_group'])
         if etiqueta in ["PERSON","GPE", "LOC"]:
-            #print(ent['word'])
-            #texto_limpio = ent['word']
             texto_limpio = limpiar_texto(ent['word'])
             if len(texto_limpio) >= 2:  # Solo agregar si tiene 2 o más caracteres
-                entities.append((texto_limpio, etiqueta))
-    #print("ENTIDADES HUGGING FACE")
-    #print(ner_results)
+                entities.append((texto_limpio, etiqueta, ent.get('start')))
+    return entities
+
 
+def _fechas_desde_doc(doc):
     """
-    Extrae entidades del texto usando spaCy transformer, dividiendo el texto en fragmentos,
-    y clasifica las entidades según categorías definidas, excluyendo entidades que
-    no contengan sustantivos o nombres propios (filtra conjugaciones verbales).
+    Extrae las entidades DATE de un documento spaCy, normalizadas con normalizar_fecha,
+    como tuplas (texto_entidad, etiqueta, inicio).
     """
-    #entities_new = []
-    doc = nlp_en_core_web_trf(text.strip())
+    entities = []
     for ent in doc.ents:
         # Filtrar solo etiquetas relevantes
-        #if ent.label_ in ["PERSON", "GPE", "ORG", "LOC", "DATE", "EVENT", "MISC"]:
         if ent.label_ in ["DATE"]:
             ent_text = limpiar_texto(ent.text)
-            ent_text = normalizar_fecha(ent_text)  
-            ent_label_ = ent.label_
-            entities.append((ent_text, ent_label_))
-    #print("ENTIDADES SPACY nlp_en_core_web_trf")
-    #print([(ent.text, ent.label_) for ent in doc.ents if ent.label_ == "DATE"])
+            ent_text = normalizar_fecha(ent_text)
+            entities.append((ent_text, ent.label_, ent.start_char))
+    return entities
 
-    doc = nlp_es_core_news_sm(text.strip())
-    for ent in doc.ents:
-        # Filtrar solo etiquetas relevantes
-        #if ent.label_ in ["PERSON", "GPE", "ORG", "LOC", "DATE", "EVENT", "MISC"]:
-        if ent.label_ in ["DATE"]:
-            ent_text = limpiar_texto(ent.text)
-            ent_text = normalizar_fecha(ent_text)  
-            ent_label_ = ent.label_
-            entities.append((ent_text, ent_label_))
-    #print("ENTIDADES SPACY nlp_es_core_news_lg")
-    #print([(ent.text, ent.label_) for ent in doc.ents if ent.label_ == "DATE"])
 
+def _fechas_desde_menciones(menciones):
+    """Como _fechas_desde_doc, para las menciones fusionadas de src.nlp.ner_fusion."""
+    return [(normalizar_fecha(limpiar_texto(m["word"])), m["entity_group"], m["start"])
+            for m in menciones if m["entity_group"] == "DATE"]
 
 
+def _validar_reconocedores(reconocedores, fechas="spacy"):
+    if fechas not in FECHAS:
+        raise ValueError(f"Opción de fechas desconocida: {fechas}")
+    if reconocedores is None:
+        reconocedores = RECONOCEDORES
+    desconocidos = [r for r in reconocedores if r not in RECONOCEDORES_DISPONIBLES]
+    if desconocidos:
+        raise ValueError(f"Reconocedores desconocidos: {desconocidos}")
+    if fechas == "reglas" and any(r in RECONOCEDORES_FECHA for r in reconocedores):
+        # Las reglas sustituyen a todos los modelos de spaCy
+        reconocedores = [r for r in reconocedores if r not in RECONOCEDORES_FECHA] + [FECHAS_REGLAS]
+    # Mantener siempre el mismo orden de ejecución
+    return tuple(r for r in RECONOCEDORES_DISPONIBLES if r in reconocedores)
 
 
-    #print("ANTES")
-    #print(entities)
-    
-    #entidades_clasificadas = entity_normalization(entidades_agrupadas)
-    #print("CLASIFICADAS")
-    #print(entidades_clasificadas)
+def _modelo(nombre, backend="pytorch"):
+    # Los modelos de Hugging Face pueden ejecutarse con otro backend (ver src.nlp.onnx_backend)
+    return obtener_modelo(nombre_con_backend(nombre, backend) if nombre in RECONOCEDORES_HF else nombre)
 
-    #clusters = cluster_entidades_por_categoria_y_frecuencia(entities, n_clusters=3)
-    #for categoria, grupos in clusters.items():
-    #    print(f"\nCategoría: {categoria}")
-    #    for cluster_id, entidades in grupos.items():
-    #        print(f"  Cluster {cluster_id}:")
-    #        for entidad, freq in entidades:
-    #            print(f"    - {entidad}: {freq} apariciones")
 
+def _identificador(nombre, backend="pytorch"):
+    # Identificador del modelo para la caché: el backend ONNX cambia ligeramente los scores
+    if nombre in RECONOCEDORES_HF and backend != "pytorch":
+        return f"{IDENTIFICADORES[nombre]}:{backend}"
+    return IDENTIFICADORES[nombre]
 
-    return entities
 
+def modelos_ner(reconocedores=None, fechas="spacy", backend="pytorch"):
+    """
+    Nombres en model_registry de los modelos que usa extract_entities con estas opciones
+    (p. ej. para cargarlos por adelantado con precargar_modelos).
+    """
+    return [nombre_con_backend(nombre, backend) if nombre in RECONOCEDORES_HF else nombre
+            for nombre in _validar_reconocedores(reconocedores, fechas)]
 
 
+def claves_cache_entidades(cache, fragmentos, reconocedores=None, fusion=None, fechas="spacy", backend="pytorch"):
+    """
+    Claves de la caché con las que extract_entities_batch guarda las entidades de cada
+    fragmento con estas opciones.
+    """
+    reconocedores = _validar_reconocedores(reconocedores, fechas)
+    modelo = "entidades:" + ",".join(_identificador(r, backend) for r in reconocedores)
+    if fusion is not None:
+        modelo += ":fusion:" + fusion
+    parametros = {"version": VERSION_ENTIDADES}
+    return [cache.clave(fragmento.strip(), modelo, parametros) for fragmento in fragmentos]
+
 
+def formato_entidades(entidades, fragmento, posiciones=False):
+    """
+    Convierte las entidades de un fragmento tal como se guardan en la caché (tuplas
+    (texto_entidad, etiqueta, inicio), con inicio relativo al fragmento sin los espacios
+    de los extremos) al formato de extract_entities_batch.
+    """
+    if not posiciones:
+        return [(texto, etiqueta) for texto, etiqueta, _ in entidades]
+    desplazamiento = len(fragmento) - len(fragmento.lstrip())
+    return [(texto, etiqueta, None if inicio is None else inicio + desplazamiento)
+            for texto, etiqueta, inicio in entidades]
 
+
+def tokenizers_ner(reconocedores=None, backend="pytorch"):
+    """
+    Devuelve los tokenizers de los modelos de Hugging Face que se van a usar, para medir
+    en tokens el tamaño de los fragmentos (ver src.nlp.chunking).
+
+    Solo carga los tokenizers, no los modelos (que pueden cargarse después en los workers
+    o, con ONNX, exportarse): si el modelo ya está cargado se reutiliza su tokenizer.
+    """
+    tokenizers = []
+    for nombre in _validar_reconocedores(reconocedores):
+        if nombre not in RECONOCEDORES_HF:
+            continue
+        modelo = nombre_con_backend(nombre, backend)
+        if modelo_cargado(modelo):
+            tokenizers.append(obtener_modelo(modelo).tokenizer)
+        else:
+            tokenizers.append(obtener_modelo(nombre_tokenizer(nombre)))
+    return tokenizers
+
+
+def extract_entities(text, reconocedores=None, fusion=None, fechas="spacy", backend="pytorch"):
+    """
+    Extrae entidades con Hugging Face NER pipeline.
+    Retorna lista de tuplas (texto_entidad, etiqueta).
+
+    Args:
+        text (str): Texto a procesar.
+        reconocedores (iterable): Nombres de los reconocedores a usar (ver RECONOCEDORES).
+                                  Por defecto se usan todos.
+        fusion (str): Política de votación ("union", "mayoria", "unanimidad") para
+                      fusionar los modelos con src.nlp.ner_fusion. None los concatena.
+        fechas (str): "spacy" o "reglas": con "reglas", las fechas se extraen con
+                      src.nlp.date_rules en lugar de con los modelos de spaCy, con la
+                      misma normalización (normalizar_fecha).
+        backend (str): "pytorch", "onnx" u "onnx_int8": cómo se ejecutan BETO y BERT
+                       multilingüe (ver src.nlp.onnx_backend).
+    """
+    if fusion is not None:
+        return extract_entities_batch([text], reconocedores=reconocedores, fusion=fusion, fechas=fechas, backend=backend)[0]
+    texto = text.strip()
+    entities = []
+
+    for nombre in _validar_reconocedores(reconocedores, fechas):
+        modelo = _modelo(nombre, backend)
+        if nombre in RECONOCEDORES_HF:
+            # Personas y lugares: BETO y BERT multilingüe
+            entities.extend(_entidades_desde_hf(modelo(texto)))
+        elif nombre in RECONOCEDORES_REGLAS:
+            entities.extend(_fechas_desde_menciones(modelo.menciones(texto)))
+        else:
+            # Fechas: spaCy en inglés (transformer) y en español
+            entities.extend(_fechas_desde_doc(modelo(texto)))
+
+    return formato_entidades(entities, texto)
+
+
+def extract_entities_batch(fragmentos, batch_size=8, n_process=1, reconocedores=None, cache=None, fusion=None, fechas="spacy",
+                           backend="pytorch", posiciones=False):
+    """
+    Versión por lotes de extract_entities: pasa todos los fragmentos por cada modelo
+    de una sola vez en lugar de hacer una inferencia por fragmento.
+
+    Args:
+        fragmentos (list): Lista de textos a procesar.
+        batch_size (int): Tamaño de lote para los pipelines de Hugging Face y nlp.pipe de spaCy.
+        n_process (int): Número de procesos para nlp.pipe de spaCy.
+        reconocedores (iterable): Nombres de los reconocedores a usar. Por defecto, todos.
+        cache (CacheResultados): Si se indica, solo se procesan los fragmentos que no estén
+                                 ya en la caché, y sus resultados se guardan en ella.
+        fusion (str): Política de votación para fusionar los modelos por offset (ver
+                      src.nlp.ner_fusion): los BERT comparten la división en palabras,
+                      spaCy solo ejecuta los componentes del NER y cada mención se
+                      cuenta una vez aunque la encuentren varios modelos.
+        fechas (str): "spacy" o "reglas" (ver extract_entities).
+        backend (str): "pytorch", "onnx" u "onnx_int8" (ver extract_entities).
+        posiciones (bool): Añade a cada entidad la posición de su mención en el fragmento
+                           (None si el modelo no la da), p. ej. para deduplicar_solapamiento.
+
+    Returns:
+        list: Una lista de tuplas (texto_entidad, etiqueta) por fragmento, en el mismo
+              orden y con el mismo contenido que devolvería extract_entities; con
+              posiciones, tuplas (texto_entidad, etiqueta, inicio).
+    """
+    reconocedores = _validar_reconocedores(reconocedores, fechas)
+    textos = [fragmento.strip() for fragmento in fragmentos]
+    entidades = [None] * len(textos)
+
+    claves = []
+    if cache is not None:
+        claves = claves_cache_entidades(cache, textos, reconocedores, fusion, backend=backend)
+        for i, clave in enumerate(claves):
+            encontrado, valor = cache.obtener(clave)
+            if encontrado:
+                entidades[i] = valor
+
+    pendientes = [i for i, valor in enumerate(entidades) if valor is None]
+    if not pendientes:
+        return [formato_entidades(valor, fragmento, posiciones) for valor, fragmento in zip(entidades, fragmentos)]
+    textos_pendientes = [textos[i] for i in pendientes]
+    nuevas = [[] for _ in pendientes]
+
+    if fusion is not None:
+        from src.nlp.ner_fusion import extraer_entidades_fusion
+
+        menciones_hf, menciones_fecha = extraer_entidades_fusion(
+            textos_pendientes,
+            [nombre_con_backend(r, backend) for r in reconocedores if r in RECONOCEDORES_HF],
+            [r for r in reconocedores if r not in RECONOCEDORES_HF],
+            batch_size=batch_size, n_process=n_process, politica=fusion,
+            filtro_hf=procesar_entidades_con_excepcion,
+        )
+        for i, (menciones_hf_i, menciones_fecha_i) in enumerate(zip(menciones_hf, menciones_fecha)):
+            nuevas[i] = _entidades_desde_hf(menciones_hf_i, filtrar=False) + _fechas_desde_menciones(menciones_fecha_i)
+    else:
+        for nombre in reconocedores:
+            modelo = _modelo(nombre, backend)
+            # La carga del modelo se mide aparte en el registro (estadisticas_modelos)
+            with medir(f"ner:{nombre}", fragmentos=len(textos_pendientes)) as etapa:
+                antes = sum(len(n) for n in nuevas)
+                if nombre in RECONOCEDORES_HF:
+                    for i, resultados in enumerate(modelo(textos_pendientes, batch_size=batch_size)):
+                        nuevas[i].extend(_entidades_desde_hf(resultados))
+                elif nombre in RECONOCEDORES_REGLAS:
+                    for i, menciones in enumerate(modelo.menciones_lote(textos_pendientes)):
+                        nuevas[i].extend(_fechas_desde_menciones(menciones))
+                else:
+                    docs = modelo.pipe(textos_pendientes, batch_size=batch_size, n_process=n_process)
+                    for i, doc in enumerate(docs):
+                        nuevas[i].extend(_fechas_desde_doc(doc))
+                etapa["entidades"] = sum(len(n) for n in nuevas) - antes
+
+    for i, valor in zip(pendientes, nuevas):
+        entidades[i] = valor
+        if cache is not None:
+            cache.guardar(claves[i], valor)
+    return [formato_entidades(valor, fragmento, posiciones) for valor, fragmento in zip(entidades, fragmentos)]
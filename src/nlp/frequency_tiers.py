@@ -0,0 +1,119 @@
+import numpy as np
+
+
+def _kmeans_1d_optimo(valores, pesos, k):
+    """
+    k-means 1-D exacto por programación dinámica sobre valores ordenados y únicos.
+
+    En una dimensión los clusters óptimos son intervalos contiguos de los valores
+    ordenados, así que basta con elegir los k-1 cortes que minimizan la suma de errores
+    cuadráticos (ponderada por el número de entidades con cada valor).
+
+    Args:
+        valores (np.ndarray): Valores únicos en orden ascendente.
+        pesos (np.ndarray): Número de elementos con cada valor.
+        k (int): Número de clusters (como mucho, len(valores)).
+
+    Returns:
+        np.ndarray: Índice del cluster de cada valor (0 = valores más bajos).
+    """
+    n = len(valores)
+    # Sumas acumuladas para calcular el error de cualquier intervalo [i, j) en O(1)
+    w = np.concatenate(([0.0], np.cumsum(pesos, dtype=np.float64)))
+    s = np.concatenate(([0.0], np.cumsum(pesos * valores, dtype=np.float64)))
+    q = np.concatenate(([0.0], np.cumsum(pesos * valores * valores, dtype=np.float64)))
+
+    def error(i, j):
+        # i o j pueden ser arrays de posiciones
+        suma = s[j] - s[i]
+        return q[j] - q[i] - suma * suma / (w[j] - w[i])
+
+    # coste[j]: error mínimo de los j primeros valores con el número de clusters actual
+    coste = np.zeros(n + 1)
+    coste[1:] = error(0, np.arange(1, n + 1))
+    cortes = np.zeros((k, n + 1), dtype=np.int64)
+    for m in range(1, k):
+        nuevo = np.full(n + 1, np.inf)
+        # El mejor corte es monótono en j: divide y vencerás sobre los fines
+        # (O(n log n) evaluaciones por nivel en lugar de O(n²))
+        pila = [(m + 1, n, m, n - 1)]
+        while pila:
+            desde, hasta, corte_min, corte_max = pila.pop()
+            if desde > hasta:
+                continue
+            j = (desde + hasta) // 2
+            inicios = np.arange(max(m, corte_min), min(j - 1, corte_max) + 1)
+            candidatos = coste[inicios] + error(inicios, j)
+            mejor = int(np.argmin(candidatos))
+            nuevo[j] = candidatos[mejor]
+            cortes[m, j] = inicios[mejor]
+            pila.append((desde, j - 1, corte_min, cortes[m, j]))
+            pila.append((j + 1, hasta, cortes[m, j], corte_max))
+        coste = nuevo
+
+    # Reconstruir los intervalos desde el final
+    etiquetas = np.empty(n, dtype=np.int64)
+    fin = n
+    for m in range(k - 1, -1, -1):
+        inicio = cortes[m, fin] if m > 0 else 0
+        etiquetas[inicio:fin] = m
+        fin = inicio
+    return etiquetas
+
+
+def _cuantiles(valores, pesos, k):
+    # Cortes en los cuantiles ponderados de la distribución de valores
+    acumulado = np.cumsum(pesos) / pesos.sum()
+    limites = np.arange(1, k) / k
+    etiquetas = np.searchsorted(limites, acumulado, side="left")
+    # Renumerar para que no queden niveles vacíos
+    return np.unique(etiquetas, return_inverse=True)[1]
+
+
+def niveles_por_frecuencia(frecuencias, n_niveles=3, metodo="kmeans"):
+    """
+    Asigna cada frecuencia a un nivel (alto, medio, bajo...).
+
+    Trabaja sobre los valores únicos de frecuencia con su número de apariciones, así que
+    el coste no depende del número de entidades sino de cuántas frecuencias distintas hay.
+
+    Args:
+        frecuencias (array-like): Frecuencia de cada entidad.
+        n_niveles (int): Número de niveles (se reduce si hay menos frecuencias distintas).
+        metodo (str): "kmeans" (k-means 1-D óptimo, equivalente a los cortes de Jenks)
+                      o "cuantiles" (niveles con el mismo número de entidades).
+
+    Returns:
+        np.ndarray: Nivel de cada entidad; 0 es el nivel de frecuencia media más alta.
+    """
+    frecuencias = np.asarray(frecuencias, dtype=np.float64).ravel()
+    if frecuencias.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    valores, indices, pesos = np.unique(frecuencias, return_inverse=True, return_counts=True)
+    k = max(1, min(n_niveles, len(valores)))
+    if metodo == "kmeans":
+        etiquetas = _kmeans_1d_optimo(valores, pesos.astype(np.float64), k)
+    elif metodo == "cuantiles":
+        etiquetas = _cuantiles(valores, pesos, k)
+    else:
+        raise ValueError(f"Método de niveles desconocido: {metodo}")
+    # Los niveles salen en orden ascendente de frecuencia: invertirlos
+    return etiquetas.max() - etiquetas[indices]
+
+
+def agrupar_por_niveles(elementos, frecuencias, n_niveles=3, metodo="kmeans"):
+    """
+    Agrupa (elemento, frecuencia) por nivel de frecuencia.
+
+    Returns:
+        dict: {nivel: [(elemento, frecuencia), ...]} con los niveles ordenados de mayor
+              a menor frecuencia media (nivel 0 primero) y los elementos de cada nivel
+              en su orden original.
+    """
+    niveles = niveles_por_frecuencia(frecuencias, n_niveles, metodo)
+    grupos = {}
+    for nivel in np.unique(niveles):
+        grupos[int(nivel)] = []
+    for elemento, frecuencia, nivel in zip(elementos, frecuencias, niveles.tolist()):
+        grupos[nivel].append((elemento, frecuencia))
+    return grupos
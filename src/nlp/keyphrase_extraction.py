@@ -1,8 +1,25 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import yake
 
-def extraer_keyphrases_keybert_potente_con_scores(texto, max_phrases = 250 , max_words = 10, min_words = 2, score = 0.55):
+
+@lru_cache(maxsize=None)
+def _extractor_yake(max_words, max_phrases):
+    # Construir el extractor (carga de stopwords, etc.) una sola vez por proceso y configuración
+    return yake.KeywordExtractor(lan="es", n=max_words, top=max_phrases,)
+
+
+def extraer_keyphrases_keybert_potente_con_scores(texto, max_phrases = 250 , max_words = 10, min_words = 2, score = 0.55, cache = None):
+    if cache is not None:
+        parametros = {"max_phrases": max_phrases, "max_words": max_words, "min_words": min_words, "score": score}
+        return cache.obtener_o_calcular(
+            texto, "yake", parametros,
+            lambda t: extraer_keyphrases_keybert_potente_con_scores(t, max_phrases, max_words, min_words, score),
+        )
+
     # Configuración de YAKE para español, frases de hasta 3 palabras
-    kw_extractor = yake.KeywordExtractor(lan="es", n=max_words, top=max_phrases,)
+    kw_extractor = _extractor_yake(max_words, max_phrases)
     
     # Extraer frases clave con sus puntuaciones
     keywords = kw_extractor.extract_keywords(texto)
@@ -42,6 +59,69 @@ def extraer_keyphrases_keybert_potente_con_scores(texto, max_phrases = 250 , max
     return frases_validas
     #return keywords
 
+
+def _keyphrases_de_ventana(argumentos):
+    # Función de nivel de módulo para poder enviarla a los procesos del pool
+    texto, max_phrases, max_words, min_words, score = argumentos
+    return extraer_keyphrases_keybert_potente_con_scores(texto, max_phrases, max_words, min_words, score)
+
+
+def extraer_keyphrases_paralelo(texto, tamano_ventana=1000, max_phrases=5, max_words=7, min_words=2, score=0.55, max_workers=None, cache=None):
+    """
+    Extrae frases clave de un texto largo dividiéndolo en ventanas de tamano_ventana
+    caracteres y procesándolas en paralelo en un pool de procesos. Cada worker construye
+    el extractor YAKE una sola vez y lo reutiliza para todas sus ventanas.
+
+    Ventanas más grandes (p. ej. 10000) reducen mucho el número de llamadas a YAKE; en
+    ese caso conviene aumentar max_phrases en proporción.
+
+    Args:
+        texto (str): Texto completo.
+        tamano_ventana (int): Caracteres por ventana.
+        max_phrases, max_words, min_words, score: Ver extraer_keyphrases_keybert_potente_con_scores.
+        max_workers (int): Procesos del pool (None: número de CPUs; 1: sin pool).
+        cache (CacheResultados): Caché opcional; se consulta y actualiza en el proceso principal.
+
+    Returns:
+        list: Frases clave sin duplicados, en el orden en que aparecen las ventanas.
+    """
+    ventanas = [texto[i:i + tamano_ventana] for i in range(0, len(texto), tamano_ventana)]
+    parametros = {"max_phrases": max_phrases, "max_words": max_words, "min_words": min_words, "score": score}
+
+    resultados = [None] * len(ventanas)
+    pendientes = []
+    for indice, ventana in enumerate(ventanas):
+        if cache is not None:
+            encontrado, valor = cache.obtener(cache.clave(ventana, "yake", parametros))
+            if encontrado:
+                resultados[indice] = valor
+                continue
+        pendientes.append(indice)
+
+    argumentos = [(ventanas[i], max_phrases, max_words, min_words, score) for i in pendientes]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(pendientes))
+    if max_workers <= 1:
+        calculados = map(_keyphrases_de_ventana, argumentos)
+        _recoger_keyphrases(calculados, pendientes, ventanas, resultados, parametros, cache)
+    else:
+        # map conserva el orden de las ventanas; chunksize reduce el coste de comunicación
+        chunksize = max(1, len(argumentos) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            calculados = executor.map(_keyphrases_de_ventana, argumentos, chunksize=chunksize)
+            _recoger_keyphrases(calculados, pendientes, ventanas, resultados, parametros, cache)
+
+    # Eliminar duplicados manteniendo el orden
+    return list(dict.fromkeys(frase for frases in resultados for frase in frases))
+
+
+def _recoger_keyphrases(calculados, pendientes, ventanas, resultados, parametros, cache):
+    for indice, frases in zip(pendientes, calculados):
+        resultados[indice] = frases
+        if cache is not None:
+            cache.guardar(cache.clave(ventanas[indice], "yake", parametros), frases)
+
 #def keyphrases_a_parrafo_natural(frases_clave):
 #    if len(frases_clave) == 0:
 #        return ""
@@ -0,0 +1,188 @@
+import threading
+import time
+from src.common.util import memoria_rss
+
+
+# Nombres de los reconocedores disponibles
+BETO = "beto"
+BERT_MULTILINGUE = "bert_multilingue"
+SPACY_EN = "spacy_en"
+SPACY_ES = "spacy_es"
+FECHAS_REGLAS = "fechas_reglas"
+
+# Modelo concreto detrás de cada reconocedor (se usa, p. ej., en las claves de la caché)
+IDENTIFICADORES = {
+    BETO: "ifis/BETO-finetuned-ner-3",
+    BERT_MULTILINGUE: "Davlan/bert-base-multilingual-cased-ner-hrl",
+    SPACY_EN: "en_core_web_trf",
+    SPACY_ES: "es_core_news_sm",
+    # Cambiar la versión al modificar las reglas de src.nlp.date_rules
+    FECHAS_REGLAS: "src.nlp.date_rules:1",
+}
+
+# Variantes de los modelos de Hugging Face: PyTorch (el pipeline original), ONNX Runtime
+# y ONNX Runtime con los pesos cuantizados a int8 (ver src.nlp.onnx_backend)
+BACKENDS = ("pytorch", "onnx", "onnx_int8")
+MODELOS_CON_BACKEND = (BETO, BERT_MULTILINGUE)
+
+# Registro compartido: nombre -> función que carga el modelo
+_cargadores = {}
+# Modelos ya cargados: nombre -> objeto del modelo
+_modelos = {}
+# Estadísticas de carga: nombre -> {"segundos": float, "memoria_mb": float}
+_estadisticas = {}
+_lock = threading.Lock()
+
+
+def nombre_con_backend(nombre, backend="pytorch"):
+    """Nombre en el registro de un reconocedor de Hugging Face con el backend indicado."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}")
+    return nombre if backend == "pytorch" else f"{nombre}:{backend}"
+
+
+def nombre_tokenizer(nombre):
+    """Nombre en el registro del tokenizer de un reconocedor de Hugging Face (el mismo con todos los backends)."""
+    return f"{nombre}:tokenizer"
+
+
+def registrar_modelo(nombre, cargador, reemplazar=False):
+    """
+    Registra una función que carga un modelo bajo un nombre.
+    El modelo no se carga hasta que alguien lo pide con obtener_modelo.
+
+    Args:
+        nombre (str): Nombre con el que se pedirá el modelo.
+        cargador (callable): Función sin argumentos que devuelve el modelo cargado.
+        reemplazar (bool): Si es True, sustituye un cargador ya registrado y descarta
+                           el modelo cargado con el cargador anterior.
+    """
+    with _lock:
+        if nombre in _cargadores and not reemplazar:
+            raise ValueError(f"Ya existe un modelo registrado con el nombre '{nombre}'")
+        _cargadores[nombre] = cargador
+        _modelos.pop(nombre, None)
+        _estadisticas.pop(nombre, None)
+
+
+def obtener_modelo(nombre):
+    """
+    Devuelve el modelo registrado con ese nombre, cargándolo la primera vez que se pide.
+    """
+    modelo = _modelos.get(nombre)
+    if modelo is not None:
+        return modelo
+    with _lock:
+        if nombre in _modelos:
+            return _modelos[nombre]
+        if nombre not in _cargadores:
+            raise KeyError(f"No hay ningún modelo registrado con el nombre '{nombre}'")
+        print(f"Cargando modelo {nombre}...")
+        memoria_antes = memoria_rss()
+        inicio = time.perf_counter()
+        modelo = _cargadores[nombre]()
+        segundos = time.perf_counter() - inicio
+        memoria_mb = (memoria_rss() - memoria_antes) / (1024 * 1024)
+        _modelos[nombre] = modelo
+        _estadisticas[nombre] = {"segundos": segundos, "memoria_mb": memoria_mb}
+        print(f"Modelo {nombre} cargado en {segundos:.1f} s (+{memoria_mb:.0f} MB)")
+        return modelo
+
+
+def modelo_cargado(nombre):
+    """Indica si el modelo ya está en memoria."""
+    return nombre in _modelos
+
+
+def precargar_modelos(nombres):
+    """
+    Carga por adelantado los modelos indicados, por ejemplo al arrancar un worker.
+    """
+    for nombre in nombres:
+        obtener_modelo(nombre)
+
+
+def descargar_modelo(nombre):
+    """
+    Libera la referencia a un modelo cargado; se volverá a cargar si se pide de nuevo.
+    """
+    with _lock:
+        _modelos.pop(nombre, None)
+
+
+def estadisticas_modelos():
+    """
+    Devuelve el tiempo de carga y la memoria residente añadida por cada modelo cargado.
+
+    Returns:
+        dict: {nombre: {"segundos": float, "memoria_mb": float}}
+    """
+    with _lock:
+        return {nombre: dict(stats) for nombre, stats in _estadisticas.items()}
+
+
+def _cargar_beto():
+    from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
+
+    # Cargar tokenizer y modelo fine-tuned BETO para NER
+    model_name = IDENTIFICADORES[BETO]
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForTokenClassification.from_pretrained(model_name)
+    return pipeline(
+        "ner",
+        model=model,
+        tokenizer=tokenizer,
+        aggregation_strategy="first",
+        device=-1  # Cambia a -1 si no tienes GPU
+    )
+
+
+def _cargar_bert_multilingue():
+    from transformers import pipeline
+
+    return pipeline("ner", model=IDENTIFICADORES[BERT_MULTILINGUE], aggregation_strategy="first", device=-1)
+
+
+def _cargar_spacy_en():
+    import spacy
+
+    return spacy.load(IDENTIFICADORES[SPACY_EN])
+
+
+def _cargar_spacy_es():
+    import spacy
+
+    return spacy.load(IDENTIFICADORES[SPACY_ES])
+
+
+def _cargar_fechas_reglas():
+    from src.nlp.date_rules import ReconocedorFechas
+
+    return ReconocedorFechas()
+
+
+def _cargador_tokenizer(nombre):
+    def cargar():
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(IDENTIFICADORES[nombre])
+    return cargar
+
+
+def _cargador_onnx(nombre, cuantizar):
+    def cargar():
+        from src.nlp.onnx_backend import cargar_ner_onnx
+
+        return cargar_ner_onnx(nombre, cuantizar)
+    return cargar
+
+
+registrar_modelo(BETO, _cargar_beto)
+registrar_modelo(BERT_MULTILINGUE, _cargar_bert_multilingue)
+registrar_modelo(SPACY_EN, _cargar_spacy_en)
+registrar_modelo(SPACY_ES, _cargar_spacy_es)
+registrar_modelo(FECHAS_REGLAS, _cargar_fechas_reglas)
+for _nombre in MODELOS_CON_BACKEND:
+    registrar_modelo(nombre_tokenizer(_nombre), _cargador_tokenizer(_nombre))
+    registrar_modelo(nombre_con_backend(_nombre, "onnx"), _cargador_onnx(_nombre, False))
+    registrar_modelo(nombre_con_backend(_nombre, "onnx_int8"), _cargador_onnx(_nombre, True))
@@ -0,0 +1,228 @@
+import re
+from functools import partial
+from src.common.profiling import medir
+from src.nlp.model_registry import obtener_modelo
+from src.nlp.date_rules import ReconocedorFechas
+
+
+# Pre-tokenización compartida: palabras y signos sueltos, como el BasicTokenizer de BERT
+_PATRON_PALABRA = re.compile(r"\w+|[^\w\s]")
+
+# Componentes de spaCy necesarios para obtener las entidades (DATE): el ner, la capa
+# que le da los vectores (transformer en en_core_web_trf, tok2vec en es_core_news_sm)
+# y los que añaden entidades por patrones, si el pipeline los tiene
+COMPONENTES_NER_SPACY = ("transformer", "tok2vec", "ner", "entity_ruler", "span_ruler")
+
+# Políticas de votación al fusionar las menciones de varios modelos
+POLITICAS = ("union", "mayoria", "unanimidad")
+
+
+def dividir_en_palabras(texto):
+    """
+    Returns:
+        tuple: (palabras, offsets), con offsets como lista de (inicio, fin) en el texto.
+    """
+    palabras, offsets = [], []
+    for m in _PATRON_PALABRA.finditer(texto):
+        palabras.append(m.group(0))
+        offsets.append(m.span())
+    return palabras, offsets
+
+
+def _spans_de_etiquetas(etiquetas, scores, offsets, texto):
+    # Une las palabras consecutivas con etiquetas B-X/I-X en menciones con su offset
+    spans = []
+    actual = None
+    for etiqueta, score, (inicio, fin) in zip(etiquetas, scores, offsets):
+        prefijo, _, tipo = etiqueta.partition("-")
+        if not tipo:
+            prefijo, tipo = etiqueta, ""
+        if prefijo == "O" or not tipo:
+            actual = None
+            continue
+        if prefijo == "I" and actual is not None and actual["entity_group"] == tipo:
+            actual["end"] = fin
+            actual["scores"].append(score)
+            continue
+        actual = {"entity_group": tipo, "start": inicio, "end": fin, "scores": [score]}
+        spans.append(actual)
+    for span in spans:
+        # Como en transformers, el score de la mención es la media del de sus palabras
+        puntuaciones = span.pop("scores")
+        span["score"] = sum(puntuaciones) / len(puntuaciones)
+        span["word"] = texto[span["start"]:span["end"]]
+    return spans
+
+
+def _probabilidades_torch(pipeline_hf, lote):
+    # Probabilidades por token de un pipeline de Hugging Face (PyTorch) para un lote de
+    # textos ya divididos en palabras
+    import torch
+
+    modelo = pipeline_hf.model
+    codificado = pipeline_hf.tokenizer(lote, is_split_into_words=True, truncation=True, padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        logits = modelo(**{k: v.to(modelo.device) for k, v in codificado.items()}).logits
+    return codificado, logits.softmax(dim=-1).cpu().numpy()
+
+
+def entidades_bert(reconocedor, textos, palabras_por_texto, offsets_por_texto, batch_size=8):
+    """
+    Ejecuta un modelo de tipo BERT sobre palabras ya separadas (is_split_into_words), con
+    la etiqueta de la primera subpalabra de cada palabra, como aggregation_strategy="first".
+
+    Args:
+        reconocedor: Pipeline "ner" de Hugging Face, o un objeto con id2label y
+                     probabilidades_palabras(lote) -> (codificado, probabilidades), como
+                     src.nlp.onnx_backend.NerOnnx.
+
+    Returns:
+        list: Por texto, lista de dicts con entity_group, word, score, start y end.
+    """
+    if hasattr(reconocedor, "probabilidades_palabras"):
+        probabilidades_de, id2label = reconocedor.probabilidades_palabras, reconocedor.id2label
+    else:
+        probabilidades_de, id2label = partial(_probabilidades_torch, reconocedor), reconocedor.model.config.id2label
+    resultados = []
+    for desde in range(0, len(textos), batch_size):
+        lote = list(palabras_por_texto[desde:desde + batch_size])
+        codificado, probabilidades = probabilidades_de(lote)
+        mejores, indices = probabilidades.max(axis=-1), probabilidades.argmax(axis=-1)
+        for fila in range(len(lote)):
+            i = desde + fila
+            etiquetas = ["O"] * len(palabras_por_texto[i])
+            scores = [0.0] * len(palabras_por_texto[i])
+            anterior = None
+            for posicion, palabra in enumerate(codificado.word_ids(fila)):
+                # Solo la primera subpalabra de cada palabra
+                if palabra is None or palabra == anterior:
+                    anterior = palabra if palabra is not None else anterior
+                    continue
+                anterior = palabra
+                etiquetas[palabra] = id2label[int(indices[fila, posicion])]
+                scores[palabra] = float(mejores[fila, posicion])
+            resultados.append(_spans_de_etiquetas(etiquetas, scores, offsets_por_texto[i], textos[i]))
+    return resultados
+
+
+def componentes_necesarios(nlp):
+    """Componentes del pipeline de spaCy que hacen falta para las entidades."""
+    return [nombre for nombre in nlp.pipe_names if nombre in COMPONENTES_NER_SPACY]
+
+
+def entidades_spacy(nlp, textos, etiquetas=("DATE",), batch_size=8, n_process=1):
+    """
+    Ejecuta solo los componentes de spaCy necesarios para el NER (sin tagger, parser,
+    lematizador...) y devuelve las entidades con las etiquetas indicadas.
+
+    Returns:
+        list: Por texto, lista de dicts con entity_group, word, score, start y end.
+    """
+    resultados = []
+    with nlp.select_pipes(enable=componentes_necesarios(nlp)):
+        for doc in nlp.pipe(textos, batch_size=batch_size, n_process=n_process):
+            resultados.append([
+                {"entity_group": ent.label_, "word": ent.text, "score": 1.0, "start": ent.start_char, "end": ent.end_char}
+                for ent in doc.ents if ent.label_ in etiquetas
+            ])
+    return resultados
+
+
+def _minimo_votos(politica, n_modelos):
+    if politica == "union":
+        return 1
+    if politica == "mayoria":
+        return n_modelos // 2 + 1
+    if politica == "unanimidad":
+        return n_modelos
+    raise ValueError(f"Política de votación desconocida: {politica}")
+
+
+def fusionar_por_offset(entidades_por_modelo, politica="union"):
+    """
+    Fusiona las menciones de varios modelos sobre el mismo texto.
+
+    Las menciones que se solapan forman un grupo; en cada grupo gana la mención
+    (inicio, fin, tipo) propuesta por más modelos (a igualdad, la más larga y después la
+    de mayor score), y se conserva si la proponen al menos los modelos que exige la
+    política: "union" (1), "mayoria" (más de la mitad) o "unanimidad" (todos).
+
+    Args:
+        entidades_por_modelo (list): Por modelo, lista de dicts con start, end,
+                                     entity_group, word y score.
+
+    Returns:
+        list: Menciones fusionadas (dicts) ordenadas por posición, con el número de
+              votos en "votos" y el score máximo de los modelos que la proponen.
+    """
+    minimo = _minimo_votos(politica, len(entidades_por_modelo))
+    candidatas = {}
+    for modelo, entidades in enumerate(entidades_por_modelo):
+        for ent in entidades:
+            clave = (ent["start"], ent["end"], ent["entity_group"])
+            candidata = candidatas.setdefault(clave, {**ent, "modelos": set()})
+            candidata["modelos"].add(modelo)
+            candidata["score"] = max(candidata["score"], ent["score"])
+
+    fusionadas = []
+    grupo, fin_grupo = [], -1
+    for clave in sorted(candidatas) + [None]:
+        if clave is not None and clave[0] < fin_grupo:
+            grupo.append(candidatas[clave])
+            fin_grupo = max(fin_grupo, clave[1])
+            continue
+        if grupo:
+            ganadora = max(grupo, key=lambda c: (len(c["modelos"]), c["end"] - c["start"], c["score"]))
+            if len(ganadora["modelos"]) >= minimo:
+                votos = len(ganadora.pop("modelos"))
+                fusionadas.append({**ganadora, "votos": votos})
+        if clave is not None:
+            grupo, fin_grupo = [candidatas[clave]], clave[1]
+    return fusionadas
+
+
+def extraer_entidades_fusion(fragmentos, reconocedores_hf, reconocedores_fecha, batch_size=8, n_process=1, politica="union", filtro_hf=None):
+    """
+    Extrae personas, lugares y fechas de varios fragmentos en una sola pasada por modelo:
+
+    - Los modelos BERT comparten la misma división en palabras de cada fragmento.
+    - Los modelos de spaCy solo ejecutan los componentes necesarios para el NER (el
+      reconocedor de fechas por reglas se aplica directamente).
+    - Las menciones de los modelos de cada grupo se fusionan por offset con la política
+      de votación indicada, en lugar de concatenarse.
+
+    filtro_hf, si se indica, se aplica a las menciones de cada modelo BERT antes de votar
+    (p. ej. procesar_entidades_con_excepcion para descartar las de score bajo).
+
+    Returns:
+        tuple: (menciones_hf, menciones_fecha), cada una una lista por fragmento de las
+               menciones fusionadas (dicts).
+    """
+    palabras, offsets = zip(*(dividir_en_palabras(texto) for texto in fragmentos)) if fragmentos else ((), ())
+
+    por_modelo_hf = []
+    for nombre in reconocedores_hf:
+        with medir(f"ner:{nombre}", fragmentos=len(fragmentos)) as etapa:
+            menciones = entidades_bert(obtener_modelo(nombre), fragmentos, palabras, offsets, batch_size)
+            if filtro_hf is not None:
+                menciones = [filtro_hf(m) for m in menciones]
+            por_modelo_hf.append(menciones)
+            etapa["entidades"] = sum(len(e) for e in por_modelo_hf[-1])
+
+    por_modelo_fecha = []
+    for nombre in reconocedores_fecha:
+        with medir(f"ner:{nombre}", fragmentos=len(fragmentos)) as etapa:
+            modelo = obtener_modelo(nombre)
+            if isinstance(modelo, ReconocedorFechas):
+                por_modelo_fecha.append(modelo.menciones_lote(fragmentos))
+            else:
+                por_modelo_fecha.append(entidades_spacy(modelo, fragmentos, batch_size=batch_size, n_process=n_process))
+            etapa["entidades"] = sum(len(e) for e in por_modelo_fecha[-1])
+
+    def fusionar(por_modelo, i):
+        return fusionar_por_offset([modelo[i] for modelo in por_modelo], politica) if por_modelo else []
+
+    return (
+        [fusionar(por_modelo_hf, i) for i in range(len(fragmentos))],
+        [fusionar(por_modelo_fecha, i) for i in range(len(fragmentos))],
+    )
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.nlp.entity_recognition import extract_entities_batch, claves_cache_entidades, modelos_ner, formato_entidades
+from src.nlp.model_registry import precargar_modelos
+
+
+# Opciones de extract_entities_batch de este worker (las fija _inicializar_worker)
+_opciones_worker = {}
+
+
+def hilos_por_worker(max_workers):
+    """Hilos de PyTorch/ONNX Runtime por worker para no usar más hilos que núcleos."""
+    return max(1, (os.cpu_count() or 1) // max_workers)
+
+
+def _fijar_hilos(hilos):
+    # Con spawn el worker aún no ha importado torch, así que las variables de entorno
+    # también limitan los pools de OpenMP/MKL que se crean al importarlo
+    os.environ["OMP_NUM_THREADS"] = str(hilos)
+    os.environ["MKL_NUM_THREADS"] = str(hilos)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(hilos)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Solo puede fijarse una vez por proceso, antes del primer cálculo
+        pass
+
+
+def _inicializar_worker(opciones, hilos, preparar):
+    if preparar is not None:
+        preparar()
+    _fijar_hilos(hilos)
+    if opciones["backend"] != "pytorch":
+        from src.nlp.onnx_backend import configurar
+
+        configurar(hilos=hilos)
+    _opciones_worker.update(opciones)
+    # Cargar los modelos una sola vez, antes de recibir el primer lote
+    precargar_modelos(modelos_ner(opciones["reconocedores"], opciones["fechas"], opciones["backend"]))
+    print(f"Worker NER {os.getpid()}: modelos cargados ({hilos} hilos)")
+
+
+def _entidades_de_lote(lote, opciones=None):
+    ids, textos = zip(*lote)
+    return list(zip(ids, extract_entities_batch(list(textos), **(opciones or _opciones_worker))))
+
+
+def iter_entidades_paralelo(fragmentos, max_workers=None, batch_size=8, reconocedores=None, fusion=None,
+                            fechas="spacy", backend="pytorch", hilos=None, cache=None, preparar=None, posiciones=False):
+    """
+    Extrae las entidades de los fragmentos con un pool de procesos y las va devolviendo
+    como (chunk_id, entidades) en el orden de los fragmentos, sin esperar al resto.
+
+    Cada worker carga los reconocedores una sola vez al arrancar (initializer) y limita
+    los hilos de PyTorch (u ONNX Runtime) a hilos, para que los workers no compitan por
+    los núcleos. Los fragmentos se reparten en lotes de batch_size por la cola del pool.
+    Cada worker tiene su propia copia de los modelos: la memoria crece con max_workers.
+
+    Los workers se crean con spawn: hacer fork de un proceso que ya ha usado los hilos de
+    PyTorch puede bloquear al worker.
+
+    Args:
+        fragmentos (list): Textos a procesar; chunk_id es su posición en la lista.
+        max_workers (int): Procesos del pool (None: número de CPUs; 1: sin pool).
+        batch_size, reconocedores, fusion, fechas, backend, posiciones: Ver extract_entities_batch.
+        hilos (int): Hilos por worker (por defecto, núcleos / max_workers).
+        cache (CacheResultados): Caché opcional; se consulta y actualiza en el proceso
+                                 principal, con las mismas claves que extract_entities_batch.
+        preparar (callable): Función sin argumentos (importable desde otro proceso) que
+                             cada worker ejecuta antes de cargar los modelos, p. ej.
+                             benchmarks.stubs.registrar_stubs.
+
+    Yields:
+        tuple: (chunk_id, lista de tuplas (texto_entidad, etiqueta), o (texto_entidad,
+               etiqueta, inicio) con posiciones), en el orden de fragmentos.
+    """
+    # Los workers devuelven las entidades como se guardan en la caché: con la posición en
+    # el fragmento sin los espacios de los extremos (ver formato_entidades)
+    opciones = {"batch_size": batch_size, "reconocedores": reconocedores, "fusion": fusion,
+                "fechas": fechas, "backend": backend, "posiciones": True}
+    max_workers = max_workers or os.cpu_count() or 1
+
+    encontradas = {}
+    claves = []
+    if cache is not None:
+        claves = claves_cache_entidades(cache, fragmentos, reconocedores, fusion, fechas, backend)
+        for i, clave in enumerate(claves):
+            encontrado, valor = cache.obtener(clave)
+            if encontrado:
+                encontradas[i] = valor
+    pendientes = [i for i in range(len(fragmentos)) if i not in encontradas]
+    lotes = [[(i, fragmentos[i].strip()) for i in pendientes[desde:desde + batch_size]]
+             for desde in range(0, len(pendientes), batch_size)]
+
+    def combinar(calculados):
+        # Intercalar los fragmentos de la caché con los calculados, en orden
+        calculados = (par for lote in calculados for par in lote)
+        for i in range(len(fragmentos)):
+            if i in encontradas:
+                entidades = encontradas[i]
+            else:
+                _, entidades = next(calculados)
+                if cache is not None:
+                    cache.guardar(claves[i], entidades)
+            yield i, formato_entidades(entidades, fragmentos[i], posiciones)
+
+    if max_workers == 1 or len(lotes) <= 1:
+        # Sin pool: los lotes se procesan en este proceso, también en orden
+        yield from combinar(_entidades_de_lote(lote, opciones) for lote in lotes)
+        return
+
+    workers = min(max_workers, len(lotes))
+    hilos = hilos or hilos_por_worker(workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_inicializar_worker, initargs=(opciones, hilos, preparar)) as executor:
+        yield from combinar(executor.map(_entidades_de_lote, lotes))
+
+
+def extraer_entidades_paralelo(fragmentos, max_workers=None, **opciones):
+    """
+    Versión de extract_entities_batch con un pool de procesos (ver iter_entidades_paralelo).
+
+    Returns:
+        list: Una lista de tuplas (texto_entidad, etiqueta) por fragmento, en orden.
+    """
+    return [entidades for _, entidades in iter_entidades_paralelo(fragmentos, max_workers, **opciones)]
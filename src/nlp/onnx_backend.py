@@ -0,0 +1,192 @@
+import json
+import os
+from pathlib import Path
+from src.nlp.model_registry import IDENTIFICADORES, BACKENDS, MODELOS_CON_BACKEND, obtener_modelo, descargar_modelo, nombre_con_backend
+
+
+# Configuración de los modelos ONNX que se cargan a través de model_registry
+# (ver configurar): directorio de los modelos exportados e hilos por inferencia
+CONFIGURACION = {"directorio": "data/models/onnx", "hilos": None}
+
+ARCHIVO_MODELO = "model.onnx"
+ARCHIVO_MODELO_INT8 = "model.int8.onnx"
+
+
+def configurar(directorio=None, hilos=None):
+    """
+    Cambia el directorio de los modelos exportados y los hilos de ONNX Runtime
+    (intra_op_num_threads; None deja que ONNX Runtime use todos los núcleos).
+    Descarta los modelos ONNX ya cargados para que se vuelvan a crear con la nueva
+    configuración.
+    """
+    if directorio is not None:
+        CONFIGURACION["directorio"] = directorio
+    CONFIGURACION["hilos"] = hilos
+    for nombre in MODELOS_CON_BACKEND:
+        for backend in BACKENDS[1:]:
+            descargar_modelo(nombre_con_backend(nombre, backend))
+
+
+def exportar_onnx(nombre, directorio=None, cuantizar=False, forzar=False):
+    """
+    Exporta a ONNX el modelo de Hugging Face de un reconocedor (p. ej. BETO), con el
+    tokenizer y la configuración (id2label) en el mismo directorio. Si el modelo ya está
+    exportado no se vuelve a exportar, salvo con forzar.
+
+    Args:
+        nombre (str): Reconocedor de Hugging Face (ver IDENTIFICADORES).
+        directorio (str): Directorio base; el modelo se guarda en <directorio>/<nombre>.
+        cuantizar (bool): Genera también la versión con cuantización dinámica a int8.
+
+    Returns:
+        Path: Archivo .onnx del modelo (el cuantizado si cuantizar es True).
+    """
+    destino = Path(directorio or CONFIGURACION["directorio"]) / nombre
+    ruta = destino / ARCHIVO_MODELO
+    if forzar or not ruta.exists():
+        import torch
+        from transformers import AutoTokenizer, AutoModelForTokenClassification
+
+        print(f"Exportando {IDENTIFICADORES[nombre]} a ONNX...")
+        tokenizer = AutoTokenizer.from_pretrained(IDENTIFICADORES[nombre])
+        modelo = AutoModelForTokenClassification.from_pretrained(IDENTIFICADORES[nombre]).eval()
+        ejemplo = tokenizer(["Bill Denbrough vive en Derry"], return_tensors="pt")
+        entradas = list(ejemplo.keys())
+
+        class _Logits(torch.nn.Module):
+            # Entradas posicionales en el orden de entradas y solo los logits como salida
+            def __init__(self):
+                super().__init__()
+                self.modelo = modelo
+
+            def forward(self, *tensores):
+                return self.modelo(**dict(zip(entradas, tensores))).logits
+
+        ejes = {nombre_eje: {0: "lote", 1: "secuencia"} for nombre_eje in entradas + ["logits"]}
+        destino.mkdir(parents=True, exist_ok=True)
+        temporal = destino / f".{ARCHIVO_MODELO}.{os.getpid()}.tmp"
+        with torch.inference_mode():
+            torch.onnx.export(
+                _Logits(), tuple(ejemplo[k] for k in entradas), str(temporal),
+                input_names=entradas, output_names=["logits"], dynamic_axes=ejes,
+                opset_version=17, dynamo=False,
+            )
+        tokenizer.save_pretrained(destino)
+        modelo.config.save_pretrained(destino)
+        os.replace(temporal, ruta)
+        print(f"Modelo exportado en {ruta}")
+
+    if not cuantizar:
+        return ruta
+    ruta_int8 = destino / ARCHIVO_MODELO_INT8
+    if forzar or not ruta_int8.exists():
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        temporal = destino / f".{ARCHIVO_MODELO_INT8}.{os.getpid()}.tmp"
+        quantize_dynamic(str(ruta), str(temporal), weight_type=QuantType.QInt8)
+        os.replace(temporal, ruta_int8)
+        print(f"Modelo cuantizado en {ruta_int8}")
+    return ruta_int8
+
+
+class NerOnnx:
+    """
+    Modelo de NER exportado con exportar_onnx, ejecutado con ONNX Runtime en CPU.
+
+    Tiene la interfaz del pipeline "ner" de Hugging Face: reconocedor(texto) o
+    reconocedor(textos, batch_size=8) devuelven las entidades como dicts con
+    entity_group, word, score, start y end, y tokenizer es el del modelo (para
+    src.nlp.chunking). Pero no reproduce aggregation_strategy="first": el texto se divide
+    en palabras con src.nlp.ner_fusion.dividir_en_palabras (no con la heurística de
+    subpalabras del pipeline) y cada palabra toma la etiqueta de su primera subpalabra,
+    como en src.nlp.ner_fusion.entidades_bert. word es el trozo del texto entre start y
+    end, no los tokens decodificados: conserva mayúsculas y tildes aunque el tokenizer no
+    las distinga y nunca contiene '##', así que el filtro de entidades cortadas de
+    procesar_entidades_con_excepcion no descarta nada. La paridad con PyTorch se comprueba
+    por spans con verificar_paridad (benchmarks/onnx_parity.py).
+    """
+
+    def __init__(self, ruta_modelo, hilos=None):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        ruta_modelo = Path(ruta_modelo)
+        opciones = onnxruntime.SessionOptions()
+        opciones.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if hilos:
+            opciones.intra_op_num_threads = hilos
+        # Un solo grafo por llamada: el paralelismo está dentro de cada operación
+        opciones.inter_op_num_threads = 1
+        self.sesion = onnxruntime.InferenceSession(str(ruta_modelo), opciones, providers=["CPUExecutionProvider"])
+        self.entradas = [entrada.name for entrada in self.sesion.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(ruta_modelo.parent)
+        with open(ruta_modelo.parent / "config.json", "r", encoding="utf-8") as f:
+            self.id2label = {int(i): etiqueta for i, etiqueta in json.load(f)["id2label"].items()}
+
+    def probabilidades_palabras(self, lote):
+        """
+        Args:
+            lote (list): Textos ya divididos en palabras (listas de cadenas).
+
+        Returns:
+            tuple: (codificado, probabilidades): la salida del tokenizer (con word_ids) y
+                   un array (lote, secuencia, etiquetas) con el softmax de los logits.
+        """
+        import numpy as np
+
+        codificado = self.tokenizer(lote, is_split_into_words=True, truncation=True, padding=True, return_tensors="np")
+        logits = self.sesion.run(["logits"], {k: codificado[k].astype(np.int64) for k in self.entradas})[0]
+        exponenciales = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return codificado, exponenciales / exponenciales.sum(axis=-1, keepdims=True)
+
+    def __call__(self, textos, batch_size=8):
+        from src.nlp.ner_fusion import dividir_en_palabras, entidades_bert
+
+        individual = isinstance(textos, str)
+        if individual:
+            textos = [textos]
+        palabras, offsets = zip(*(dividir_en_palabras(texto) for texto in textos)) if textos else ((), ())
+        resultados = entidades_bert(self, textos, palabras, offsets, batch_size)
+        return resultados[0] if individual else resultados
+
+
+def cargar_ner_onnx(nombre, cuantizar=False):
+    """Exporta el modelo si hace falta y lo carga con la configuración actual (ver configurar)."""
+    ruta = exportar_onnx(nombre, cuantizar=cuantizar)
+    return NerOnnx(ruta, hilos=CONFIGURACION["hilos"])
+
+
+def verificar_paridad(nombre, textos, backend="onnx", batch_size=8):
+    """
+    Compara las entidades de un reconocedor de Hugging Face con PyTorch y con el backend
+    ONNX indicado sobre los mismos textos.
+
+    Returns:
+        dict: Menciones (inicio, fin, tipo) de cada backend, coincidencias, fracción de
+              textos con exactamente las mismas menciones y la mayor diferencia de score
+              entre menciones coincidentes.
+    """
+    referencia = obtener_modelo(nombre)(textos, batch_size=batch_size)
+    candidato = obtener_modelo(nombre_con_backend(nombre, backend))(textos, batch_size=batch_size)
+    coincidencias = iguales = total_ref = total_cand = 0
+    max_diferencia_score = 0.0
+    for ents_ref, ents_cand in zip(referencia, candidato):
+        por_span_ref = {(e["start"], e["end"], e["entity_group"]): e["score"] for e in ents_ref}
+        por_span_cand = {(e["start"], e["end"], e["entity_group"]): e["score"] for e in ents_cand}
+        comunes = por_span_ref.keys() & por_span_cand.keys()
+        coincidencias += len(comunes)
+        total_ref += len(por_span_ref)
+        total_cand += len(por_span_cand)
+        iguales += por_span_ref.keys() == por_span_cand.keys()
+        for span in comunes:
+            max_diferencia_score = max(max_diferencia_score, abs(float(por_span_ref[span]) - por_span_cand[span]))
+    return {
+        "reconocedor": nombre,
+        "backend": backend,
+        "textos": len(textos),
+        "menciones_pytorch": total_ref,
+        "menciones_backend": total_cand,
+        "coincidencias": coincidencias,
+        "textos_identicos": iguales / len(textos) if textos else 1.0,
+        "max_diferencia_score": max_diferencia_score,
+    }
@@ -0,0 +1,152 @@
+import re
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from rapidfuzz import process, fuzz
+from src.common.util import limpiar_uri, regex_trie
+from src.nlp.chunking import dividir_en_oraciones
+
+
+# Aparición de una entidad en el texto: posición [inicio, fin), nombre de la entidad y
+# puntuación de similitud (100 para las coincidencias exactas)
+Mencion = namedtuple("Mencion", ["inicio", "fin", "entidad", "score"])
+
+_PATRON_PALABRA = re.compile(r'\w+')
+
+# Número máximo de ventanas de texto comparadas de una vez con process.cdist
+_BLOQUE_VENTANAS = 4096
+
+
+def forma_de_busqueda(nombre):
+    """Forma normalizada de un nombre de entidad para buscarlo en el texto."""
+    return limpiar_uri(nombre).replace('_', ' ').lower()
+
+
+class BuscadorMenciones:
+    """
+    Localiza las menciones de un conjunto de entidades en un texto.
+
+    Las coincidencias exactas (sin distinguir mayúsculas) se buscan con una única
+    expresión regular en forma de trie, en una pasada sobre el texto. Si se indica
+    umbral_fuzzy, las entidades que no aparecen literalmente se comparan además con
+    las ventanas de palabras del texto de su misma longitud usando process.cdist.
+    """
+
+    def __init__(self, entidades, umbral_fuzzy=None):
+        """
+        Args:
+            entidades (list): Lista de tuplas (nombre_entidad, tipo) o de nombres.
+            umbral_fuzzy (int): Similitud mínima (0-100) para aceptar una mención aproximada.
+                                None desactiva la búsqueda aproximada.
+        """
+        self.umbral_fuzzy = umbral_fuzzy
+        # Forma de búsqueda -> nombre de la entidad (ante formas repetidas gana la primera)
+        self.formas = {}
+        for entidad in entidades:
+            nombre = entidad[0] if isinstance(entidad, tuple) else entidad
+            forma = forma_de_busqueda(nombre)
+            if forma.strip():
+                self.formas.setdefault(forma, nombre)
+        self._patron = re.compile(r'\b(?:' + regex_trie(self.formas) + r')\b') if self.formas else None
+
+    def buscar(self, texto):
+        """
+        Returns:
+            list: Lista de Mencion ordenada por posición.
+        """
+        if self._patron is None:
+            return []
+        minusculas = texto.lower()
+        if len(minusculas) != len(texto):
+            # Mantener las posiciones alineadas con el texto original
+            minusculas = "".join(c if len(c.lower()) != 1 else c.lower() for c in texto)
+        menciones = [
+            Mencion(m.start(), m.end(), self.formas[m.group(0)], 100)
+            for m in self._patron.finditer(minusculas)
+        ]
+        if self.umbral_fuzzy is not None:
+            encontradas = {mencion.entidad for mencion in menciones}
+            menciones.extend(self._buscar_aproximadas(minusculas, menciones, encontradas))
+            menciones.sort()
+        return menciones
+
+    def _buscar_aproximadas(self, minusculas, exactas, encontradas):
+        palabras = [m.span() for m in _PATRON_PALABRA.finditer(minusculas)]
+        ocupadas = [(m.inicio, m.fin) for m in exactas]
+
+        # Agrupar las entidades no encontradas por número de palabras
+        por_longitud = {}
+        for forma, nombre in self.formas.items():
+            if nombre not in encontradas:
+                por_longitud.setdefault(len(forma.split()), []).append((forma, nombre))
+
+        aproximadas = []
+        for n, candidatas in por_longitud.items():
+            if n == 0 or n > len(palabras):
+                continue
+            formas = [forma for forma, _ in candidatas]
+            inicios = [palabras[i][0] for i in range(len(palabras) - n + 1)]
+            fines = [palabras[i + n - 1][1] for i in range(len(palabras) - n + 1)]
+            for desde in range(0, len(inicios), _BLOQUE_VENTANAS):
+                hasta = min(desde + _BLOQUE_VENTANAS, len(inicios))
+                ventanas = [minusculas[inicios[i]:fines[i]] for i in range(desde, hasta)]
+                scores = process.cdist(formas, ventanas, scorer=fuzz.ratio, score_cutoff=self.umbral_fuzzy, workers=-1)
+                for fila, columna in zip(*scores.nonzero()):
+                    inicio, fin = inicios[desde + columna], fines[desde + columna]
+                    if any(inicio < f and i < fin for i, f in ocupadas):
+                        continue
+                    aproximadas.append(Mencion(inicio, fin, candidatas[fila][1], float(scores[fila, columna])))
+        return aproximadas
+
+
+def _contar_pares(nombres, conteo):
+    for i in range(len(nombres)):
+        for j in range(i + 1, len(nombres)):
+            src, tgt = sorted((nombres[i], nombres[j]))
+            conteo[(src, "co_ocurre_con", tgt)] += 1
+
+
+def extraer_coocurrencias(texto, entidades, ventana="oracion", umbral_fuzzy=None, buscador=None, desde=0):
+    """
+    Extrae relaciones de co-ocurrencia ponderadas entre entidades.
+
+    Args:
+        texto (str): Texto donde buscar.
+        entidades (list): Lista de tuplas (nombre_entidad, tipo).
+        ventana: "oracion" para relacionar las entidades que aparecen en la misma oración, o
+                 un entero con la distancia máxima en caracteres entre dos menciones.
+        umbral_fuzzy (int): Similitud mínima para menciones aproximadas (None: solo exactas).
+        buscador (BuscadorMenciones): Buscador ya construido, para reutilizarlo entre textos.
+        desde (int): Solo cuenta las oraciones que empiezan en esta posición o después (con
+                     una ventana en caracteres, los pares cuya segunda mención empieza ahí o
+                     después). Con fragmentos solapados es su inicio_nuevo relativo, para no
+                     contar dos veces las oraciones repetidas del fragmento anterior.
+
+    Returns:
+        Counter: {(src, "co_ocurre_con", tgt): número de co-ocurrencias}. Las claves tienen
+                 el mismo formato que las relaciones de extract_relationships.
+    """
+    if buscador is None:
+        buscador = BuscadorMenciones(entidades, umbral_fuzzy)
+    menciones = buscador.buscar(texto)
+    conteo = Counter()
+
+    if ventana == "oracion":
+        oraciones = dividir_en_oraciones(texto)
+        inicios = [inicio for inicio, _ in oraciones]
+        por_oracion = {}
+        for mencion in menciones:
+            indice = bisect_right(inicios, mencion.inicio) - 1
+            if indice < 0 or inicios[indice] < desde:
+                continue
+            por_oracion.setdefault(indice, {})[mencion.entidad] = None
+        for nombres in por_oracion.values():
+            _contar_pares(list(nombres), conteo)
+    else:
+        for i, mencion in enumerate(menciones):
+            for otra in menciones[i + 1:]:
+                if otra.inicio - mencion.fin > ventana:
+                    break
+                if otra.entidad != mencion.entidad and otra.inicio >= desde:
+                    src, tgt = sorted((mencion.entidad, otra.entidad))
+                    conteo[(src, "co_ocurre_con", tgt)] += 1
+    return conteo
@@ -1,14 +1,33 @@
-from neo4j import GraphDatabase, exceptions
+import re
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from neo4j import GraphDatabase, AsyncGraphDatabase, exceptions
+from rdflib.namespace import FOAF
+from src.common.util import limpiar_uri
+from src.ontology.ontology_builder import EX, clase_de_tipo, predicado_relacion
 
-def clear_graph_tx(tx):
-    tx.run("MATCH (n) DETACH DELETE n")
+# Etiqueta común a todos los nodos cargados con UNWIND, indexada por uri
+ETIQUETA_ENTIDAD = "Entidad"
 
-def init_n10s_config_tx(tx):
-    tx.run("CALL n10s.graphconfig.init()")
+# Etiqueta Neo4j de cada clase de la ontología
+ETIQUETAS_POR_CLASE = {
+    FOAF.Person: "Personaje",
+    EX.lugar: "Lugar",
+    EX.fecha: "Fecha",
+    EX.organizacion: "Organizacion",
+    EX.evento: "Evento",
+    EX.miscelaneo: "Miscelaneo",
+}
 
-def set_n10s_config_tx(tx):
-    # Configura Neosemantics para usar el prefijo ex y otras opciones recomendadas
-    tx.run("""
+# Consultas de la carga con n10s (insert_ontology)
+CONSULTA_LIMPIAR = "MATCH (n) DETACH DELETE n"
+
+CONSULTA_INIT_N10S = "CALL n10s.graphconfig.init()"
+
+# Configura Neosemantics para usar el prefijo ex y otras opciones recomendadas
+CONSULTA_CONFIG_N10S = """
     CALL n10s.graphconfig.set({
       handleVocabUris: 'SHORTEN',
       handleMultival: 'ARRAY',
@@ -16,36 +35,54 @@ def set_n10s_config_tx(tx):
       handleRDFTypes: 'LABELS',
       prefixMappings: { ex: 'http://example.org/' }
     })
-    """)
+    """
 
-def _import_ontology_tx(tx, turtle_data):
-    query = """
+CONSULTA_IMPORTAR = """
     CALL n10s.rdf.import.inline($turtle, 'Turtle')
     """
-    tx.run(query, turtle=turtle_data)
 
-def normalize_ns0_nombre_tx(tx):
-    tx.run("""
+CONSULTA_NORMALIZAR_NS0 = """
     MATCH (n)
     WHERE exists(n.`ns0__nombre`)
     SET n.name = n.`ns0__nombre`
     REMOVE n.`ns0__nombre`
-    """)
+    """
 
-def normalize_ns1_name_tx(tx):
-    tx.run("""
+CONSULTA_NORMALIZAR_NS1 = """
     MATCH (n)
     WHERE exists(n.`ns1__name`)
     SET n.name = n.`ns1__name`
     REMOVE n.`ns1__name`
-    """)
+    """
 
-def remove_unconnected_nodes_tx(tx):
-    tx.run("""
+CONSULTA_ELIMINAR_DESCONECTADOS = """
     MATCH (n)
     WHERE NOT (n)--()
     DELETE n
-    """)
+    """
+
+CONSULTA_CONTAR_NODOS = "MATCH (n) RETURN count(n) AS node_count"
+
+def clear_graph_tx(tx):
+    tx.run(CONSULTA_LIMPIAR)
+
+def init_n10s_config_tx(tx):
+    tx.run(CONSULTA_INIT_N10S)
+
+def set_n10s_config_tx(tx):
+    tx.run(CONSULTA_CONFIG_N10S)
+
+def _import_ontology_tx(tx, turtle_data):
+    tx.run(CONSULTA_IMPORTAR, turtle=turtle_data)
+
+def normalize_ns0_nombre_tx(tx):
+    tx.run(CONSULTA_NORMALIZAR_NS0)
+
+def normalize_ns1_name_tx(tx):
+    tx.run(CONSULTA_NORMALIZAR_NS1)
+
+def remove_unconnected_nodes_tx(tx):
+    tx.run(CONSULTA_ELIMINAR_DESCONECTADOS)
 
 def generar_historia_y_guardar(self, archivo_salida):
     query = """
@@ -61,40 +98,420 @@ def generar_historia_y_guardar(self, archivo_salida):
     """
 
 def validate_import_tx(tx):
-    result = tx.run("MATCH (n) RETURN count(n) AS node_count")
+    result = tx.run(CONSULTA_CONTAR_NODOS)
     record = result.single()
     return record["node_count"] if record else 0
 
+
+# Consultas de la carga directa (UNWIND) y de la actualización incremental (upsert)
+
+# La restricción de unicidad crea también el índice sobre uri
+CONSULTA_RESTRICCIONES = f"CREATE CONSTRAINT entidad_uri_unica IF NOT EXISTS FOR (n:{ETIQUETA_ENTIDAD}) REQUIRE n.uri IS UNIQUE"
+
+def create_constraints_tx(tx):
+    tx.run(CONSULTA_RESTRICCIONES)
+
+def _consulta_crear_nodos(etiqueta):
+    return f"""
+    UNWIND $filas AS fila
+    CREATE (n:{ETIQUETA_ENTIDAD}:`{etiqueta}` {{uri: fila.uri, name: fila.name}})
+    """
+
+def _consulta_crear_relaciones(tipo_rel):
+    return f"""
+    UNWIND $filas AS fila
+    MATCH (a:{ETIQUETA_ENTIDAD} {{uri: fila.src}})
+    MATCH (b:{ETIQUETA_ENTIDAD} {{uri: fila.tgt}})
+    CREATE (a)-[:`{tipo_rel}` {{peso: fila.peso}}]->(b)
+    """
+
+def _consulta_upsert_nodos(etiqueta):
+    return f"""
+    UNWIND $filas AS fila
+    MERGE (n:{ETIQUETA_ENTIDAD} {{uri: fila.uri}})
+    ON CREATE SET n.name = fila.name
+    SET n:`{etiqueta}`
+    WITH n, coalesce(n.libros, []) AS libros
+    SET n.libros = CASE WHEN $libro IN libros THEN libros ELSE libros + $libro END
+    """
+
+def _consulta_upsert_relaciones(tipo_rel):
+    return f"""
+    UNWIND $filas AS fila
+    MATCH (a:{ETIQUETA_ENTIDAD} {{uri: fila.src}})
+    MATCH (b:{ETIQUETA_ENTIDAD} {{uri: fila.tgt}})
+    MERGE (a)-[r:`{tipo_rel}` {{libro: $libro}}]->(b)
+    SET r.peso = fila.peso, r.ejecucion = $ejecucion
+    """
+
+CONSULTA_BORRAR_OBSOLETAS = f"""
+    MATCH (n:{ETIQUETA_ENTIDAD})-[r]->()
+    WHERE $libro IN n.libros AND r.libro = $libro AND r.ejecucion <> $ejecucion
+    WITH r LIMIT $limite
+    DELETE r
+    RETURN count(*) AS n
+    """
+
+# Quitar el libro de los nodos que ya no tienen relaciones suyas y borrar los que
+# se quedan sin libros ni relaciones
+CONSULTA_DESVINCULAR = f"""
+    MATCH (n:{ETIQUETA_ENTIDAD})
+    WHERE $libro IN n.libros AND NOT exists {{ MATCH (n)-[r]-() WHERE r.libro = $libro }}
+    SET n.libros = [l IN n.libros WHERE l <> $libro]
+    WITH n
+    WHERE size(n.libros) = 0 AND NOT (n)--()
+    DELETE n
+    RETURN count(*) AS n
+    """
+
+
+def _nombre_cypher(texto):
+    """Convierte un texto en un identificador seguro para etiquetas o tipos de relación."""
+    return re.sub(r'[^A-Za-z0-9_]', '_', texto) or "_"
+
+def _etiqueta_de_tipo(tipo_norm):
+    clase = clase_de_tipo(tipo_norm)
+    return ETIQUETAS_POR_CLASE.get(clase, _nombre_cypher(limpiar_uri(tipo_norm).capitalize()))
+
+def _tipo_de_predicado(predicado):
+    # Nombre local del predicado: ex:co_ocurre_con -> co_ocurre_con, foaf:knows -> knows
+    return _nombre_cypher(re.split(r'[/#]', str(predicado))[-1])
+
+def preparar_filas(entidades, relaciones, solo_conectadas=True):
+    """
+    Convierte las listas de entidades y relaciones en filas para cargar con UNWIND,
+    aplicando las mismas reglas de tipos y predicados que generate_ontology.
+
+    Args:
+        entidades (list): Lista de tuplas (nombre_entidad, tipo).
+        relaciones: Lista de tuplas (src, verbo, tgt) o diccionario {(src, verbo, tgt): peso}.
+        solo_conectadas (bool): Si es True, omite las entidades sin relaciones, que
+                                insert_ontology eliminaba después de importar.
+
+    Returns:
+        tuple: ({etiqueta: [{"uri", "name"}]}, {tipo_relacion: [{"src", "tgt", "peso"}]})
+    """
+    # URI -> (etiqueta, nombre, tipo); ante URIs repetidas gana la primera entidad
+    nodos = {}
+    for nombre, tipo in entidades:
+        uri = str(EX[limpiar_uri(nombre)])
+        if uri not in nodos:
+            tipo_norm = tipo.lower()
+            nodos[uri] = (_etiqueta_de_tipo(tipo_norm), nombre, tipo_norm)
+
+    pesos = relaciones if isinstance(relaciones, dict) else None
+    aristas = {}
+    for relacion in (relaciones if pesos is None else pesos.keys()):
+        src, verbo, tgt = relacion
+        if src == tgt:
+            continue
+        src_uri = str(EX[limpiar_uri(src)])
+        tgt_uri = str(EX[limpiar_uri(tgt)])
+        if src_uri not in nodos or tgt_uri not in nodos:
+            continue
+        tipo_rel = _tipo_de_predicado(predicado_relacion(nodos[src_uri][2], nodos[tgt_uri][2], verbo))
+        clave = (tipo_rel, src_uri, tgt_uri)
+        aristas[clave] = aristas.get(clave, 0) + (pesos[relacion] if pesos is not None else 1)
+
+    conectadas = {uri for _, src, tgt in aristas for uri in (src, tgt)}
+    filas_nodos = {}
+    for uri, (etiqueta, nombre, _) in nodos.items():
+        if solo_conectadas and uri not in conectadas:
+            continue
+        filas_nodos.setdefault(etiqueta, []).append({"uri": uri, "name": nombre})
+    filas_relaciones = {}
+    for (tipo_rel, src, tgt), peso in aristas.items():
+        filas_relaciones.setdefault(tipo_rel, []).append({"src": src, "tgt": tgt, "peso": peso})
+    return filas_nodos, filas_relaciones
+
+def _en_lotes(filas, batch_size):
+    for i in range(0, len(filas), batch_size):
+        yield filas[i:i + batch_size]
+
+# Un plan es una lista de pasos (nombre, consultas, limite). Las consultas de un paso se
+# ejecutan en una sola transacción. Si limite no es None, el paso se repite mientras la
+# última consulta devuelva n == limite (borrados por lotes).
+
+def _plan_insertar_ontologia(turtle_data):
+    return [
+        ("limpiar", [(CONSULTA_LIMPIAR, {})], None),
+        ("configurar_n10s", [(CONSULTA_INIT_N10S, {}), (CONSULTA_CONFIG_N10S, {})], None),
+        ("importar", [
+            (CONSULTA_IMPORTAR, {"turtle": turtle_data}),
+            (CONSULTA_NORMALIZAR_NS0, {}),
+            (CONSULTA_NORMALIZAR_NS1, {}),
+            (CONSULTA_ELIMINAR_DESCONECTADOS, {}),
+        ], None),
+    ]
+
+def _plan_cargar_unwind(entidades, relaciones, batch_size, limpiar):
+    filas_nodos, filas_relaciones = preparar_filas(entidades, relaciones)
+    plan = [("limpiar", [(CONSULTA_LIMPIAR, {})], None)] if limpiar else []
+    plan.append(("restricciones", [(CONSULTA_RESTRICCIONES, {})], None))
+    for etiqueta, filas in filas_nodos.items():
+        for lote in _en_lotes(filas, batch_size):
+            plan.append(("nodos", [(_consulta_crear_nodos(etiqueta), {"filas": lote})], None))
+    for tipo_rel, filas in filas_relaciones.items():
+        for lote in _en_lotes(filas, batch_size):
+            plan.append(("relaciones", [(_consulta_crear_relaciones(tipo_rel), {"filas": lote})], None))
+    return plan
+
+def _plan_upsert_libro(libro, entidades, relaciones, batch_size):
+    filas_nodos, filas_relaciones = preparar_filas(entidades, relaciones)
+    ejecucion = uuid.uuid4().hex
+    plan = [("restricciones", [(CONSULTA_RESTRICCIONES, {})], None)]
+    for etiqueta, filas in filas_nodos.items():
+        for lote in _en_lotes(filas, batch_size):
+            plan.append(("nodos", [(_consulta_upsert_nodos(etiqueta), {"filas": lote, "libro": libro})], None))
+    for tipo_rel, filas in filas_relaciones.items():
+        for lote in _en_lotes(filas, batch_size):
+            parametros = {"filas": lote, "libro": libro, "ejecucion": ejecucion}
+            plan.append(("relaciones", [(_consulta_upsert_relaciones(tipo_rel), parametros)], None))
+    parametros = {"libro": libro, "ejecucion": ejecucion, "limite": batch_size}
+    plan.append(("relaciones_obsoletas", [(CONSULTA_BORRAR_OBSOLETAS, parametros)], batch_size))
+    plan.append(("nodos_obsoletos", [(CONSULTA_DESVINCULAR, {"libro": libro})], None))
+    return plan
+
+def _valor_n(registros):
+    return registros[0]["n"] if registros and "n" in registros[0].keys() else 0
+
+def _ejecutar_consultas_tx(tx, consultas):
+    """
+    Ejecuta las consultas en la misma transacción y devuelve el valor n de la última.
+    Solo se lee un registro de la última: las demás se consumen sin leerlas, porque
+    algunas (p. ej. las de configuración de n10s) devuelven una fila por parámetro.
+    """
+    *previas, (ultima, parametros_ultima) = consultas
+    for consulta, parametros in previas:
+        tx.run(consulta, **parametros).consume()
+    result = tx.run(ultima, **parametros_ultima)
+    registros = result.fetch(1)
+    result.consume()
+    return _valor_n(registros)
+
+async def _ejecutar_consultas_tx_async(tx, consultas):
+    *previas, (ultima, parametros_ultima) = consultas
+    for consulta, parametros in previas:
+        result = await tx.run(consulta, **parametros)
+        await result.consume()
+    result = await tx.run(ultima, **parametros_ultima)
+    registros = await result.fetch(1)
+    await result.consume()
+    return _valor_n(registros)
+
+def _contar_nodos_tx(tx):
+    return tx.run(CONSULTA_CONTAR_NODOS).single()["node_count"]
+
+async def _contar_nodos_tx_async(tx):
+    result = await tx.run(CONSULTA_CONTAR_NODOS)
+    registro = await result.single()
+    return registro["node_count"]
+
+
+class _LatenciasMixin:
+    """Registro de la latencia de cada paso (segundos por llamada)."""
+
+    def _iniciar_latencias(self):
+        self.latencias = defaultdict(list)
+
+    @contextmanager
+    def _medir(self, paso):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencias[paso].append(time.perf_counter() - inicio)
+
+    def resumen_latencias(self):
+        """
+        Returns:
+            dict: {paso: {"llamadas", "total_s", "media_s", "max_s"}}
+        """
+        return {
+            paso: {
+                "llamadas": len(tiempos),
+                "total_s": sum(tiempos),
+                "media_s": sum(tiempos) / len(tiempos),
+                "max_s": max(tiempos),
+            }
+            for paso, tiempos in self.latencias.items()
+        }
+
+
+class Neo4jService(_LatenciasMixin):
+    """
+    Servicio Neo4j con un único driver (y su pool de conexiones) para toda la vida del
+    proceso, en lugar de crear un driver por libro. Agrupa los pasos de cada carga en el
+    menor número de transacciones y mide la latencia de cada paso.
+
+    Uso:
+        with Neo4jService(uri, user, password) as servicio:
+            servicio.upsert_libro("It", entidades, relaciones)
+            print(servicio.resumen_latencias())
+    """
+
+    def __init__(self, uri, user, password, max_connection_pool_size=50, **config):
+        self.driver = GraphDatabase.driver(
+            uri, auth=(user, password), max_connection_pool_size=max_connection_pool_size, **config
+        )
+        self._iniciar_latencias()
+
+    def close(self):
+        self.driver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ejecutar_plan(self, plan):
+        totales = defaultdict(int)
+        with self.driver.session() as session:
+            for paso, consultas, limite in plan:
+                while True:
+                    with self._medir(paso):
+                        n = session.execute_write(_ejecutar_consultas_tx, consultas)
+                    totales[paso] += n
+                    if limite is None or n < limite:
+                        break
+        return dict(totales)
+
+    def contar_nodos(self):
+        with self.driver.session() as session:
+            with self._medir("contar_nodos"):
+                return session.execute_read(_contar_nodos_tx)
+
+    def insertar_ontologia(self, turtle_data):
+        """Vacía el grafo e importa la ontología Turtle con n10s (3 transacciones)."""
+        print("Importando ontología con n10s...")
+        self._ejecutar_plan(_plan_insertar_ontologia(turtle_data))
+        node_count = self.contar_nodos()
+        if node_count > 0:
+            print(f"Importación exitosa. Nodos importados: {node_count}")
+        else:
+            print("Importación fallida o no se importaron nodos.")
+        return node_count
+
+    def cargar_unwind(self, entidades, relaciones, batch_size=1000, limpiar=True):
+        """Ver insert_entities_unwind."""
+        self._ejecutar_plan(_plan_cargar_unwind(entidades, relaciones, batch_size, limpiar))
+        node_count = self.contar_nodos()
+        print(f"Carga terminada. Nodos en el grafo: {node_count}")
+        return node_count
+
+    def upsert_libro(self, libro, entidades, relaciones, batch_size=1000):
+        """Ver upsert_libro."""
+        totales = self._ejecutar_plan(_plan_upsert_libro(libro, entidades, relaciones, batch_size))
+        resultado = {
+            "relaciones_borradas": totales.get("relaciones_obsoletas", 0),
+            "nodos_borrados": totales.get("nodos_obsoletos", 0),
+        }
+        print(f"Borradas {resultado['relaciones_borradas']} relaciones y {resultado['nodos_borrados']} nodos obsoletos de {libro}")
+        return resultado
+
+
+class Neo4jServiceAsync(_LatenciasMixin):
+    """
+    Variante asíncrona de Neo4jService sobre el driver async de neo4j, para cargar varios
+    libros de forma concurrente desde un bucle asyncio.
+
+    Uso:
+        async with Neo4jServiceAsync(uri, user, password) as servicio:
+            await asyncio.gather(*(servicio.upsert_libro(l, e, r) for l, e, r in libros))
+    """
+
+    def __init__(self, uri, user, password, max_connection_pool_size=50, **config):
+        self.driver = AsyncGraphDatabase.driver(
+            uri, auth=(user, password), max_connection_pool_size=max_connection_pool_size, **config
+        )
+        self._iniciar_latencias()
+
+    async def close(self):
+        await self.driver.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _ejecutar_plan(self, plan):
+        totales = defaultdict(int)
+        async with self.driver.session() as session:
+            for paso, consultas, limite in plan:
+                while True:
+                    with self._medir(paso):
+                        n = await session.execute_write(_ejecutar_consultas_tx_async, consultas)
+                    totales[paso] += n
+                    if limite is None or n < limite:
+                        break
+        return dict(totales)
+
+    async def contar_nodos(self):
+        async with self.driver.session() as session:
+            with self._medir("contar_nodos"):
+                return await session.execute_read(_contar_nodos_tx_async)
+
+    async def insertar_ontologia(self, turtle_data):
+        await self._ejecutar_plan(_plan_insertar_ontologia(turtle_data))
+        return await self.contar_nodos()
+
+    async def cargar_unwind(self, entidades, relaciones, batch_size=1000, limpiar=True):
+        await self._ejecutar_plan(_plan_cargar_unwind(entidades, relaciones, batch_size, limpiar))
+        return await self.contar_nodos()
+
+    async def upsert_libro(self, libro, entidades, relaciones, batch_size=1000):
+        totales = await self._ejecutar_plan(_plan_upsert_libro(libro, entidades, relaciones, batch_size))
+        return {
+            "relaciones_borradas": totales.get("relaciones_obsoletas", 0),
+            "nodos_borrados": totales.get("nodos_obsoletos", 0),
+        }
+
+
 def insert_ontology(uri, user, password, turtle_data):
-    driver = GraphDatabase.driver(uri, auth=(user, password))
-    try:
-        with driver.session() as session:
-            print("Limpiando grafo...")
-            session.write_transaction(clear_graph_tx)
-            
-            print("Inicializando configuración n10s...")
-            session.write_transaction(init_n10s_config_tx)
-            
-            print("Configurando prefijos y opciones n10s...")
-            session.write_transaction(set_n10s_config_tx)
-            
-            print("Importando ontología...")
-            session.write_transaction(_import_ontology_tx, turtle_data)
-
-            print("Normalizando propiedad ns0__nombre a name...")
-            session.write_transaction(normalize_ns0_nombre_tx)
-
-            print("Normalizando propiedad ns1__name a name...")
-            session.write_transaction(normalize_ns1_name_tx)
-            
-            print("Eliminando nodos sin relaciones...")
-            session.write_transaction(remove_unconnected_nodes_tx)
-
-            print("Validando importación...")
-            node_count = session.read_transaction(validate_import_tx)
-            if node_count > 0:
-                print(f"Importación exitosa. Nodos importados: {node_count}")
-            else:
-                print("Importación fallida o no se importaron nodos.")
-    finally:
-        driver.close()
+    with Neo4jService(uri, user, password) as servicio:
+        return servicio.insertar_ontologia(turtle_data)
+
+def insert_entities_unwind(uri, user, password, entidades, relaciones, batch_size=1000, limpiar=True):
+    """
+    Carga entidades y relaciones directamente desde memoria con lotes UNWIND
+    parametrizados, sin pasar por Turtle ni n10s. La propiedad name se escribe al crear
+    cada nodo y solo se crean nodos conectados, así que no hacen falta los recorridos
+    completos de normalización y limpieza de insert_ontology.
+
+    Para probarlo en local basta con el contenedor de docker/neo4j.compose.
+
+    Args:
+        uri, user, password: Conexión a Neo4j.
+        entidades (list): Lista de tuplas (nombre_entidad, tipo).
+        relaciones: Lista de tuplas (src, verbo, tgt) o diccionario {(src, verbo, tgt): peso}.
+        batch_size (int): Número de filas por transacción.
+        limpiar (bool): Si es True, vacía el grafo antes de cargar.
+    """
+    with Neo4jService(uri, user, password) as servicio:
+        return servicio.cargar_unwind(entidades, relaciones, batch_size, limpiar)
+
+def upsert_libro(uri, user, password, libro, entidades, relaciones, batch_size=1000):
+    """
+    Carga o actualiza los datos de un libro sin vaciar el grafo, de modo que los libros
+    ya cargados se conservan y reprocesar el mismo libro es idempotente.
+
+    - Al empezar crea la restricción de unicidad sobre Entidad.uri (si no existe).
+    - Los nodos se fusionan por uri (MERGE) y acumulan en n.libros los libros en que aparecen.
+    - Cada relación lleva la propiedad libro (procedencia) y se fusiona por (tipo, extremos, libro).
+    - Delta: se borran solo las relaciones de este libro que no se han escrito en esta
+      ejecución, y los nodos que se quedan sin libros ni relaciones.
+
+    Args:
+        uri, user, password: Conexión a Neo4j.
+        libro (str): Identificador estable del libro (p. ej. el nombre del PDF sin extensión).
+        entidades (list): Lista de tuplas (nombre_entidad, tipo).
+        relaciones: Lista de tuplas (src, verbo, tgt) o diccionario {(src, verbo, tgt): peso}.
+        batch_size (int): Número de filas por transacción.
+
+    Returns:
+        dict: Número de relaciones y nodos obsoletos borrados.
+    """
+    with Neo4jService(uri, user, password) as servicio:
+        return servicio.upsert_libro(libro, entidades, relaciones, batch_size)
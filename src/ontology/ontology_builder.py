@@ -1,6 +1,7 @@
 from rdflib import Graph, URIRef, Literal, RDF, Namespace
 from rdflib.namespace import OWL, RDFS, FOAF
 from src.common.util import limpiar_uri
+from src.ontology import vocabulario
 from rapidfuzz import fuzz
 
 
@@ -15,148 +16,137 @@ def extract_relationships(text, entities, umbral=44):
         para_norm = para.lower()
         para_entities = []
         for ent_text, ent_type in entities:
-            # Aquí puedes limpiar la entidad para la búsqueda si quieres
             ent_text_for_search = limpiar_uri(ent_text).replace('_', ' ').lower()
             score = fuzz.partial_ratio(ent_text_for_search, para_norm)
             if score >= umbral:
                 para_entities.append(ent_text)
-        # Crear relaciones entre entidades detectadas en el mismo párrafo
         for i in range(len(para_entities)):
             for j in range(i+1, len(para_entities)):
                 src, tgt = sorted([para_entities[i], para_entities[j]])
                 relationships.add((src, "co_ocurre_con", tgt))
     return list(relationships)
 
+EX = Namespace(vocabulario.NS_EX)
 
-def extract_relationships(text, entities, umbral=44):
+VERBOS = vocabulario.VERBOS
+VERBOS_POR_TIPO = vocabulario.VERBOS_POR_TIPO
+TIPOS_PERSONA = vocabulario.TIPOS_PERSONA
+CABECERA_TURTLE = vocabulario.CABECERA_TURTLE
+
+# Categorías con nombres limpios y namespaces explícitos
+CATEGORIAS = {tipo: URIRef(iri) for tipo, iri in vocabulario.CATEGORIAS.items()}
+
+
+def clase_de_tipo(tipo_norm):
+    """Devuelve la clase RDF de un tipo de entidad ya pasado a minúsculas."""
+    return URIRef(vocabulario.iri_clase(tipo_norm))
+
+
+def predicado_relacion(src_tipo, tgt_tipo, verbo):
     """
-    Extrae relaciones de co-ocurrencia entre entidades en el texto.
-    Usa similitud difusa para detectar presencia en párrafos.
+    Elige el predicado RDF de una relación según el verbo original y los tipos
+    (en minúsculas) de sus extremos.
     """
-    relationships = set()
-    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-    for para in paragraphs:
-        para_norm = para.lower()
-        para_entities = []
-        for ent_text, ent_type in entities:
-            ent_text_for_search = limpiar_uri(ent_text).replace('_', ' ').lower()
-            score = fuzz.partial_ratio(ent_text_for_search, para_norm)
-            if score >= umbral:
-                para_entities.append(ent_text)
-        for i in range(len(para_entities)):
-            for j in range(i+1, len(para_entities)):
-                src, tgt = sorted([para_entities[i], para_entities[j]])
-                relationships.add((src, "co_ocurre_con", tgt))
-    return list(relationships)
+    return URIRef(vocabulario.iri_predicado(src_tipo, tgt_tipo, verbo))
 
-def generate_ontology(entities, relationships):
-    EX = Namespace("http://stephenkingverse.org/")
-    g = Graph()
-    g.bind("ex", EX)
-    g.bind("foaf", FOAF)
-    g.bind("owl", OWL)
-    g.bind("rdfs", RDFS)
-
-    verbs = ["co_ocurre_con", "trabajar_en", "ocurrir_en", "conocer"]
-    relation_map = {verb: EX[verb] for verb in verbs}
-
-    # Categorías con nombres limpios y namespaces explícitos
-    categorias = {
-        "person": FOAF.Person,
-        "personaje": FOAF.Person,
-        "gpe": EX.lugar,
-        "loc": EX.lugar,
-        "lugar": EX.lugar,
-        "org": EX.organizacion,
-        "organizacion": EX.organizacion,
-        "organización": EX.organizacion,
-        "date": EX.fecha,
-        "fecha": EX.fecha,
-        "event": EX.evento,
-        "evento": EX.evento,
-        "misc": EX.miscelaneo,
-        "miscelaneo": EX.miscelaneo,
-        "misceláneo": EX.miscelaneo
-    }
-
-    # Normalizar tipos únicos y crear clases RDF con etiquetas limpias
-    tipos_unicos = set(label.lower() for _, label in entities)
-    for tipo in tipos_unicos:
-        clase_uri = categorias.get(tipo, EX[limpiar_uri(tipo)])
-        g.add((clase_uri, RDF.type, OWL.Class))
-        g.add((clase_uri, RDFS.label, Literal(tipo.capitalize())))
-
-    # Definir propiedad 'nombre' limpia en el namespace EX
-    prop_nombre = EX["nombre"]
-    g.add((prop_nombre, RDF.type, OWL.DatatypeProperty))
-    g.add((prop_nombre, RDFS.label, Literal("nombre")))
-
-    # Definir propiedad co_ocurre_con
-    g.add((EX.co_ocurre_con, RDF.type, OWL.ObjectProperty))
-    g.add((EX.co_ocurre_con, RDFS.label, Literal("co_ocurre_con")))
-
-    # Crear instancias y asignar tipo con propiedades normalizadas
-    for nombre, tipo in entities:
-        nombre_uri = limpiar_uri(nombre)
-        tipo_norm = tipo.lower()
-        clase = categorias.get(tipo_norm, EX[limpiar_uri(tipo_norm)])
-        entidad_uri = EX[nombre_uri]
-        if clase == FOAF.Person:
-            g.add((entidad_uri, RDF.type, FOAF.Person))
-            g.add((entidad_uri, FOAF.name, Literal(nombre)))
-        else:
-            g.add((entidad_uri, RDF.type, clase))
-            g.add((entidad_uri, prop_nombre, Literal(nombre)))
-
-    # Verbos específicos según tipos
-    verbos_por_tipo = {
-        ("person", "org"): "trabajar_en",
-        ("personaje", "organizacion"): "trabajar_en",
-        ("personaje", "organización"): "trabajar_en",
-        ("event", "loc"): "ocurrir_en",
-        ("evento", "lugar"): "ocurrir_en",
-        ("event", "gpe"): "ocurrir_en",
-        ("person", "person"): "conocer",
-        ("personaje", "personaje"): "conocer",
-    }
-
-    def verbo_adecuado(src_tipo, tgt_tipo, verbo_original):
-        if verbo_original in relation_map:
-            return relation_map[verbo_original]
-        verbo_esperado = verbos_por_tipo.get((src_tipo, tgt_tipo))
-        if verbo_esperado and verbo_esperado in relation_map:
-            return relation_map[verbo_esperado]
-        return EX.co_ocurre_con
-
-    # Construir relaciones RDF
-    for src, verbo, tgt in relationships:
-        if src == tgt:
-            continue
-
-        src_tipo = next((label.lower() for ent, label in entities if limpiar_uri(ent) == limpiar_uri(src)), None)
-        tgt_tipo = next((label.lower() for ent, label in entities if limpiar_uri(ent) == limpiar_uri(tgt)), None)
 
+class ConstructorOntologia:
+    """
+    Construye la ontología de forma incremental: se pueden añadir entidades y relaciones
+    en varias tandas (por ejemplo, fragmento a fragmento o libro a libro) y serializar al final.
+
+    El tipo de cada entidad se guarda en un índice por URI normalizada, de modo que cada
+    relación se resuelve con una búsqueda en diccionario en lugar de recorrer todas las
+    entidades. Si una URI aparece con varios tipos, se usa el primero.
+    """
+
+    def __init__(self):
+        self.grafo = Graph()
+        self.grafo.bind("ex", EX)
+        self.grafo.bind("foaf", FOAF)
+        self.grafo.bind("owl", OWL)
+        self.grafo.bind("rdfs", RDFS)
+        # URI normalizada -> tipo en minúsculas
+        self._tipos_por_uri = {}
+        self._tipos_con_clase = set()
+        # Relaciones cuyos extremos aún no tienen tipo conocido
+        self._pendientes = []
+
+        # Definir propiedad 'nombre' limpia en el namespace EX
+        self.grafo.add((EX.nombre, RDF.type, OWL.DatatypeProperty))
+        self.grafo.add((EX.nombre, RDFS.label, Literal("nombre")))
+
+        # Definir propiedad co_ocurre_con
+        self.grafo.add((EX.co_ocurre_con, RDF.type, OWL.ObjectProperty))
+        self.grafo.add((EX.co_ocurre_con, RDFS.label, Literal("co_ocurre_con")))
+
+    def agregar_entidades(self, entities):
+        """
+        Añade instancias (y sus clases, si son nuevas).
+
+        Args:
+            entities (list): Lista de tuplas (nombre_entidad, tipo).
+        """
+        for nombre, tipo in entities:
+            tipo_norm = tipo.lower()
+            clase = clase_de_tipo(tipo_norm)
+            if tipo_norm not in self._tipos_con_clase:
+                self._tipos_con_clase.add(tipo_norm)
+                self.grafo.add((clase, RDF.type, OWL.Class))
+                self.grafo.add((clase, RDFS.label, Literal(tipo_norm.capitalize())))
+
+            nombre_uri = limpiar_uri(nombre)
+            self._tipos_por_uri.setdefault(nombre_uri, tipo_norm)
+            entidad_uri = EX[nombre_uri]
+            if clase == FOAF.Person:
+                self.grafo.add((entidad_uri, RDF.type, FOAF.Person))
+                self.grafo.add((entidad_uri, FOAF.name, Literal(nombre)))
+            else:
+                self.grafo.add((entidad_uri, RDF.type, clase))
+                self.grafo.add((entidad_uri, EX.nombre, Literal(nombre)))
+
+    def agregar_relaciones(self, relationships):
+        """
+        Añade relaciones (src, verbo, tgt). Las relaciones cuyas entidades todavía no se
+        han añadido se reintentan al serializar y se descartan si siguen sin tipo.
+        """
+        for src, verbo, tgt in relationships:
+            if src == tgt:
+                continue
+            src_uri = limpiar_uri(src)
+            tgt_uri = limpiar_uri(tgt)
+            if not self._agregar_relacion(src_uri, verbo, tgt_uri):
+                self._pendientes.append((src_uri, verbo, tgt_uri))
+
+    def _agregar_relacion(self, src_uri, verbo, tgt_uri):
+        src_tipo = self._tipos_por_uri.get(src_uri)
+        tgt_tipo = self._tipos_por_uri.get(tgt_uri)
         if src_tipo is None or tgt_tipo is None:
-            continue
+            return False
+        predicado = predicado_relacion(src_tipo, tgt_tipo, verbo)
+        self.grafo.add((EX[src_uri], predicado, EX[tgt_uri]))
+        return True
 
-        src_uri = EX[limpiar_uri(src)]
-        tgt_uri = EX[limpiar_uri(tgt)]
+    def tipo_de(self, nombre):
+        """Devuelve el tipo (en minúsculas) con el que se registró una entidad, o None."""
+        return self._tipos_por_uri.get(limpiar_uri(nombre))
 
-        predicado = verbo_adecuado(src_tipo, tgt_tipo, verbo)
+    def serializar(self, format="turtle"):
+        """Serializa la ontología construida hasta el momento."""
+        self._pendientes = [rel for rel in self._pendientes if not self._agregar_relacion(*rel)]
 
-        if predicado == EX.co_ocurre_con and src_tipo in {"person", "personaje"} and tgt_tipo in {"person", "personaje"}:
-            g.add((src_uri, FOAF.knows, tgt_uri))
-        else:
-            g.add((src_uri, predicado, tgt_uri))
+        data = self.grafo.serialize(format=format)
+        if format == "turtle" and not data.startswith("@prefix ex:"):
+            data = CABECERA_TURTLE + data
+        return data
 
-    turtle_data = g.serialize(format="turtle")
-    header = (
-        "@prefix ex: <http://stephenkingverse.org/> .\n"
-        "@prefix foaf: <http://xmlns.com/foaf/0.1/> .\n"
-        "@prefix owl: <http://www.w3.org/2002/07/owl#> .\n"
-        "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n"
-    )
-    if not turtle_data.startswith("@prefix ex:"):
-        turtle_data = header + turtle_data
 
-    return turtle_data
\ No newline at end of file
+def generate_ontology(entities, relationships):
+    """
+    Genera la ontología (Turtle) con clases, instancias y relaciones, usando categorías
+    amplias y verbos adecuados.
+    """
+    constructor = ConstructorOntologia()
+    constructor.agregar_entidades(entities)
+    constructor.agregar_relaciones(relationships)
+    return constructor.serializar()
\ No newline at end of file
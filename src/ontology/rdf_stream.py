@@ -0,0 +1,165 @@
+import hashlib
+import re
+from src.common.util import limpiar_uri
+from src.ontology import vocabulario as voc
+
+
+# Caracteres que no pueden aparecer sin codificar dentro de una IRI en N-Triples/Turtle
+_PATRON_IRI_INVALIDO = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+# Nombres locales que se pueden escribir como nombre con prefijo en Turtle (subconjunto seguro)
+_PATRON_LOCAL_SEGURO = re.compile(r'[A-Za-z0-9_](?:[A-Za-z0-9_.-]*[A-Za-z0-9_-])?')
+_ESCAPES_LITERAL = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"}
+_PATRON_LITERAL = re.compile(r'[\\"\n\r]')
+
+
+def _escapar_iri(iri):
+    return _PATRON_IRI_INVALIDO.sub(lambda m: "%{:02X}".format(ord(m.group(0))), iri)
+
+
+def _escapar_literal(texto):
+    return _PATRON_LITERAL.sub(lambda m: _ESCAPES_LITERAL[m.group(0)], texto)
+
+
+class EscritorTriplesStream:
+    """
+    Escribe la ontología triple a triple en un archivo o socket a medida que se añaden
+    entidades y relaciones, sin construir un Graph de rdflib ni el texto completo en memoria.
+    Aplica las mismas reglas de clases, nombres y predicados que ConstructorOntologia.
+
+    - formato="nt": N-Triples, una línea por triple (lo más rápido).
+    - formato="turtle": Turtle con prefijos, una sentencia por triple.
+
+    En memoria solo se guarda el índice URI -> tipo necesario para resolver las relaciones
+    y, si deduplicar es True, los triples ya escritos (como resúmenes blake2b de 128 bits
+    de su línea) para no repetirlos.
+
+    Uso:
+        with EscritorTriplesStream("data/processed/ontology.nt") as escritor:
+            escritor.agregar_entidades(entidades)
+            escritor.agregar_relaciones(relaciones)
+    """
+
+    def __init__(self, destino, formato="nt", deduplicar=True):
+        """
+        Args:
+            destino: Ruta del archivo o un objeto con write() (p. ej. socket.makefile("w")).
+            formato (str): "nt" o "turtle".
+            deduplicar (bool): Evita escribir dos veces el mismo triple.
+        """
+        if formato not in ("nt", "turtle"):
+            raise ValueError(f"Formato no soportado: {formato}")
+        self.formato = formato
+        self._propio = isinstance(destino, str) or hasattr(destino, "__fspath__")
+        self._salida = open(destino, "w", encoding="utf-8") if self._propio else destino
+        self._escritos = set() if deduplicar else None
+        self._tipos_por_uri = {}
+        self._tipos_con_clase = set()
+        self._pendientes = []
+        self.triples = 0
+
+        if formato == "turtle":
+            self._salida.write(voc.CABECERA_TURTLE + "\n")
+        self._escribir(voc.EX_NOMBRE, voc.RDF_TYPE, voc.OWL_DATATYPE_PROPERTY)
+        self._escribir(voc.EX_NOMBRE, voc.RDFS_LABEL, "nombre", literal=True)
+        self._escribir(voc.EX_CO_OCURRE_CON, voc.RDF_TYPE, voc.OWL_OBJECT_PROPERTY)
+        self._escribir(voc.EX_CO_OCURRE_CON, voc.RDFS_LABEL, "co_ocurre_con", literal=True)
+
+    def _termino(self, iri):
+        if self.formato == "turtle":
+            if iri == voc.RDF_TYPE:
+                return "a"
+            for prefijo, ns in voc.PREFIJOS.items():
+                if iri.startswith(ns) and _PATRON_LOCAL_SEGURO.fullmatch(iri[len(ns):]):
+                    return f"{prefijo}:{iri[len(ns):]}"
+        return f"<{_escapar_iri(iri)}>"
+
+    def _escribir(self, sujeto, predicado, objeto, literal=False):
+        valor = f'"{_escapar_literal(objeto)}"' if literal else self._termino(objeto)
+        linea = f"{self._termino(sujeto)} {self._termino(predicado)} {valor} .\n"
+        if self._escritos is not None:
+            # Con hash() de 64 bits una colisión descartaría en silencio un triple distinto;
+            # un resumen de 128 bits ocupa poco más y no colisiona en la práctica
+            clave = hashlib.blake2b(linea.encode("utf-8"), digest_size=16).digest()
+            if clave in self._escritos:
+                return
+            self._escritos.add(clave)
+        self._salida.write(linea)
+        self.triples += 1
+
+    def agregar_entidades(self, entities):
+        """Escribe las instancias (y sus clases, si son nuevas). Ver ConstructorOntologia."""
+        for nombre, tipo in entities:
+            tipo_norm = tipo.lower()
+            clase = voc.iri_clase(tipo_norm)
+            if tipo_norm not in self._tipos_con_clase:
+                self._tipos_con_clase.add(tipo_norm)
+                self._escribir(clase, voc.RDF_TYPE, voc.OWL_CLASS)
+                self._escribir(clase, voc.RDFS_LABEL, tipo_norm.capitalize(), literal=True)
+
+            nombre_uri = limpiar_uri(nombre)
+            self._tipos_por_uri.setdefault(nombre_uri, tipo_norm)
+            entidad = voc.NS_EX + nombre_uri
+            self._escribir(entidad, voc.RDF_TYPE, clase)
+            propiedad = voc.FOAF_NAME if clase == voc.FOAF_PERSON else voc.EX_NOMBRE
+            self._escribir(entidad, propiedad, nombre, literal=True)
+
+    def agregar_relaciones(self, relationships):
+        """
+        Escribe las relaciones (src, verbo, tgt). Las que aún no tienen tipo para alguno de
+        sus extremos se reintentan al cerrar.
+        """
+        for src, verbo, tgt in relationships:
+            if src == tgt:
+                continue
+            src_uri = limpiar_uri(src)
+            tgt_uri = limpiar_uri(tgt)
+            if not self._agregar_relacion(src_uri, verbo, tgt_uri):
+                self._pendientes.append((src_uri, verbo, tgt_uri))
+
+    def _agregar_relacion(self, src_uri, verbo, tgt_uri):
+        src_tipo = self._tipos_por_uri.get(src_uri)
+        tgt_tipo = self._tipos_por_uri.get(tgt_uri)
+        if src_tipo is None or tgt_tipo is None:
+            return False
+        predicado = voc.iri_predicado(src_tipo, tgt_tipo, verbo)
+        self._escribir(voc.NS_EX + src_uri, predicado, voc.NS_EX + tgt_uri)
+        return True
+
+    def cerrar(self):
+        """Escribe las relaciones pendientes que ya se pueden resolver y cierra el destino."""
+        self._pendientes = [rel for rel in self._pendientes if not self._agregar_relacion(*rel)]
+        self._salida.flush()
+        if self._propio:
+            self._salida.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def escribir_ontologia_stream(destino, entities, relationships, formato="nt"):
+    """
+    Escribe la ontología de entities y relationships en destino sin pasar por rdflib.
+
+    Returns:
+        int: Número de triples escritos.
+    """
+    with EscritorTriplesStream(destino, formato) as escritor:
+        escritor.agregar_entidades(entities)
+        escritor.agregar_relaciones(relationships)
+    return escritor.triples
+
+
+def validar_con_rdflib(ruta, formato="nt"):
+    """
+    Comprueba con rdflib que el archivo escrito es RDF válido (solo para validación:
+    carga el grafo completo en memoria).
+
+    Returns:
+        Graph: El grafo leído.
+    """
+    from rdflib import Graph
+
+    return Graph().parse(ruta, format="nt" if formato == "nt" else "turtle")
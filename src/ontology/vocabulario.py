@@ -0,0 +1,85 @@
+from src.common.util import limpiar_uri
+
+
+# Vocabulario de la ontología como IRIs en texto plano, sin depender de rdflib.
+# ontology_builder lo envuelve en términos rdflib; rdf_stream lo escribe directamente.
+NS_EX = "http://stephenkingverse.org/"
+NS_FOAF = "http://xmlns.com/foaf/0.1/"
+NS_OWL = "http://www.w3.org/2002/07/owl#"
+NS_RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+NS_RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+
+PREFIJOS = {"ex": NS_EX, "foaf": NS_FOAF, "owl": NS_OWL, "rdfs": NS_RDFS}
+
+FOAF_PERSON = NS_FOAF + "Person"
+FOAF_NAME = NS_FOAF + "name"
+FOAF_KNOWS = NS_FOAF + "knows"
+RDF_TYPE = NS_RDF + "type"
+RDFS_LABEL = NS_RDFS + "label"
+OWL_CLASS = NS_OWL + "Class"
+OWL_DATATYPE_PROPERTY = NS_OWL + "DatatypeProperty"
+OWL_OBJECT_PROPERTY = NS_OWL + "ObjectProperty"
+EX_NOMBRE = NS_EX + "nombre"
+EX_CO_OCURRE_CON = NS_EX + "co_ocurre_con"
+
+VERBOS = ["co_ocurre_con", "trabajar_en", "ocurrir_en", "conocer"]
+
+# Categorías con nombres limpios y namespaces explícitos
+CATEGORIAS = {
+    "person": FOAF_PERSON,
+    "personaje": FOAF_PERSON,
+    "gpe": NS_EX + "lugar",
+    "loc": NS_EX + "lugar",
+    "lugar": NS_EX + "lugar",
+    "org": NS_EX + "organizacion",
+    "organizacion": NS_EX + "organizacion",
+    "organización": NS_EX + "organizacion",
+    "date": NS_EX + "fecha",
+    "fecha": NS_EX + "fecha",
+    "event": NS_EX + "evento",
+    "evento": NS_EX + "evento",
+    "misc": NS_EX + "miscelaneo",
+    "miscelaneo": NS_EX + "miscelaneo",
+    "misceláneo": NS_EX + "miscelaneo"
+}
+
+# Verbos específicos según tipos
+VERBOS_POR_TIPO = {
+    ("person", "org"): "trabajar_en",
+    ("personaje", "organizacion"): "trabajar_en",
+    ("personaje", "organización"): "trabajar_en",
+    ("event", "loc"): "ocurrir_en",
+    ("evento", "lugar"): "ocurrir_en",
+    ("event", "gpe"): "ocurrir_en",
+    ("person", "person"): "conocer",
+    ("personaje", "personaje"): "conocer",
+}
+
+TIPOS_PERSONA = {"person", "personaje"}
+
+CABECERA_TURTLE = "".join(f"@prefix {prefijo}: <{ns}> .\n" for prefijo, ns in PREFIJOS.items())
+
+
+def iri_entidad(nombre):
+    """IRI de la instancia de una entidad."""
+    return NS_EX + limpiar_uri(nombre)
+
+
+def iri_clase(tipo_norm):
+    """Devuelve la IRI de la clase de un tipo de entidad ya pasado a minúsculas."""
+    return CATEGORIAS.get(tipo_norm, NS_EX + limpiar_uri(tipo_norm))
+
+
+def iri_predicado(src_tipo, tgt_tipo, verbo):
+    """
+    Elige la IRI del predicado de una relación según el verbo original y los tipos
+    (en minúsculas) de sus extremos.
+    """
+    if verbo in VERBOS:
+        predicado = NS_EX + verbo
+    else:
+        verbo_esperado = VERBOS_POR_TIPO.get((src_tipo, tgt_tipo))
+        predicado = NS_EX + verbo_esperado if verbo_esperado in VERBOS else EX_CO_OCURRE_CON
+    if predicado == EX_CO_OCURRE_CON and src_tipo in TIPOS_PERSONA and tgt_tipo in TIPOS_PERSONA:
+        return FOAF_KNOWS
+    return predicado
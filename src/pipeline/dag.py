@@ -0,0 +1,340 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from src.common.profiling import medir
+from src.pipeline.persistence import FORMATOS, PersistenciaAsincrona, cargar_artefacto, _escribir_atomico
+
+
+# Extensión del archivo de cada formato de artefacto
+EXTENSIONES = {"texto": ".txt", "lineas": ".txt"}
+
+# Formato de los artefactos que la propia etapa escribe en disco (p. ej. la ontología en
+# streaming): la función recibe ruta_salida y su valor en memoria es la ruta
+FORMATO_ARCHIVO = "archivo"
+
+
+class Etapa:
+    """
+    Etapa del pipeline: calcula el artefacto salida a partir de los artefactos entradas
+    con funcion(*entradas, **parametros, **opciones).
+
+    Los parametros forman parte de la huella de la etapa (cambiarlos la deja obsoleta);
+    las opciones no (número de workers, directorio de la caché...). Subir version invalida
+    los resultados guardados cuando cambia el código de la etapa.
+    """
+
+    def __init__(self, nombre, funcion, entradas, salida, formato="json", tipo=None, ruta=None, parametros=None, opciones=None, version="1"):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.entradas = list(entradas)
+        self.salida = salida
+        self.formato = formato
+        self.tipo = tipo
+        self.ruta = ruta
+        self.parametros = dict(parametros or {})
+        self.opciones = dict(opciones or {})
+        self.version = version
+
+
+def _hash_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class Pipeline:
+    """
+    Grafo acíclico de etapas con artefactos tipados, huellas de sus entradas y puntos de
+    control en disco.
+
+    - La huella de un artefacto combina la etapa que lo produce (nombre, versión y
+      parámetros) con las huellas de sus entradas; la de un archivo fuente es el hash de
+      su contenido. Una etapa está al día si su artefacto existe y la huella guardada en
+      el manifiesto coincide con la actual.
+    - ejecutar() solo ejecuta las etapas obsoletas que hacen falta para los objetivos; los
+      artefactos al día que necesitan se cargan de disco al primer uso.
+    - Las etapas independientes se ejecutan a la vez en un pool de hilos.
+    - Los resultados pasan de una etapa a otra en memoria; los puntos de control se
+      escriben en segundo plano (PersistenciaAsincrona) y una etapa solo se anota en el
+      manifiesto cuando su artefacto ya está en disco.
+
+    Uso:
+        pipeline = Pipeline("data/processed", "It")
+        pipeline.fuente("pdf", "data/raw/It.pdf")
+        pipeline.agregar(Etapa("extraccion", extraer, ["pdf"], "texto", formato="texto", tipo=str))
+        valores = pipeline.ejecutar(["texto"])
+    """
+
+    def __init__(self, directorio="data/processed", nombre="pipeline"):
+        """
+        Args:
+            directorio (str): Directorio de los puntos de control y del manifiesto.
+            nombre (str): Prefijo de los archivos de esta ejecución (p. ej. el libro).
+        """
+        self.directorio = Path(directorio)
+        self.nombre = nombre
+        self.fuentes = {}
+        self.etapas = {}
+        self._productor = {}
+        self._ruta_manifiesto = self.directorio / f"{nombre}.manifiesto.json"
+        self._lock = threading.Lock()
+
+    def fuente(self, nombre, ruta):
+        """Declara un archivo de entrada del pipeline; su valor es la ruta."""
+        self._comprobar_nombre_libre(nombre)
+        self.fuentes[nombre] = str(ruta)
+
+    def agregar(self, etapa):
+        """Añade una etapa. Sus entradas tienen que ser fuentes o salidas de etapas ya añadidas."""
+        self._comprobar_nombre_libre(etapa.salida)
+        if etapa.nombre in self.etapas:
+            raise ValueError(f"Ya existe una etapa llamada '{etapa.nombre}'")
+        desconocidas = [e for e in etapa.entradas if e not in self.fuentes and e not in self._productor]
+        if desconocidas:
+            raise ValueError(f"La etapa '{etapa.nombre}' usa artefactos desconocidos: {desconocidas}")
+        if etapa.formato != FORMATO_ARCHIVO and etapa.formato not in FORMATOS:
+            raise ValueError(f"Formato de artefacto no soportado: {etapa.formato}")
+        if etapa.ruta is None:
+            if etapa.formato == FORMATO_ARCHIVO:
+                raise ValueError(f"La etapa '{etapa.nombre}' escribe un archivo: hay que indicar su ruta")
+            extension = EXTENSIONES.get(etapa.formato, ".json")
+            etapa.ruta = str(self.directorio / f"{self.nombre}_{etapa.salida}{extension}")
+        # Como las entradas ya existen, el orden de inserción es un orden topológico
+        self.etapas[etapa.nombre] = etapa
+        self._productor[etapa.salida] = etapa
+
+    def _comprobar_nombre_libre(self, nombre):
+        if nombre in self.fuentes or nombre in self._productor:
+            raise ValueError(f"Ya existe un artefacto llamado '{nombre}'")
+
+    # --- Huellas y estado ---
+
+    def _leer_manifiesto(self):
+        try:
+            with open(self._ruta_manifiesto, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"fuentes": {}, "artefactos": {}}
+
+    def _huella_fuente(self, ruta, manifiesto):
+        # Reutilizar el hash si el archivo no ha cambiado de tamaño ni de fecha
+        stat = os.stat(ruta)
+        previa = manifiesto["fuentes"].get(ruta)
+        if previa and previa["tamano"] == stat.st_size and previa["mtime"] == stat.st_mtime:
+            return previa["huella"]
+        huella = _hash_archivo(ruta)
+        manifiesto["fuentes"][ruta] = {"tamano": stat.st_size, "mtime": stat.st_mtime, "huella": huella}
+        return huella
+
+    def huellas(self, manifiesto=None):
+        """
+        Returns:
+            dict: {artefacto: huella} para las fuentes y las salidas de todas las etapas.
+        """
+        manifiesto = manifiesto if manifiesto is not None else self._leer_manifiesto()
+        huellas = {nombre: self._huella_fuente(ruta, manifiesto) for nombre, ruta in self.fuentes.items()}
+        for etapa in self.etapas.values():
+            contenido = json.dumps({
+                "etapa": etapa.nombre,
+                "version": etapa.version,
+                "formato": etapa.formato,
+                "parametros": etapa.parametros,
+                "entradas": [huellas[e] for e in etapa.entradas],
+            }, sort_keys=True, ensure_ascii=False, default=str)
+            huellas[etapa.salida] = hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+        return huellas
+
+    def _necesarias(self, objetivos):
+        # Etapas de las que dependen los objetivos (incluidas las que los producen)
+        necesarias = set()
+        pendientes = [o for o in objetivos if o in self._productor]
+        while pendientes:
+            etapa = self._productor[pendientes.pop()]
+            if etapa.nombre not in necesarias:
+                necesarias.add(etapa.nombre)
+                pendientes.extend(e for e in etapa.entradas if e in self._productor)
+        return necesarias
+
+    def estado(self, objetivos=None):
+        """
+        Returns:
+            dict: {etapa: "al día" | "obsoleta" | "sin ejecutar"} en orden topológico.
+        """
+        manifiesto = self._leer_manifiesto()
+        return self._estado(objetivos, manifiesto, self.huellas(manifiesto))
+
+    def _estado(self, objetivos, manifiesto, huellas):
+        necesarias = self._necesarias(objetivos) if objetivos else set(self.etapas)
+        estado = {}
+        for nombre, etapa in self.etapas.items():
+            if nombre not in necesarias:
+                continue
+            guardado = manifiesto["artefactos"].get(etapa.salida)
+            if guardado is None or not Path(etapa.ruta).exists():
+                estado[nombre] = "sin ejecutar"
+            elif guardado["huella"] != huellas[etapa.salida]:
+                estado[nombre] = "obsoleta"
+            else:
+                estado[nombre] = "al día"
+        return estado
+
+    # --- Ejecución ---
+
+    def ejecutar(self, objetivos=None, forzar=(), max_workers=None, persistir=True):
+        """
+        Ejecuta las etapas obsoletas necesarias para obtener los objetivos.
+
+        Args:
+            objetivos (list): Artefactos que se quieren obtener (por defecto, todos).
+            forzar (iterable): Etapas que se ejecutan aunque estén al día (y, con ellas,
+                               todas las que dependen de ellas).
+            max_workers (int): Etapas que se pueden ejecutar a la vez (None: una por
+                               etapa independiente).
+            persistir (bool): Guarda los puntos de control de las etapas ejecutadas. Con
+                              False solo quedan en disco los archivos que escriben las
+                              propias etapas (p. ej. la ontología).
+
+        Returns:
+            dict: {artefacto: valor} de los objetivos.
+        """
+        objetivos = list(objetivos) if objetivos else [etapa.salida for etapa in self.etapas.values()]
+        desconocidos = [o for o in objetivos if o not in self._productor and o not in self.fuentes]
+        if desconocidos:
+            raise ValueError(f"Artefactos desconocidos: {desconocidos}")
+        forzar = set(forzar)
+        if forzar - set(self.etapas):
+            raise ValueError(f"Etapas desconocidas: {sorted(forzar - set(self.etapas))}")
+
+        manifiesto = self._leer_manifiesto()
+        huellas = self.huellas(manifiesto)
+        estado = self._estado(objetivos, manifiesto, huellas)
+        a_ejecutar = {nombre for nombre, e in estado.items() if e != "al día"}
+        # Lo que depende de una etapa forzada también se vuelve a ejecutar
+        a_ejecutar |= (forzar | self._dependientes(forzar)) & set(estado)
+        for nombre in self.etapas:
+            if nombre in a_ejecutar:
+                motivo = "forzada" if nombre in forzar else estado[nombre]
+                if motivo == "al día":
+                    motivo = "depende de una etapa forzada"
+                print(f"Etapa {nombre}: {motivo}")
+            elif nombre in estado:
+                print(f"Etapa {nombre}: al día")
+
+        valores = dict(self.fuentes)
+        self._ejecutar_etapas(a_ejecutar, valores, huellas, manifiesto, max_workers, persistir)
+        return {objetivo: self._valor(objetivo, valores) for objetivo in objetivos}
+
+    def _dependientes(self, nombres):
+        # Etapas que dependen, directa o indirectamente, de las indicadas
+        dependientes = set()
+        salidas = {self.etapas[n].salida for n in nombres}
+        for nombre, etapa in self.etapas.items():
+            if any(e in salidas for e in etapa.entradas):
+                dependientes.add(nombre)
+                salidas.add(etapa.salida)
+        return dependientes
+
+    def _valor(self, artefacto, valores):
+        # Valor en memoria, o cargado del punto de control la primera vez que se necesita
+        with self._lock:
+            if artefacto not in valores:
+                etapa = self._productor[artefacto]
+                if etapa.formato == FORMATO_ARCHIVO:
+                    valores[artefacto] = etapa.ruta
+                else:
+                    print(f"Cargando {artefacto} desde {etapa.ruta}")
+                    valores[artefacto] = cargar_artefacto(etapa.ruta, etapa.formato)
+            return valores[artefacto]
+
+    def _ejecutar_etapa(self, etapa, valores):
+        entradas = [self._valor(e, valores) for e in etapa.entradas]
+        kwargs = {**etapa.parametros, **etapa.opciones}
+        if etapa.formato == FORMATO_ARCHIVO:
+            kwargs["ruta_salida"] = etapa.ruta
+        inicio = time.perf_counter()
+        with medir(f"etapa:{etapa.nombre}"):
+            resultado = etapa.funcion(*entradas, **kwargs)
+        if etapa.formato == FORMATO_ARCHIVO:
+            resultado = etapa.ruta
+        elif etapa.tipo is not None and not isinstance(resultado, etapa.tipo):
+            raise TypeError(
+                f"La etapa '{etapa.nombre}' devolvió {type(resultado).__name__} "
+                f"y se esperaba {etapa.tipo.__name__}"
+            )
+        return resultado, time.perf_counter() - inicio
+
+    def _ejecutar_etapas(self, a_ejecutar, valores, huellas, manifiesto, max_workers, persistir):
+        pendientes = [nombre for nombre in self.etapas if nombre in a_ejecutar]
+        if not pendientes:
+            self._guardar_manifiesto(manifiesto)
+            return
+        terminadas = set()
+        en_curso = {}
+        error = None
+        persistencia = PersistenciaAsincrona() if persistir else None
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers or len(pendientes)) as executor:
+                while pendientes or en_curso:
+                    if error is None:
+                        # Lanzar las etapas cuyas entradas ya están disponibles
+                        for nombre in list(pendientes):
+                            etapa = self.etapas[nombre]
+                            previas = {self._productor[e].nombre for e in etapa.entradas if e in self._productor}
+                            if previas & a_ejecutar <= terminadas:
+                                pendientes.remove(nombre)
+                                # Copiar el contexto para que medir() vea el Perfilador activo
+                                contexto = contextvars.copy_context()
+                                en_curso[executor.submit(contexto.run, self._ejecutar_etapa, etapa, valores)] = etapa
+                    elif not en_curso:
+                        break
+                    hechas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                    for futuro in hechas:
+                        etapa = en_curso.pop(futuro)
+                        try:
+                            resultado, segundos = futuro.result()
+                        except Exception as e:
+                            print(f"Etapa {etapa.nombre}: error ({type(e).__name__}: {e})")
+                            error = error or e
+                            continue
+                        with self._lock:
+                            valores[etapa.salida] = resultado
+                        registro = {
+                            "huella": huellas[etapa.salida],
+                            "ruta": etapa.ruta,
+                            "etapa": etapa.nombre,
+                            "fecha": datetime.now().isoformat(timespec="seconds"),
+                            "segundos": segundos,
+                        }
+                        if etapa.formato == FORMATO_ARCHIVO:
+                            self._registrar(manifiesto, etapa.salida, registro)
+                        elif persistencia is not None:
+                            # Las etapas siguientes no esperan a la escritura: el punto de
+                            # control se anota cuando el artefacto ya está en disco
+                            persistencia.guardar(etapa.ruta, resultado, etapa.formato,
+                                                 al_guardar=partial(self._registrar, manifiesto, etapa.salida, registro))
+                        terminadas.add(etapa.nombre)
+                        print(f"Etapa {etapa.nombre}: terminada en {segundos:.1f} s")
+        finally:
+            # Lo ya terminado queda guardado aunque otra etapa haya fallado
+            if persistencia is not None:
+                persistencia.cerrar()
+        if error is not None:
+            raise error
+
+    def _registrar(self, manifiesto, artefacto, registro):
+        # Punto de control: lo ya guardado no se repite si algo falla después
+        with self._lock:
+            manifiesto["artefactos"][artefacto] = registro
+            self._guardar_manifiesto(manifiesto)
+
+    def _guardar_manifiesto(self, manifiesto):
+        _escribir_atomico(self._ruta_manifiesto, json.dumps(manifiesto, ensure_ascii=False, indent=2))
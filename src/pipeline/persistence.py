@@ -0,0 +1,156 @@
+import json
+import mmap
+import os
+import queue
+import threading
+from collections import Counter
+from pathlib import Path
+
+
+# A partir de este tamaño los artefactos de texto se leen con mmap
+UMBRAL_MMAP = 64 * 1024 * 1024
+
+
+def _escribir_atomico(ruta, datos):
+    # Escribir en un temporal y renombrar: un artefacto a medio escribir nunca se
+    # confunde con uno completo al reanudar
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def leer_texto(ruta, umbral_mmap=UMBRAL_MMAP):
+    """
+    Lee un artefacto de texto. Los archivos grandes se proyectan en memoria con mmap y se
+    decodifican de una vez, sin copias intermedias en el buffer de lectura.
+    """
+    with open(ruta, "rb") as f:
+        tamano = os.fstat(f.fileno()).st_size
+        if tamano == 0:
+            return ""
+        if tamano < umbral_mmap:
+            return f.read().decode("utf-8")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            return str(mapa[:], "utf-8")
+
+
+def _relaciones_a_json(relaciones):
+    return [[*clave, peso] for clave, peso in relaciones.items()]
+
+
+def _relaciones_desde_json(filas):
+    return Counter({tuple(fila[:3]): fila[3] for fila in filas})
+
+
+def _entidades_relaciones_desde_texto(datos):
+    valor = json.loads(datos)
+    return [tuple(e) for e in valor["entidades"]], _relaciones_desde_json(valor["relaciones"])
+
+
+# Serialización de cada tipo de artefacto: formato -> (a_texto, desde_texto)
+FORMATOS = {
+    # Texto plano
+    "texto": (lambda valor: valor, lambda datos: datos),
+    # Lista de cadenas, una por línea (p. ej. frases clave)
+    "lineas": (
+        lambda valor: "\n".join(valor),
+        lambda datos: datos.split("\n") if datos else [],
+    ),
+    # Cualquier valor serializable en JSON
+    "json": (lambda valor: json.dumps(valor, ensure_ascii=False), json.loads),
+    # Lista de tuplas (nombre_entidad, etiqueta)
+    "entidades": (
+        lambda valor: json.dumps(valor, ensure_ascii=False),
+        lambda datos: [tuple(e) for e in json.loads(datos)],
+    ),
+    # Counter {(src, verbo, tgt): peso}
+    "relaciones": (
+        lambda valor: json.dumps(_relaciones_a_json(valor), ensure_ascii=False),
+        lambda datos: _relaciones_desde_json(json.loads(datos)),
+    ),
+    # Tupla (entidades, relaciones)
+    "entidades_relaciones": (
+        lambda valor: json.dumps(
+            {"entidades": valor[0], "relaciones": _relaciones_a_json(valor[1])},
+            ensure_ascii=False,
+        ),
+        _entidades_relaciones_desde_texto,
+    ),
+}
+
+
+def guardar_artefacto(ruta, valor, formato="texto"):
+    """Guarda un artefacto de forma atómica con el formato indicado (ver FORMATOS)."""
+    _escribir_atomico(ruta, FORMATOS[formato][0](valor))
+
+
+def cargar_artefacto(ruta, formato="texto"):
+    """Carga un artefacto guardado con guardar_artefacto."""
+    return FORMATOS[formato][1](leer_texto(ruta))
+
+
+class PersistenciaAsincrona:
+    """
+    Guarda artefactos en disco desde un hilo en segundo plano, para que las etapas
+    del pipeline no esperen a la escritura. esperar() bloquea hasta que todo lo encolado
+    está escrito y relanza el primer error de escritura, si lo hubo.
+
+    Uso (src.pipeline.dag.Pipeline la usa para sus puntos de control):
+        persistencia = PersistenciaAsincrona()
+        persistencia.guardar("data/processed/It_texto.txt", texto, "texto")
+        persistencia.cerrar()
+    """
+
+    def __init__(self, max_pendientes=8):
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._errores = []
+        self._hilo = threading.Thread(target=self._trabajar, name="persistencia", daemon=True)
+        self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            tarea = self._cola.get()
+            try:
+                if tarea is None:
+                    return
+                ruta, formato, valor, al_guardar = tarea
+                guardar_artefacto(ruta, valor, formato)
+                print(f"Artefacto guardado en {ruta}")
+                if al_guardar is not None:
+                    al_guardar()
+            except Exception as e:
+                self._errores.append((tarea[0], e))
+            finally:
+                self._cola.task_done()
+
+    def guardar(self, ruta, valor, formato="texto", al_guardar=None):
+        """
+        Encola la escritura de valor en ruta con el formato indicado (ver FORMATOS).
+
+        Args:
+            al_guardar (callable): Se llama sin argumentos desde el hilo de escritura cuando
+                                   el artefacto ya está en disco (no si la escritura falla).
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de artefacto no soportado: {formato}")
+        self._cola.put((ruta, formato, valor, al_guardar))
+
+    def esperar(self):
+        """Espera a que terminen las escrituras pendientes."""
+        self._cola.join()
+        if self._errores:
+            ruta, error = self._errores[0]
+            self._errores.clear()
+            raise OSError(f"No se pudo guardar el artefacto {ruta}: {error}") from error
+
+    def cerrar(self):
+        """Espera a las escrituras pendientes y termina el hilo, aunque alguna haya fallado."""
+        try:
+            self.esperar()
+        finally:
+            self._cola.put(None)
+            self._hilo.join()
+
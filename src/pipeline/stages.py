@@ -0,0 +1,190 @@
+from collections import Counter
+from pathlib import Path
+from src.common.cache import CacheResultados
+from src.common.profiling import medir
+from src.pipeline.dag import Pipeline, Etapa, FORMATO_ARCHIVO
+
+
+# Etapas del pipeline de un libro. Cada función recibe los artefactos de entrada en orden
+# y los parámetros/opciones de la etapa como argumentos con nombre. Los módulos pesados
+# se importan dentro de cada etapa para no cargarlos si la etapa está al día.
+
+
+def _cache(cache_dir):
+    return CacheResultados(cache_dir) if cache_dir else None
+
+
+def etapa_extraccion(pdf_path, skip_pages=2, n_workers=1):
+    from src.extraction.extract_text import iter_text_from_pdf
+
+    with medir("extraccion") as etapa:
+        paginas = list(iter_text_from_pdf(pdf_path, skip_pages, n_workers=n_workers))
+        etapa["paginas"] = len(paginas)
+    return "".join(paginas)
+
+
+def etapa_limpieza(texto_crudo):
+    from src.extraction.extract_text import clean_extracted_text
+
+    return clean_extracted_text(texto_crudo)
+
+
+def etapa_frases_clave(texto, tamano_ventana=4000, max_phrases=5, max_words=7, max_workers=None, cache_dir=None):
+    from src.nlp.keyphrase_extraction import extraer_keyphrases_paralelo
+
+    return extraer_keyphrases_paralelo(
+        texto, tamano_ventana, max_phrases=max_phrases, max_words=max_words,
+        max_workers=max_workers, cache=_cache(cache_dir),
+    )
+
+
+def etapa_ner(texto, reconocedores=None, solapamiento=1, fusion=None, fechas="spacy", backend="pytorch", batch_size=8,
+              cache_dir=None, ner_workers=None, hilos_onnx=None, version_entidades=None):
+    """
+    Divide el texto en fragmentos para los modelos y extrae sus entidades (con un pool de
+    ner_workers procesos si es mayor que 1, ver src.nlp.ner_workers). hilos_onnx son los
+    hilos de ONNX Runtime de cada worker (por defecto, núcleos / ner_workers).
+
+    Returns:
+        dict: {"chunks": [[inicio, fin], ...], "entidades": entidades de cada fragmento,
+               "nuevas": entidades de cada fragmento sin las del solapamiento}.
+    """
+    from src.nlp.chunking import contador_de_tokens, max_tokens_de, generar_chunks, deduplicar_solapamiento
+    from src.nlp.entity_recognition import extract_entities_batch, tokenizers_ner
+
+    with medir("chunking") as etapa:
+        tokenizers = tokenizers_ner(reconocedores, backend)
+        chunks = generar_chunks(texto, contador_de_tokens(*tokenizers), max_tokens_de(*tokenizers), solapamiento)
+        etapa["chunks"] = len(chunks)
+    fragmentos = [chunk.texto for chunk in chunks]
+    # Con la posición de cada mención, para deduplicar el solapamiento
+    opciones = {"batch_size": batch_size, "reconocedores": reconocedores, "cache": _cache(cache_dir),
+                "fusion": fusion, "fechas": fechas, "backend": backend, "posiciones": True}
+    if ner_workers and ner_workers > 1:
+        from src.nlp.ner_workers import extraer_entidades_paralelo
+
+        # Los workers arrancan sin la configuración de ONNX Runtime del proceso principal
+        hilos = hilos_onnx if backend != "pytorch" else None
+        with medir("ner", chunks=len(fragmentos), workers=ner_workers):
+            entidades = extraer_entidades_paralelo(fragmentos, ner_workers, hilos=hilos, **opciones)
+    else:
+        entidades = extract_entities_batch(fragmentos, **opciones)
+    nuevas = deduplicar_solapamiento(chunks, entidades)
+    return {
+        "chunks": [[chunk.inicio, chunk.fin] for chunk in chunks],
+        "entidades": [[(texto, etiqueta) for texto, etiqueta, _ in lista] for lista in entidades],
+        "nuevas": [[(texto, etiqueta) for texto, etiqueta, _ in lista] for lista in nuevas],
+    }
+
+
+def etapa_relaciones(texto, menciones, umbral_fuzzy=90):
+    from src.ontology.cooccurrence import extraer_coocurrencias
+
+    relaciones = Counter()
+    fin_anterior = 0
+    for (inicio, fin), entidades in zip(menciones["chunks"], menciones["entidades"]):
+        entidades = [tuple(e) for e in entidades]
+        # Las oraciones repetidas del fragmento anterior terminan en su fin: contar solo
+        # las que empiezan después, que son las nuevas de este fragmento
+        desde = max(fin_anterior - inicio, 0)
+        relaciones.update(extraer_coocurrencias(texto[inicio:fin], entidades, umbral_fuzzy=umbral_fuzzy, desde=desde))
+        fin_anterior = fin
+    return relaciones
+
+
+def etapa_agrupacion(menciones, umbral=25, min_conteo=2):
+    from src.nlp.entity_grouping import agrupar_entidades_indexado
+
+    entidades = [tuple(e) for nuevas in menciones["nuevas"] for e in nuevas]
+    with medir("agrupacion", entidades=len(entidades)) as etapa:
+        agrupadas = agrupar_entidades_indexado(entidades, umbral=umbral, min_conteo=min_conteo)
+        etapa["grupos"] = len(agrupadas)
+    return agrupadas
+
+
+def etapa_ontologia(entidades, relaciones, ruta_salida):
+    from src.ontology.rdf_stream import escribir_ontologia_stream
+
+    formato = "nt" if Path(ruta_salida).suffix == ".nt" else "turtle"
+    with medir("ontologia", entidades=len(entidades), relaciones=len(relaciones)) as etapa:
+        etapa["triples"] = escribir_ontologia_stream(ruta_salida, entidades, relaciones, formato)
+    print(f"Ontología guardada en {ruta_salida} ({etapa['triples']} triples)")
+
+
+def etapa_carga_neo4j(entidades, relaciones, ontologia, cargador="n10s", neo4j_url=None, libro=None, user=None, password=None):
+    """
+    Carga el grafo en Neo4j con el cargador indicado.
+
+    Returns:
+        dict: Resumen de la carga (cargador, entidades, relaciones y latencias por paso).
+    """
+    from src.ontology.neo4j_service import Neo4jService
+
+    with Neo4jService(neo4j_url, user, password) as servicio:
+        if cargador == "unwind":
+            servicio.cargar_unwind(entidades, relaciones)
+        elif cargador == "upsert":
+            servicio.upsert_libro(libro, entidades, relaciones)
+        else:
+            with open(ontologia, "r", encoding="utf-8") as f:
+                servicio.insertar_ontologia(f.read())
+        latencias = servicio.resumen_latencias()
+    for paso, stats in latencias.items():
+        print(f"Neo4j {paso}: {stats['llamadas']} llamadas, {stats['total_s']:.2f} s")
+    return {"cargador": cargador, "entidades": len(entidades), "relaciones": len(relaciones), "latencias": latencias}
+
+
+def construir_pipeline(pdf_path, directorio="data/processed", ontology_path=None, neo4j_url="bolt://localhost:7687",
+                       user="neo4j", password=None, cargador="n10s", reconocedores=None, cache_dir="data/cache",
+                       chunk_size=4000, keyphrase_workers=None, batch_size=8, solapamiento=1, umbral_fuzzy=90, fusion=None,
+                       fechas="spacy", backend="pytorch", ner_workers=None, hilos_onnx=None):
+    """
+    Declara el pipeline de un libro:
+
+        pdf -> extraccion -> limpieza -> frases_clave
+                                      -> ner -> relaciones -> ontologia -> carga_neo4j
+                                             -> agrupacion ----^
+
+    frases_clave y ner, y después relaciones y agrupacion, son independientes y se
+    ejecutan a la vez. Los puntos de control se guardan en directorio con el nombre del
+    libro como prefijo (el texto limpio en <libro>.txt y las frases en <libro>_kp.txt).
+
+    Returns:
+        Pipeline: El pipeline listo para ejecutar().
+    """
+    from src.nlp.entity_recognition import VERSION_ENTIDADES
+
+    libro = Path(pdf_path).stem
+    directorio = Path(directorio)
+    ontology_path = ontology_path or str(directorio / f"{libro}_ontologia.ttl")
+    cache = {"cache_dir": cache_dir}
+
+    pipeline = Pipeline(directorio, libro)
+    pipeline.fuente("pdf", pdf_path)
+    pipeline.agregar(Etapa("extraccion", etapa_extraccion, ["pdf"], "texto_crudo", formato="texto", tipo=str,
+                           parametros={"skip_pages": 2}))
+    pipeline.agregar(Etapa("limpieza", etapa_limpieza, ["texto_crudo"], "texto", formato="texto", tipo=str,
+                           ruta=str(directorio / f"{libro}.txt")))
+    pipeline.agregar(Etapa("frases_clave", etapa_frases_clave, ["texto"], "frases_clave", formato="lineas", tipo=list,
+                           ruta=str(directorio / f"{libro}_kp.txt"),
+                           parametros={"tamano_ventana": chunk_size, "max_phrases": 5, "max_words": 7},
+                           opciones={"max_workers": keyphrase_workers, **cache}))
+    pipeline.agregar(Etapa("ner", etapa_ner, ["texto"], "menciones", tipo=dict,
+                           parametros={"reconocedores": sorted(reconocedores) if reconocedores else None,
+                                       "solapamiento": solapamiento, "version_entidades": VERSION_ENTIDADES,
+                                       # Solo si no son los valores por defecto, para no invalidar
+                                       # los puntos de control previos
+                                       **({"fusion": fusion} if fusion else {}),
+                                       **({"fechas": fechas} if fechas != "spacy" else {}),
+                                       **({"backend": backend} if backend != "pytorch" else {})},
+                           opciones={"batch_size": batch_size, "ner_workers": ner_workers, "hilos_onnx": hilos_onnx, **cache}))
+    pipeline.agregar(Etapa("relaciones", etapa_relaciones, ["texto", "menciones"], "relaciones", formato="relaciones",
+                           tipo=Counter, parametros={"umbral_fuzzy": umbral_fuzzy}, version="2"))
+    pipeline.agregar(Etapa("agrupacion", etapa_agrupacion, ["menciones"], "entidades", formato="entidades", tipo=list,
+                           parametros={"umbral": 25, "min_conteo": 2}, version="3"))
+    pipeline.agregar(Etapa("ontologia", etapa_ontologia, ["entidades", "relaciones"], "ontologia",
+                           formato=FORMATO_ARCHIVO, ruta=ontology_path))
+    pipeline.agregar(Etapa("carga_neo4j", etapa_carga_neo4j, ["entidades", "relaciones", "ontologia"], "carga_neo4j",
+                           tipo=dict, parametros={"cargador": cargador, "neo4j_url": neo4j_url, "libro": libro},
+                           opciones={"user": user, "password": password}))
+    return pipeline
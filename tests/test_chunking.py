@@ -0,0 +1,54 @@
+from src.nlp.chunking import Chunk, deduplicar_solapamiento
+
+
+TEXTO = "Bill llegó a Derry. El 3 de mayo de 1958 Bill volvió. Fin de la historia."
+
+
+def _chunks():
+    segunda = TEXTO.index("El 3")
+    tercera = TEXTO.index("Fin")
+    fin_primero = TEXTO.index("volvió.") + len("volvió.")
+    return [
+        Chunk(TEXTO[:fin_primero], 0, fin_primero, 0),
+        # Repite la segunda oración del primer fragmento
+        Chunk(TEXTO[segunda:], segunda, len(TEXTO), tercera),
+    ]
+
+
+def _posicion(chunk, subcadena, desde=0):
+    return chunk.texto.index(subcadena, desde)
+
+
+def test_solo_cuentan_las_menciones_del_anterior_en_el_solapamiento():
+    primero, segundo = _chunks()
+    # El primer fragmento solo encuentra a Bill fuera de la parte repetida
+    entidades = [
+        [("Bill", "PERSON", _posicion(primero, "Bill")), ("Derry", "LOC", _posicion(primero, "Derry"))],
+        [("Bill", "PERSON", _posicion(segundo, "Bill"))],
+    ]
+
+    nuevas = deduplicar_solapamiento([primero, segundo], entidades)
+
+    assert nuevas == entidades
+
+
+def test_deduplica_fechas_normalizadas_por_posicion():
+    primero, segundo = _chunks()
+    entidades = [
+        [
+            ("Bill", "PERSON", _posicion(primero, "Bill")),
+            ("1958-05-03", "DATE", _posicion(primero, "3 de mayo")),
+            ("Bill", "PERSON", _posicion(primero, "Bill", 1)),
+        ],
+        [
+            ("1958-05-03", "DATE", _posicion(segundo, "3 de mayo")),
+            ("Bill", "PERSON", _posicion(segundo, "Bill")),
+            ("1958-05-03", "DATE", None),
+        ],
+    ]
+
+    nuevas = deduplicar_solapamiento([primero, segundo], entidades)
+
+    # Las dos menciones de la oración repetida ya las contó el primer fragmento; la que
+    # no tiene posición se conserva
+    assert nuevas == [entidades[0], [("1958-05-03", "DATE", None)]]
@@ -0,0 +1,35 @@
+from src.nlp.chunking import contador_de_tokens, generar_chunks
+from src.ontology.cooccurrence import extraer_coocurrencias
+from src.pipeline.stages import etapa_relaciones
+
+
+ENTIDADES = [("Bill", "PER"), ("Richie", "PER"), ("Eddie", "PER"), ("Derry", "LOC")]
+
+TEXTO = (
+    "Bill y Richie corren por Derry. Eddie se queda en casa. Richie llama a Eddie. "
+    "Bill vuelve a Derry con Eddie. Richie se ríe de Bill. Derry duerme."
+)
+
+
+def test_relaciones_no_cuentan_dos_veces_el_solapamiento():
+    chunks = generar_chunks(TEXTO, contador_de_tokens(), max_tokens=12, solapamiento=1)
+    assert any(chunk.inicio_nuevo > chunk.inicio for chunk in chunks)
+    menciones = {
+        "chunks": [[chunk.inicio, chunk.fin] for chunk in chunks],
+        "entidades": [ENTIDADES for _ in chunks],
+    }
+
+    # Cada oración cuenta una vez, como si el texto se procesara entero
+    assert etapa_relaciones(TEXTO, menciones, umbral_fuzzy=None) == extraer_coocurrencias(TEXTO, ENTIDADES)
+
+
+def test_desde_con_ventana_en_caracteres():
+    texto = "Bill ve a Richie. Eddie llega."
+    desde = texto.index("Eddie")
+
+    conteo = extraer_coocurrencias(texto, ENTIDADES, ventana=100, desde=desde)
+
+    # Bill-Richie está entero antes de desde; los pares con Eddie empiezan después
+    assert ("Bill", "co_ocurre_con", "Richie") not in conteo
+    assert conteo[("Bill", "co_ocurre_con", "Eddie")] == 1
+    assert conteo[("Eddie", "co_ocurre_con", "Richie")] == 1
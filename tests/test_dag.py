@@ -0,0 +1,67 @@
+import json
+import threading
+
+import src.pipeline.persistence as persistence
+from src.pipeline.dag import Etapa, Pipeline
+
+
+def _pipeline(directorio, llamadas):
+    fuente = directorio / "libro.txt"
+    if not fuente.exists():
+        fuente.write_text("Bill llegó a Derry", encoding="utf-8")
+
+    def leer(ruta):
+        llamadas.append("leer")
+        return open(ruta, encoding="utf-8").read()
+
+    def contar(texto):
+        llamadas.append("contar")
+        return len(texto.split())
+
+    pipeline = Pipeline(directorio, "It")
+    pipeline.fuente("fuente", fuente)
+    pipeline.agregar(Etapa("lectura", leer, ["fuente"], "texto", formato="texto", tipo=str))
+    pipeline.agregar(Etapa("conteo", contar, ["texto"], "palabras", tipo=int))
+    return pipeline
+
+
+def test_la_escritura_no_bloquea_a_la_etapa_siguiente(tmp_path, monkeypatch):
+    llamadas = []
+    contado = threading.Event()
+    guardar_artefacto = persistence.guardar_artefacto
+
+    def guardar_lento(ruta, valor, formato="texto"):
+        # El texto no llega a disco hasta que la etapa siguiente ha terminado
+        contado.wait(timeout=5)
+        llamadas.append(f"guardado {formato}")
+        guardar_artefacto(ruta, valor, formato)
+
+    def contar(texto):
+        contado.set()
+        llamadas.append("contar")
+        return len(texto.split())
+
+    monkeypatch.setattr(persistence, "guardar_artefacto", guardar_lento)
+    pipeline = _pipeline(tmp_path, llamadas)
+    pipeline.etapas["conteo"].funcion = contar
+
+    assert pipeline.ejecutar() == {"texto": "Bill llegó a Derry", "palabras": 4}
+
+    assert llamadas.index("contar") < llamadas.index("guardado texto")
+    # Al volver de ejecutar() los puntos de control están escritos y anotados
+    manifiesto = json.loads((tmp_path / "It.manifiesto.json").read_text(encoding="utf-8"))
+    assert set(manifiesto["artefactos"]) == {"texto", "palabras"}
+    assert pipeline.estado() == {"lectura": "al día", "conteo": "al día"}
+
+
+def test_sin_persistir_no_deja_puntos_de_control(tmp_path):
+    llamadas = []
+
+    _pipeline(tmp_path, llamadas).ejecutar(persistir=False)
+    pipeline = _pipeline(tmp_path, llamadas)
+
+    assert not (tmp_path / "It_texto.txt").exists()
+    assert pipeline.estado() == {"lectura": "sin ejecutar", "conteo": "sin ejecutar"}
+    assert pipeline.ejecutar()["palabras"] == 4
+    assert llamadas == ["leer", "contar", "leer", "contar"]
+    assert pipeline.estado() == {"lectura": "al día", "conteo": "al día"}
@@ -0,0 +1,44 @@
+import random
+
+from src.nlp.entity_grouping import agrupar_entidades_indexado
+
+
+PERSONAJES = [("Mike Hanlon", "PERSON"), ("Mike", "PERSON"), ("Ben Hanscom", "PERSON"), ("Ben", "PERSON")]
+
+
+def test_no_depende_del_orden_de_entrada():
+    entidades = PERSONAJES * 3 + [("Derry", "LOC"), ("derry", "LOC"), ("Bangor", "LOC"), ("Derry", "LOC")]
+    esperado = agrupar_entidades_indexado(entidades)
+
+    for semilla in range(10):
+        barajadas = list(entidades)
+        random.Random(semilla).shuffle(barajadas)
+        for max_bloque in (1, 2, 2000):
+            assert agrupar_entidades_indexado(barajadas, max_bloque=max_bloque) == esperado
+
+
+def test_personajes_distintos_no_se_mezclan():
+    # "Mike Hanlon" y "Ben Hanscom" comparten el prefijo "han", pero cada uno se une a la
+    # cabeza más corta de su personaje
+    assert agrupar_entidades_indexado(PERSONAJES * 2) == [("Ben", "PERSON"), ("Mike", "PERSON")]
+
+
+def test_no_encadena_grupos():
+    # "Mike Hanscom" se parece a "Mike Hanlon" y a "Ben Hanscom", pero estos dos no se
+    # parecen entre sí: son dos grupos y no uno
+    entidades = [("Mike Hanlon", "PERSON"), ("Mike Hanscom", "PERSON"), ("Ben Hanscom", "PERSON")] * 2
+
+    agrupadas = agrupar_entidades_indexado(entidades, umbral=75)
+
+    assert agrupadas == [("Ben Hanscom", "PERSON"), ("Mike Hanlon", "PERSON")]
+
+
+def test_min_conteo_y_varias_etiquetas():
+    entidades = [
+        ("Derry", "LOC"), ("Bill Denbrough", "PER"), ("Bill", "PER"), ("derry", "LOC"),
+        ("Bangor", "LOC"), ("Denbrough", "PER"), ("Richie", "PER"),
+    ]
+
+    # "Bill Denbrough" se parece más a la cabeza "Denbrough" (78) que a "Bill" (44); los
+    # grupos con una sola mención se descartan
+    assert agrupar_entidades_indexado(entidades, umbral=50) == [("Derry", "LOC"), ("Denbrough", "PER")]
@@ -0,0 +1,163 @@
+import asyncio
+import src.ontology.neo4j_service as neo4j_service
+
+
+# Sesiones falsas con solo la API de transacciones de neo4j 5+ (execute_write /
+# execute_read): si el servicio usa write_transaction o read_transaction, fallan
+
+# Las consultas de configuración de n10s devuelven una fila por parámetro
+CONSULTAS_VARIAS_FILAS = (neo4j_service.CONSULTA_INIT_N10S, neo4j_service.CONSULTA_CONFIG_N10S)
+
+
+class _Resultado:
+    def __init__(self, registros):
+        self.registros = registros
+
+    def single(self):
+        # El driver avisa ("found multiple records") si hay más de un registro
+        assert len(self.registros) <= 1, "single() con varios registros"
+        return self.registros[0] if self.registros else None
+
+    def fetch(self, n):
+        return self.registros[:n]
+
+    def consume(self):
+        self.registros = []
+
+
+class _Tx:
+    def __init__(self, consultas):
+        self.consultas = consultas
+
+    def run(self, consulta, **parametros):
+        self.consultas.append((consulta, parametros))
+        if consulta == neo4j_service.CONSULTA_CONTAR_NODOS:
+            return _Resultado([{"node_count": 7}])
+        if consulta in CONSULTAS_VARIAS_FILAS:
+            return _Resultado([{"param": "handleVocabUris"}, {"param": "handleMultival"}, {"param": "keepLangTag"}])
+        return _Resultado([{"n": len(parametros.get("filas", []))}])
+
+
+class _Sesion:
+    def __init__(self, consultas):
+        self.consultas = consultas
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute_write(self, funcion, *args):
+        return funcion(_Tx(self.consultas), *args)
+
+    def execute_read(self, funcion, *args):
+        return funcion(_Tx(self.consultas), *args)
+
+
+class _Driver:
+    def __init__(self):
+        self.consultas = []
+
+    def session(self):
+        return _Sesion(self.consultas)
+
+    def close(self):
+        pass
+
+
+class _ResultadoAsync(_Resultado):
+    async def single(self):
+        return _Resultado.single(self)
+
+    async def fetch(self, n):
+        return _Resultado.fetch(self, n)
+
+    async def consume(self):
+        _Resultado.consume(self)
+
+
+class _TxAsync(_Tx):
+    async def run(self, consulta, **parametros):
+        return _ResultadoAsync(_Tx.run(self, consulta, **parametros).registros)
+
+
+class _SesionAsync:
+    def __init__(self, consultas):
+        self.consultas = consultas
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute_write(self, funcion, *args):
+        return await funcion(_TxAsync(self.consultas), *args)
+
+    async def execute_read(self, funcion, *args):
+        return await funcion(_TxAsync(self.consultas), *args)
+
+
+class _DriverAsync(_Driver):
+    def session(self):
+        return _SesionAsync(self.consultas)
+
+    async def close(self):
+        pass
+
+
+ENTIDADES = [("Bill Denbrough", "PERSON"), ("Derry", "LOC")]
+RELACIONES = {("Bill Denbrough", "vive_en", "Derry"): 3}
+
+
+def test_cargar_unwind_con_execute_write(monkeypatch):
+    driver = _Driver()
+    monkeypatch.setattr(neo4j_service.GraphDatabase, "driver", lambda *args, **kwargs: driver)
+
+    node_count = neo4j_service.insert_entities_unwind("bolt://falso", "neo4j", "clave", ENTIDADES, RELACIONES)
+
+    assert node_count == 7
+    consultas = [consulta for consulta, _ in driver.consultas]
+    assert consultas[0] == neo4j_service.CONSULTA_LIMPIAR
+    assert consultas[-1] == neo4j_service.CONSULTA_CONTAR_NODOS
+    assert sum(len(parametros.get("filas", [])) for _, parametros in driver.consultas) == 3
+
+
+def test_upsert_libro_async_con_execute_write(monkeypatch):
+    driver = _DriverAsync()
+    monkeypatch.setattr(neo4j_service.AsyncGraphDatabase, "driver", lambda *args, **kwargs: driver)
+
+    async def cargar():
+        async with neo4j_service.Neo4jServiceAsync("bolt://falso", "neo4j", "clave") as servicio:
+            resultado = await servicio.upsert_libro("It", ENTIDADES, RELACIONES)
+            return resultado, await servicio.contar_nodos()
+
+    resultado, node_count = asyncio.run(cargar())
+
+    assert resultado == {"relaciones_borradas": 0, "nodos_borrados": 0}
+    assert node_count == 7
+
+
+def test_insertar_ontologia_lee_solo_la_ultima_consulta(monkeypatch):
+    driver = _Driver()
+    monkeypatch.setattr(neo4j_service.GraphDatabase, "driver", lambda *args, **kwargs: driver)
+
+    with neo4j_service.Neo4jService("bolt://falso", "neo4j", "clave") as servicio:
+        servicio.insertar_ontologia("@prefix ex: <http://example.org/> .")
+
+    consultas = [consulta for consulta, _ in driver.consultas]
+    assert consultas[1:3] == list(CONSULTAS_VARIAS_FILAS)
+
+
+def test_insertar_ontologia_async_lee_solo_la_ultima_consulta(monkeypatch):
+    driver = _DriverAsync()
+    monkeypatch.setattr(neo4j_service.AsyncGraphDatabase, "driver", lambda *args, **kwargs: driver)
+
+    async def insertar():
+        async with neo4j_service.Neo4jServiceAsync("bolt://falso", "neo4j", "clave") as servicio:
+            await servicio.insertar_ontologia("@prefix ex: <http://example.org/> .")
+
+    asyncio.run(insertar())
+
+    assert [consulta for consulta, _ in driver.consultas][1:3] == list(CONSULTAS_VARIAS_FILAS)
@@ -0,0 +1,29 @@
+from collections import Counter
+
+import pytest
+
+from src.pipeline.persistence import PersistenciaAsincrona, cargar_artefacto
+
+
+def test_escribe_en_segundo_plano_y_espera(tmp_path):
+    relaciones = Counter({("Bill", "co_ocurre_con", "Richie"): 3})
+    persistencia = PersistenciaAsincrona()
+
+    persistencia.guardar(tmp_path / "texto.txt", "Bill llegó a Derry.")
+    persistencia.guardar(tmp_path / "relaciones.json", relaciones, "relaciones")
+    persistencia.cerrar()
+
+    assert cargar_artefacto(tmp_path / "texto.txt") == "Bill llegó a Derry."
+    assert cargar_artefacto(tmp_path / "relaciones.json", "relaciones") == relaciones
+
+
+def test_relanza_el_error_de_escritura_y_termina_el_hilo(tmp_path):
+    (tmp_path / "ocupado").write_text("")
+    persistencia = PersistenciaAsincrona()
+
+    # El directorio del artefacto es un archivo: la escritura falla en el hilo
+    persistencia.guardar(tmp_path / "ocupado" / "texto.txt", "Bill")
+    with pytest.raises(OSError, match="ocupado"):
+        persistencia.cerrar()
+
+    assert not persistencia._hilo.is_alive()
@@ -0,0 +1,47 @@
+import contextvars
+import threading
+import time
+from src.common.profiling import Perfilador, medir
+
+
+def _ocupar_cpu(segundos):
+    fin = time.thread_time() + segundos
+    while time.thread_time() < fin:
+        pass
+
+
+def test_cpu_por_etapa_con_etapas_concurrentes():
+    empezada = threading.Event()
+
+    def etapa_ocupada():
+        with medir("ocupada"):
+            empezada.set()
+            _ocupar_cpu(0.3)
+
+    with Perfilador("prueba") as perfil:
+        with medir("espera"):
+            # El contexto del perfilador se copia al hilo, como en el pipeline
+            hilo = threading.Thread(target=contextvars.copy_context().run, args=(etapa_ocupada,))
+            hilo.start()
+            empezada.wait()
+            with medir("anidada"):
+                pass
+            hilo.join()
+
+    etapas = {registro["etapa"]: registro for registro in perfil.resultado()["etapas"]}
+    # La CPU de la etapa ocupada no cuenta en la que solo espera a otro hilo
+    assert etapas["espera"]["cpu_s"] < 0.1
+    assert etapas["ocupada"]["cpu_s"] >= 0.3
+    assert etapas["espera"]["cpu_proceso_s"] >= 0.3
+    assert etapas["espera"]["concurrente"] and etapas["ocupada"]["concurrente"]
+    # anidada se abre en el mismo hilo que espera, pero ocupada sigue abierta en otro
+    assert etapas["anidada"]["concurrente"]
+
+
+def test_etapas_secuenciales_no_son_concurrentes():
+    with Perfilador("prueba") as perfil:
+        with medir("externa"):
+            with medir("interna"):
+                _ocupar_cpu(0.05)
+
+    assert not any(registro["concurrente"] for registro in perfil.resultado()["etapas"])
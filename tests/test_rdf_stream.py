@@ -0,0 +1,34 @@
+import io
+
+import src.ontology.rdf_stream as rdf_stream
+from src.ontology.rdf_stream import EscritorTriplesStream
+
+
+ENTIDADES = [("Bill Denbrough", "PERSON"), ("Derry", "LOC"), ("Bill Denbrough", "PERSON")]
+RELACIONES = [("Bill Denbrough", "vive_en", "Derry"), ("Bill Denbrough", "vive_en", "Derry")]
+
+
+def _escribir(**kwargs):
+    salida = io.StringIO()
+    with EscritorTriplesStream(salida, **kwargs) as escritor:
+        escritor.agregar_entidades(ENTIDADES)
+        escritor.agregar_relaciones(RELACIONES)
+    return salida.getvalue().splitlines(), escritor.triples
+
+
+def test_no_repite_triples():
+    lineas, triples = _escribir()
+    repetidas, _ = _escribir(deduplicar=False)
+
+    assert len(lineas) == len(set(lineas)) == triples
+    assert set(lineas) == set(repetidas)
+    assert len(repetidas) > len(lineas)
+
+
+def test_no_depende_de_hash(monkeypatch):
+    # Aunque todos los triples colisionaran con hash(), ninguno distinto se descarta
+    monkeypatch.setattr(rdf_stream, "hash", lambda valor: 0, raising=False)
+
+    lineas, _ = _escribir()
+
+    assert len(lineas) == len(set(_escribir(deduplicar=False)[0]))